@@ -0,0 +1,93 @@
+"""
+Compara dos resultados de benchmarks/run_benchmarks.py y marca regresiones.
+
+Hay regresión cuando, para el mismo endpoint y concurrencia, el p95 sube o el
+throughput baja más que la tolerancia (por defecto 15 %), o aparecen errores que
+antes no había. Sale con código 1 si encuentra alguna, para usarlo en CI.
+
+Uso:
+    uv run python -m benchmarks.compare benchmarks/resultados/base.json benchmarks/resultados/nuevo.json
+    uv run python -m benchmarks.compare base.json nuevo.json --tolerancia 0.25
+"""
+import argparse
+import json
+import sys
+
+
+def _cargar(ruta: str) -> tuple[dict, dict[tuple[str, int], dict]]:
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    return datos, {(r["endpoint"], r["concurrencia"]): r for r in datos["resultados"]}
+
+
+def _variacion(antes: float | None, despues: float | None) -> float | None:
+    if not antes or despues is None:
+        return None
+    return (despues - antes) / antes
+
+
+def _porcentaje(valor: float | None) -> str:
+    return f"{valor * 100:+7.1f}%" if valor is not None else "       -"
+
+
+def comparar(base: dict, nuevo: dict, tolerancia: float) -> list[str]:
+    """Imprime la tabla de diferencias y devuelve las regresiones encontradas."""
+    regresiones = []
+    print(f"{'endpoint':>15} {'conc':>5} {'rps base':>10} {'rps nuevo':>10} {'Δrps':>8} "
+          f"{'p95 base':>10} {'p95 nuevo':>10} {'Δp95':>8}")
+    for clave in sorted(set(base) | set(nuevo)):
+        endpoint, concurrencia = clave
+        antes, despues = base.get(clave), nuevo.get(clave)
+        if antes is None or despues is None:
+            print(f"{endpoint:>15} {concurrencia:>5}  (solo en {'nuevo' if antes is None else 'base'})")
+            continue
+
+        delta_rps = _variacion(antes["throughput_rps"], despues["throughput_rps"])
+        delta_p95 = _variacion(antes["p95_segundos"], despues["p95_segundos"])
+        marcas = []
+        if delta_rps is not None and delta_rps < -tolerancia:
+            marcas.append("throughput")
+        if delta_p95 is not None and delta_p95 > tolerancia:
+            marcas.append("p95")
+        if despues["errores"] > antes["errores"]:
+            marcas.append("errores")
+
+        def ms(valor):
+            return f"{valor * 1000:8.1f}ms" if valor is not None else "         -"
+
+        print(
+            f"{endpoint:>15} {concurrencia:>5} {antes['throughput_rps'] or 0:10.2f} "
+            f"{despues['throughput_rps'] or 0:10.2f} {_porcentaje(delta_rps)} "
+            f"{ms(antes['p95_segundos'])} {ms(despues['p95_segundos'])} {_porcentaje(delta_p95)}"
+            f"{'  ⚠️ ' + ', '.join(marcas) if marcas else ''}"
+        )
+        if marcas:
+            regresiones.append(f"{endpoint} c={concurrencia}: {', '.join(marcas)}")
+    return regresiones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="Resultados de referencia")
+    parser.add_argument("nuevo", help="Resultados a comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.15,
+                        help="Variación relativa permitida en p95 y throughput (0.15 = 15 %%)")
+    args = parser.parse_args()
+
+    datos_base, base = _cargar(args.base)
+    datos_nuevo, nuevo = _cargar(args.nuevo)
+    if datos_base.get("modelo_falso") != datos_nuevo.get("modelo_falso"):
+        print("⚠️ Las dos ejecuciones usan configuraciones distintas del modelo falso")
+    print(f"base: {datos_base.get('commit')}  nuevo: {datos_nuevo.get('commit')}\n")
+
+    regresiones = comparar(base, nuevo, args.tolerancia)
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} regresiones (tolerancia {args.tolerancia:.0%}):")
+        for regresion in regresiones:
+            print(f"  - {regresion}")
+        sys.exit(1)
+    print(f"\n✅ Sin regresiones (tolerancia {args.tolerancia:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Modelo Gemini falso y determinista para benchmarks.
+
+Imita la parte del cliente de google-genai que usa gemini_service
+(models.generate_content, files.upload / delete, caches.create / update) con
+latencias, errores y tamaños de respuesta configurables, sin red ni API key.
+Con la misma semilla produce siempre la misma secuencia de latencias y errores.
+
+Uso:
+    from benchmarks.fake_gemini import ConfigFalso, instalar
+    instalar(ConfigFalso(latencias={"*": "lognormal:0.3:0.4"}, tasa_errores=0.01))
+"""
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+from google.genai import errors
+
+# Latencia por defecto de cada tipo de llamada; "*" se aplica al resto
+LATENCIAS_POR_DEFECTO = {
+    "*": "lognormal:0.35:0.35",
+    "stt": "lognormal:0.8:0.4",
+    "archivo": "lognormal:2.0:0.4",
+    "upload": "lognormal:0.5:0.3",
+    "delete": "fija:0.05",
+}
+
+
+@dataclass
+class ConfigFalso:
+    """
+    - latencias: distribución por tipo de llamada (stt, explicar, lote, archivo, ocr,
+      upload, delete o "*"), con el formato "fija:s", "normal:media:desv",
+      "lognormal:mediana:sigma" o "exponencial:media".
+    - tasa_errores: fracción de llamadas que fallan con 503 o 429.
+    - tamano_salida: caracteres aproximados de cada explicación generada.
+    - escala_tiempo: multiplica todas las latencias (0 = sin esperas).
+    """
+
+    latencias: dict[str, str] = field(default_factory=lambda: dict(LATENCIAS_POR_DEFECTO))
+    tasa_errores: float = 0.0
+    tamano_salida: int = 400
+    escala_tiempo: float = 1.0
+    semilla: int = 42
+
+
+def _muestreador(especificacion: str):
+    tipo, *parametros = especificacion.split(":")
+    valores = [float(p) for p in parametros]
+    if tipo == "fija":
+        return lambda rnd: valores[0]
+    if tipo == "normal":
+        return lambda rnd: max(0.0, rnd.gauss(valores[0], valores[1]))
+    if tipo == "lognormal":
+        return lambda rnd: rnd.lognormvariate(math.log(valores[0]), valores[1])
+    if tipo == "exponencial":
+        return lambda rnd: rnd.expovariate(1 / valores[0])
+    raise ValueError(f"Distribución de latencia desconocida: {especificacion}")
+
+
+def _tipo_por_instrucciones() -> dict[str, str]:
+    """Qué tipo de llamada es cada bloque de instrucciones del registro de prompts."""
+    from services.prompts import registro
+
+    tipos = {}
+    for prompt in registro.todas():
+        tipo = "explicar" if prompt.nombre in ("explicar_imagen", "explicar_archivo") else prompt.nombre
+        tipos[prompt.instrucciones] = tipo
+    return tipos
+
+
+def _texto_contenido(contenido) -> str:
+    if isinstance(contenido, str):
+        return contenido
+    if isinstance(contenido, (list, tuple)):
+        return "\n".join(_texto_contenido(parte) for parte in contenido)
+    return ""
+
+
+def _bytes_contenido(contenido) -> int:
+    if isinstance(contenido, (list, tuple)):
+        return sum(_bytes_contenido(parte) for parte in contenido)
+    datos = getattr(getattr(contenido, "inline_data", None), "data", None)
+    return len(datos) if datos else len(_texto_contenido(contenido).encode())
+
+
+class ModeloFalso:
+    """Estado compartido por todos los clientes falsos: azar, cachés y contadores."""
+
+    def __init__(self, config: ConfigFalso | None = None):
+        self.config = config or ConfigFalso()
+        self._azar = random.Random(self.config.semilla)
+        self._lock = threading.Lock()
+        self._muestreadores = {
+            tipo: _muestreador(especificacion)
+            for tipo, especificacion in self.config.latencias.items()
+        }
+        self._tipos = _tipo_por_instrucciones()
+        self._caches: dict[str, str] = {}
+        self._ids = itertools.count(1)
+        self.llamadas: dict[str, int] = {}
+        self.errores = 0
+
+    def _sortear(self, tipo: str) -> tuple[float, int | None]:
+        """Latencia y, si toca, código de error de la próxima llamada de `tipo`."""
+        muestreador = self._muestreadores.get(tipo) or self._muestreadores["*"]
+        with self._lock:
+            latencia = muestreador(self._azar) * self.config.escala_tiempo
+            codigo = None
+            if self._azar.random() < self.config.tasa_errores:
+                codigo = self._azar.choice((503, 503, 429))
+                self.errores += 1
+            self.llamadas[tipo] = self.llamadas.get(tipo, 0) + 1
+        return latencia, codigo
+
+    def esperar(self, tipo: str, timeout: float | None = None) -> None:
+        latencia, codigo = self._sortear(tipo)
+        if timeout is not None and latencia > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Tiempo de espera agotado en el modelo falso ({tipo})")
+        time.sleep(latencia)
+        if codigo is not None:
+            estado = "UNAVAILABLE" if codigo == 503 else "RESOURCE_EXHAUSTED"
+            respuesta = {"error": {"code": codigo, "message": "Error simulado", "status": estado}}
+            raise errors.APIError(codigo, respuesta)
+
+    def _explicacion(self, semilla: str) -> dict:
+        frase = f"Explicación simulada de «{semilla[:40]}». "
+        repeticiones = max(1, self.config.tamano_salida // len(frase))
+        return {
+            "explicacion_clara": (frase * repeticiones).strip(),
+            "acciones_sugeridas": ["Acción simulada uno", "Acción simulada dos"],
+            "nivel_urgencia": "media",
+        }
+
+    def respuesta(self, tipo: str, texto: str) -> str:
+        if tipo == "stt":
+            return "Transcripción simulada: la ECU reporta un error intermitente en el sensor."
+        if tipo == "ocr":
+            return "Texto simulado de la imagen: revisar presión de neumáticos."
+        if tipo == "lote":
+            ids = [int(i) for i in re.findall(r"\[ID (\d+)\]", texto)]
+            return json.dumps(
+                [{"id": i, **self._explicacion(f"texto {i}")} for i in ids], ensure_ascii=False
+            )
+        if tipo == "archivo":
+            return json.dumps(
+                {"texto_extraido": "Contenido simulado del archivo.", **self._explicacion(texto)},
+                ensure_ascii=False,
+            )
+        return json.dumps(self._explicacion(texto.strip()), ensure_ascii=False)
+
+    def tipo_de_llamada(self, config) -> str:
+        instrucciones = getattr(config, "system_instruction", None)
+        nombre_cache = getattr(config, "cached_content", None)
+        if nombre_cache:
+            instrucciones = self._caches.get(nombre_cache)
+        return self._tipos.get(instrucciones, "explicar")
+
+    def nuevo_id(self) -> int:
+        return next(self._ids)
+
+    def crear_cache(self, instrucciones: str) -> str:
+        nombre = f"cachedContents/falso-{self.nuevo_id()}"
+        with self._lock:
+            self._caches[nombre] = instrucciones
+        return nombre
+
+
+class _ModelsFalso:
+    def __init__(self, modelo: ModeloFalso):
+        self._modelo = modelo
+
+    def generate_content(self, model: str, contents, config=None):
+        tipo = self._modelo.tipo_de_llamada(config)
+        opciones_http = getattr(config, "http_options", None)
+        timeout_ms = getattr(opciones_http, "timeout", None)
+        self._modelo.esperar(tipo, timeout_ms / 1000 if timeout_ms else None)
+
+        texto = _texto_contenido(contents)
+        salida = self._modelo.respuesta(tipo, texto)
+        entrada = _bytes_contenido(contents) // 4 + 1
+        cacheados = 0
+        if getattr(config, "cached_content", None):
+            cacheados = 300
+            entrada += cacheados
+        return SimpleNamespace(
+            text=salida,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=entrada,
+                candidates_token_count=len(salida) // 4 + 1,
+                cached_content_token_count=cacheados or None,
+                thoughts_token_count=None,
+            ),
+        )
+
+
+class _FilesFalso:
+    def __init__(self, modelo: ModeloFalso):
+        self._modelo = modelo
+
+    def upload(self, file, config=None):
+        self._modelo.esperar("upload")
+        return SimpleNamespace(
+            name=f"files/falso-{self._modelo.nuevo_id()}",
+            mime_type=getattr(config, "mime_type", None),
+        )
+
+    def delete(self, name: str):
+        self._modelo.esperar("delete")
+
+
+class _CachesFalso:
+    def __init__(self, modelo: ModeloFalso):
+        self._modelo = modelo
+
+    def create(self, model: str, config):
+        return SimpleNamespace(name=self._modelo.crear_cache(config.system_instruction))
+
+    def update(self, name: str, config):
+        return SimpleNamespace(name=name)
+
+
+class ClienteFalso:
+    """Sustituto de google.genai.Client con la misma forma que usa gemini_service."""
+
+    def __init__(self, modelo: ModeloFalso):
+        self.models = _ModelsFalso(modelo)
+        self.files = _FilesFalso(modelo)
+        self.caches = _CachesFalso(modelo)
+
+
+def instalar(config: ConfigFalso | None = None) -> ModeloFalso:
+    """Sustituye el cliente de cada API key de gemini_service por uno falso."""
+    from services import gemini_service
+
+    modelo = ModeloFalso(config)
+    for clave in gemini_service.configurar().claves:
+        clave.client = ClienteFalso(modelo)
+    return modelo
@@ -0,0 +1,322 @@
+"""
+Reproduce tráfico grabado en producción (GRABACION_ACTIVA=1) sin red ni Gemini.
+
+Lanza las peticiones con los mismos instantes de llegada que la grabación, divididos
+por --velocidad (carga abierta: no espera a que termine una para lanzar la siguiente),
+y con cuerpos sintéticos del mismo tamaño, tipo y área. Por defecto el modelo es el
+backend replay, que devuelve las respuestas y latencias grabadas (también aceleradas);
+con --backend stub se usa el backend local.
+
+- --modo api (por defecto): peticiones HTTP a la app en proceso (ASGI) o a --url.
+- --modo servicio: llama directamente a services.backends, sin la capa HTTP.
+
+La latencia se mide desde el instante en que la petición debía salir, así que el
+retraso del propio generador también cuenta. El resultado se guarda en el mismo
+formato que run_benchmarks.py (concurrencia 0 = carga abierta) para usar compare.py.
+
+Uso:
+    uv run python -m benchmarks.replay .grabaciones --velocidad 4
+    uv run python -m benchmarks.replay .grabaciones/trafico-20250101-120000-42.jsonl.gz --modo servicio
+    uv run python -m benchmarks.replay .grabaciones --url http://localhost:8000 --salida replay.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+
+# La configuración tiene que estar lista antes de importar la app
+os.environ.setdefault("RATE_LIMIT_ACTIVO", "0")
+os.environ["GRABACION_ACTIVA"] = "0"
+
+import httpx
+
+from benchmarks.run_benchmarks import _commit_actual, _memoria_mb, _percentil
+from services.recording import leer_grabacion
+
+# Primeros bytes de cada formato, para que los cuerpos sintéticos pasen por el mismo
+# camino que los reales
+CABECERAS_FORMATO = {
+    "audio/wav": b"RIFF\x00\x00\x00\x00WAVEfmt ",
+    "audio/mpeg": b"ID3\x04\x00\x00",
+    "audio/ogg": b"OggS\x00\x02",
+    "image/png": b"\x89PNG\r\n\x1a\n",
+    "image/jpeg": b"\xff\xd8\xff\xe0",
+    "application/pdf": b"%PDF-1.7\n",
+}
+MIME_POR_EXTENSION = {
+    ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".pdf": "application/pdf",
+    ".txt": "text/plain", ".docx": "application/octet-stream", ".csv": "text/csv",
+}
+# Bytes que ocupa el envoltorio multipart alrededor del archivo
+SOBRECARGA_MULTIPART = 250
+
+
+def _contenido(tamano: int, mime: str) -> bytes:
+    cabecera = CABECERAS_FORMATO.get(mime, b"")
+    if mime.startswith("text/"):
+        relleno = b"El servidor reporta timeout intermitente en el disco. "
+        return (relleno * (tamano // len(relleno) + 1))[:max(1, tamano)]
+    return cabecera + b"\x00" * max(0, tamano - len(cabecera))
+
+
+def _texto(tamano: int, n: int) -> str:
+    base = f"Texto {n}: la ECU marca un fallo intermitente en el sensor de oxígeno. "
+    return (base * (tamano // len(base) + 1))[:max(10, tamano)]
+
+
+# ==========================
+# CONSTRUCCIÓN DE PETICIONES
+# ==========================
+def _peticion_http(evento: dict, llamadas: list[dict]) -> dict | None:
+    """Petición sintética equivalente a la grabada, o None si no se puede reproducir."""
+    ruta = evento.get("ruta", "")
+    if evento.get("metodo") != "POST" or "{" in ruta or ruta == "desconocida":
+        # Consultas de jobs por id, rutas inexistentes: dependen de estado que no se grabó
+        return None
+    area = evento.get("area")
+    llamada = llamadas[0] if llamadas else {}
+    cabeceras = {}
+    for nombre, campo in (("X-Priority", "prioridad"), ("X-Request-Timeout", "timeout")):
+        if evento.get(campo):
+            cabeceras[nombre] = evento[campo]
+
+    if ruta.endswith("/jargon/traducir/batch"):
+        textos = llamada.get("entrada") or [
+            _texto(evento["bytes"] // max(1, llamada.get("elementos", 10)), i)
+            for i in range(llamada.get("elementos", 10))
+        ]
+        return {"method": "POST", "url": ruta, "headers": cabeceras,
+                "json": {"items": [{"id": str(i), "texto": t} for i, t in enumerate(textos)],
+                         "area_oficio": area}}
+    if evento.get("tipo_contenido") == "application/json":
+        texto = llamada.get("entrada") or _texto(evento["bytes"] - 40, evento["id"])
+        return {"method": "POST", "url": ruta, "headers": cabeceras,
+                "json": {"texto": texto, "area_oficio": area}}
+    if evento.get("tipo_contenido") == "multipart/form-data":
+        if "/audio" in ruta:
+            mime = llamada.get("mime_type") or "audio/wav"
+            nombre = f"grabado{evento['id']}.wav"
+        else:
+            extension = llamada.get("extension") or (".png" if "/image/" in ruta else ".txt")
+            mime = MIME_POR_EXTENSION.get(extension, "application/octet-stream")
+            nombre = f"grabado{evento['id']}{extension}"
+        contenido = _contenido(evento["bytes"] - SOBRECARGA_MULTIPART, mime)
+        datos = {"area_oficio": area} if area else {}
+        return {"method": "POST", "url": ruta, "headers": cabeceras,
+                "files": {"file": (nombre, contenido, mime)}, "data": datos}
+    return None
+
+
+def _llamada_servicio(evento: dict):
+    """Función de services.backends y argumentos equivalentes a la llamada grabada."""
+    from services import backends
+
+    operacion, area, tamano = evento["operacion"], evento.get("area"), evento["bytes"]
+    if operacion == "stt":
+        mime = evento.get("mime_type") or "audio/wav"
+        return backends.transcribir_audio, (_contenido(tamano, mime), mime)
+    if operacion == "explicar":
+        return backends.explicar_jerga, (evento.get("entrada") or _texto(tamano, 0), area)
+    if operacion == "lote":
+        elementos = evento.get("elementos", 10)
+        textos = evento.get("entrada") or [_texto(tamano // elementos, i) for i in range(elementos)]
+        return backends.explicar_jerga_lote, (textos, area)
+    extension = evento.get("extension") or (".png" if operacion == "imagen" else ".txt")
+    contenido = _contenido(tamano, MIME_POR_EXTENSION.get(extension, "application/octet-stream"))
+    if operacion == "imagen":
+        return backends.analizar_imagen, (contenido, f"grabado{extension}", area)
+    return backends.analizar_archivo, (contenido, f"grabado{extension}", area)
+
+
+# ==========================
+# REPRODUCCIÓN
+# ==========================
+async def _reproducir(eventos: list[dict], lanzar, velocidad: float, max_en_vuelo: int) -> dict:
+    """
+    Lanza cada evento en su instante (t / velocidad) y devuelve, por clave, las
+    latencias de las correctas y los estados obtenidos.
+    """
+    bucle = asyncio.get_running_loop()
+    semaforo = asyncio.Semaphore(max_en_vuelo)
+    resultados: dict[str, dict] = {}
+    retraso_maximo = 0.0
+    origen = eventos[0]["t"] if eventos else 0.0
+    inicio = bucle.time()
+
+    async def ejecutar(clave: str, objetivo: float, evento: dict):
+        async with semaforo:
+            try:
+                estado = await lanzar(evento)
+            except Exception as e:
+                estado = type(e).__name__
+        latencia = bucle.time() - (inicio + objetivo)
+        resultado = resultados.setdefault(clave, {"latencias": [], "estados": {}, "grabadas": []})
+        resultado["estados"][estado] = resultado["estados"].get(estado, 0) + 1
+        resultado["grabadas"].append(evento.get("duracion", 0.0) / velocidad)
+        if estado.startswith("2") or estado == "ok":
+            resultado["latencias"].append(latencia)
+
+    tareas = []
+    for evento in eventos:
+        objetivo = (evento["t"] - origen) / velocidad
+        espera = objetivo - (bucle.time() - inicio)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        retraso_maximo = max(retraso_maximo, (bucle.time() - inicio) - objetivo)
+        clave = evento.get("ruta") or evento["operacion"]
+        tareas.append(asyncio.create_task(ejecutar(clave, objetivo, evento)))
+    await asyncio.gather(*tareas)
+    return {"resultados": resultados, "duracion": bucle.time() - inicio, "retraso_maximo": retraso_maximo}
+
+
+def _resumen(medicion: dict) -> list[dict]:
+    filas = []
+    for clave, datos in sorted(medicion["resultados"].items()):
+        total = sum(datos["estados"].values())
+        correctas = len(datos["latencias"])
+        filas.append({
+            "endpoint": clave,
+            "concurrencia": 0,
+            "peticiones": total,
+            "correctas": correctas,
+            "errores": total - correctas,
+            "estados": datos["estados"],
+            "duracion_segundos": round(medicion["duracion"], 3),
+            "throughput_rps": round(correctas / medicion["duracion"], 2) if medicion["duracion"] else None,
+            "p50_segundos": _percentil(datos["latencias"], 0.50),
+            "p95_segundos": _percentil(datos["latencias"], 0.95),
+            "p99_segundos": _percentil(datos["latencias"], 0.99),
+            # Lo que tardó la grabación original (ya dividido por la velocidad)
+            "p95_grabado_segundos": _percentil(datos["grabadas"], 0.95),
+        })
+    return filas
+
+
+async def _modo_api(args, peticiones: list[dict], llamadas: dict[int, list[dict]]) -> dict:
+    reproducibles = []
+    for evento in peticiones:
+        peticion = _peticion_http(evento, llamadas.get(evento["id"], []))
+        if peticion is not None:
+            reproducibles.append({**evento, "peticion": peticion})
+    omitidas = len(peticiones) - len(reproducibles)
+
+    limites = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(args.timeout)
+
+    def lanzar_con(cliente):
+        async def lanzar(evento):
+            respuesta = await cliente.request(**evento["peticion"])
+            return str(respuesta.status_code)
+        return lanzar
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=timeout) as cliente:
+            medicion = await _reproducir(
+                reproducibles, lanzar_con(cliente), args.velocidad, args.max_en_vuelo
+            )
+    else:
+        import main
+
+        transporte = httpx.ASGITransport(app=main.app)
+        async with main.lifespan(main.app), httpx.AsyncClient(
+            transport=transporte, base_url="http://replay", limits=limites, timeout=timeout
+        ) as cliente:
+            medicion = await _reproducir(
+                reproducibles, lanzar_con(cliente), args.velocidad, args.max_en_vuelo
+            )
+    medicion["omitidas"] = omitidas
+    return medicion
+
+
+async def _modo_servicio(args, llamadas: list[dict]) -> dict:
+    from services.backends import iniciar_backends
+
+    iniciar_backends()
+
+    async def lanzar(evento):
+        funcion, argumentos = _llamada_servicio(evento)
+        await asyncio.to_thread(funcion, *argumentos)
+        return "ok"
+
+    medicion = await _reproducir(llamadas, lanzar, args.velocidad, args.max_en_vuelo)
+    medicion["omitidas"] = 0
+    return medicion
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("grabacion", help="Archivo .jsonl.gz o directorio de grabaciones")
+    parser.add_argument("--modo", choices=("api", "servicio"), default="api")
+    parser.add_argument("--velocidad", type=float, default=1.0,
+                        help="Multiplicador de velocidad de llegadas y latencias grabadas")
+    parser.add_argument("--backend", choices=("replay", "stub"), default="replay")
+    parser.add_argument("--url", help="Con --modo api, atacar un servidor ya levantado")
+    parser.add_argument("--limite", type=int, help="Reproducir solo los primeros N eventos")
+    parser.add_argument("--max-en-vuelo", type=int, default=512,
+                        help="Tope de peticiones simultáneas del generador")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout de cada petición (s)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados "
+                        "(por defecto benchmarks/resultados/replay-<commit>.json)")
+    args = parser.parse_args()
+    if args.velocidad <= 0:
+        parser.error("--velocidad debe ser mayor que 0")
+
+    os.environ["MODELO_BACKEND"] = args.backend
+    os.environ["REPLAY_ARCHIVO"] = args.grabacion
+    os.environ["REPLAY_VELOCIDAD"] = str(args.velocidad)
+
+    eventos = list(leer_grabacion(args.grabacion))
+    peticiones = sorted((e for e in eventos if e["tipo"] == "peticion"), key=lambda e: e["t"])
+    modelo = sorted((e for e in eventos if e["tipo"] == "modelo"), key=lambda e: e["t"])
+    llamadas_por_peticion: dict[int, list[dict]] = {}
+    for llamada in modelo:
+        llamadas_por_peticion.setdefault(llamada["peticion"], []).append(llamada)
+    if args.limite:
+        peticiones, modelo = peticiones[:args.limite], modelo[:args.limite]
+    print(f"Grabación: {len(peticiones)} peticiones y {len(modelo)} llamadas al modelo")
+
+    if args.modo == "api":
+        medicion = asyncio.run(_modo_api(args, peticiones, llamadas_por_peticion))
+    else:
+        medicion = asyncio.run(_modo_servicio(args, modelo))
+
+    filas = _resumen(medicion)
+    memoria = _memoria_mb(None) if not args.url else {}
+    for fila in filas:
+        fila.update(memoria)
+        print(
+            f"{fila['endpoint']:>32} n={fila['peticiones']:<5} rps={fila['throughput_rps'] or 0:8.2f} "
+            f"p50={(fila['p50_segundos'] or 0) * 1000:8.1f}ms p95={(fila['p95_segundos'] or 0) * 1000:8.1f}ms "
+            f"(grabado {(fila['p95_grabado_segundos'] or 0) * 1000:8.1f}ms) errores={fila['errores']}"
+        )
+    print(f"Omitidas: {medicion['omitidas']}  retraso máximo del generador: "
+          f"{medicion['retraso_maximo'] * 1000:.1f} ms")
+
+    commit = _commit_actual()
+    salida = args.salida or os.path.join("benchmarks", "resultados", f"replay-{commit or 'sin-commit'}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "modo": f"replay-{args.modo}",
+                "backend": args.backend,
+                "grabacion": args.grabacion,
+                "velocidad": args.velocidad,
+                "omitidas": medicion["omitidas"],
+                "retraso_maximo_segundos": round(medicion["retraso_maximo"], 4),
+                "resultados": filas,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
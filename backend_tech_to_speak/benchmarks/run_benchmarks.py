@@ -0,0 +1,289 @@
+"""
+Benchmark de todos los endpoints contra el modelo Gemini falso.
+
+Para cada endpoint y cada nivel de concurrencia lanza un número fijo de peticiones
+y mide throughput, latencias p50/p95/p99, errores y memoria. El resultado se guarda
+en JSON con el commit actual, para comparar ejecuciones con benchmarks/compare.py.
+
+Por defecto la app corre en el mismo proceso (ASGI, sin red) con el modelo falso
+instalado en el backend Gemini, así que se mide toda la capa de resiliencia; con
+--backend stub se usa el backend local (sin colas, reintentos ni cachés de Gemini)
+y con --url se ataca un servidor ya levantado (la memoria solo se mide si se
+indica su --pid).
+
+Uso:
+    uv run python -m benchmarks.run_benchmarks
+    uv run python -m benchmarks.run_benchmarks --endpoints jargon,archivo --concurrencias 1,8,32
+    uv run python -m benchmarks.run_benchmarks --escala-tiempo 0.1 --tasa-errores 0.02 \\
+        --salida benchmarks/resultados/base.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+
+# El modelo falso no necesita API key, pero el backend Gemini exige una para arrancar.
+# El rate limit y la cuota por clave se desactivan para medir la app y no los limitadores.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_ACTIVO", "0")
+os.environ.setdefault("GEMINI_RPM_POR_CLAVE", "1000000")
+os.environ.setdefault("USO_FLUSH_SEGUNDOS", "0")
+
+import httpx
+
+from benchmarks.fake_gemini import LATENCIAS_POR_DEFECTO, ConfigFalso
+
+AUDIO_FALSO = b"RIFF" + b"\x00" * 32_000
+IMAGEN_FALSA = b"\x89PNG\r\n\x1a\n" + b"\x00" * 50_000
+DOCUMENTO_FALSO = ("Informe técnico: la ECU reporta el código P0300 en el OBD. " * 200).encode()
+
+
+# ==========================
+# ESCENARIOS
+# ==========================
+def _texto(n: int) -> str:
+    # Cada texto lleva un número distinto para que ninguna caché lo resuelva
+    return f"El servidor {n} devuelve timeout intermitente y el disco está al 97 por ciento"
+
+
+def _peticion(endpoint: str, n: int) -> dict:
+    if endpoint == "jargon":
+        return {"method": "POST", "url": "/api/v1/jargon/traducir",
+                "json": {"texto": _texto(n), "area_oficio": "TI"}}
+    if endpoint == "batch":
+        return {"method": "POST", "url": "/api/v1/jargon/traducir/batch",
+                "json": {"items": [{"id": str(i), "texto": _texto(n * 100 + i)} for i in range(20)],
+                         "area_oficio": "TI"}}
+    if endpoint == "stt":
+        return {"method": "POST", "url": "/api/v1/audio/stt",
+                "files": {"file": (f"audio{n}.wav", AUDIO_FALSO, "audio/wav")}}
+    if endpoint == "audio_explicar":
+        return {"method": "POST", "url": "/api/v1/audio/explicar",
+                "files": {"file": (f"audio{n}.wav", AUDIO_FALSO, "audio/wav")},
+                "data": {"area_oficio": "mecanica"}}
+    if endpoint == "imagen":
+        return {"method": "POST", "url": "/api/v1/image/traducir",
+                "files": {"file": (f"foto{n}.png", IMAGEN_FALSA, "image/png")},
+                "data": {"area_oficio": "mecanica"}}
+    if endpoint == "archivo":
+        return {"method": "POST", "url": "/api/v1/file/traducir",
+                "files": {"file": (f"informe{n}.txt", DOCUMENTO_FALSO, "text/plain")},
+                "data": {"area_oficio": "TI"}}
+    if endpoint == "job_archivo":
+        return {"method": "POST", "url": "/api/v1/jobs/archivo",
+                "files": {"file": (f"informe{n}.txt", DOCUMENTO_FALSO, "text/plain")},
+                "data": {"area_oficio": "TI"}}
+    raise ValueError(f"Endpoint desconocido: {endpoint}")
+
+
+ENDPOINTS = ("jargon", "batch", "stt", "audio_explicar", "imagen", "archivo", "job_archivo")
+
+
+# ==========================
+# MEDICIÓN
+# ==========================
+def _percentil(valores: list[float], p: float) -> float | None:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def _memoria_mb(pid: int | None) -> dict:
+    """RSS actual y pico del proceso (Linux: /proc), o None si no se puede leer."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            campos = dict(linea.split(":", 1) for linea in f if ":" in linea)
+        return {
+            "rss_mb": round(int(campos["VmRSS"].split()[0]) / 1024, 1),
+            "rss_pico_mb": round(int(campos["VmHWM"].split()[0]) / 1024, 1),
+        }
+    except (OSError, KeyError, ValueError):
+        if pid is None:
+            import resource
+
+            pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # macOS lo da en bytes y Linux en KiB
+            divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+            return {"rss_mb": None, "rss_pico_mb": round(pico / divisor, 1)}
+        return {"rss_mb": None, "rss_pico_mb": None}
+
+
+async def _medir_nivel(
+    cliente: httpx.AsyncClient, endpoint: str, concurrencia: int, peticiones: int, contador
+) -> dict:
+    latencias: list[float] = []
+    estados: dict[str, int] = {}
+    pendientes = iter(range(peticiones))
+
+    async def trabajador():
+        for _ in pendientes:
+            peticion = _peticion(endpoint, next(contador))
+            inicio = time.perf_counter()
+            try:
+                respuesta = await cliente.request(**peticion)
+                estado = str(respuesta.status_code)
+            except httpx.HTTPError as e:
+                estado = type(e).__name__
+            duracion = time.perf_counter() - inicio
+            estados[estado] = estados.get(estado, 0) + 1
+            if estado.startswith("2"):
+                latencias.append(duracion)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    total = time.perf_counter() - inicio
+
+    correctas = len(latencias)
+    return {
+        "endpoint": endpoint,
+        "concurrencia": concurrencia,
+        "peticiones": peticiones,
+        "correctas": correctas,
+        "errores": peticiones - correctas,
+        "estados": estados,
+        "duracion_segundos": round(total, 3),
+        "throughput_rps": round(correctas / total, 2) if total else None,
+        "p50_segundos": _percentil(latencias, 0.50),
+        "p95_segundos": _percentil(latencias, 0.95),
+        "p99_segundos": _percentil(latencias, 0.99),
+    }
+
+
+async def _ejecutar(args, config: ConfigFalso) -> list[dict]:
+    contador = itertools.count()
+    resultados = []
+    limites = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=timeout) as cliente:
+            for endpoint in args.endpoints:
+                for concurrencia in args.concurrencias:
+                    resultado = await _medir_nivel(
+                        cliente, endpoint, concurrencia, args.peticiones, contador
+                    )
+                    resultado.update(_memoria_mb(args.pid) if args.pid else {})
+                    resultados.append(resultado)
+                    _imprimir(resultado)
+        return resultados
+
+    from benchmarks.fake_gemini import instalar
+    import main
+
+    if args.backend == "falso":
+        instalar(config)
+    transporte = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app), httpx.AsyncClient(
+        transport=transporte, base_url="http://benchmark", limits=limites, timeout=timeout
+    ) as cliente:
+        for endpoint in args.endpoints:
+            for concurrencia in args.concurrencias:
+                resultado = await _medir_nivel(
+                    cliente, endpoint, concurrencia, args.peticiones, contador
+                )
+                resultado.update(_memoria_mb(None))
+                resultados.append(resultado)
+                _imprimir(resultado)
+    return resultados
+
+
+def _imprimir(resultado: dict) -> None:
+    def ms(valor):
+        return f"{valor * 1000:8.1f}" if valor is not None else "       -"
+
+    print(
+        f"{resultado['endpoint']:>15} c={resultado['concurrencia']:<4} "
+        f"rps={resultado['throughput_rps'] or 0:8.2f} "
+        f"p50={ms(resultado['p50_segundos'])}ms p95={ms(resultado['p95_segundos'])}ms "
+        f"p99={ms(resultado['p99_segundos'])}ms errores={resultado['errores']} "
+        f"rss={resultado.get('rss_mb')}MB",
+        flush=True,
+    )
+
+
+def _commit_actual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Lista separada por comas de: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrencias", default="1,4,16,64",
+                        help="Niveles de concurrencia, separados por comas")
+    parser.add_argument("--peticiones", type=int, default=100, help="Peticiones por endpoint y nivel")
+    parser.add_argument("--backend", choices=("falso", "stub"), default="falso",
+                        help="falso: backend Gemini con el modelo falso; stub: backend local")
+    parser.add_argument("--url", help="Atacar un servidor ya levantado en vez de la app en proceso")
+    parser.add_argument("--pid", type=int, help="Con --url, PID del servidor para medir su memoria")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout de cada petición (s)")
+    parser.add_argument("--latencia", action="append", default=[],
+                        help='Latencia del modelo falso, "dist:params" o "tipo=dist:params" (repetible)')
+    parser.add_argument("--tasa-errores", type=float, default=0.0)
+    parser.add_argument("--tamano-salida", type=int, default=400)
+    parser.add_argument("--escala-tiempo", type=float, default=1.0,
+                        help="Multiplica las latencias del modelo falso (0.1 = diez veces más rápido)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Archivo JSON de resultados "
+                        "(por defecto benchmarks/resultados/<commit>.json)")
+    args = parser.parse_args()
+
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    desconocidos = set(args.endpoints) - set(ENDPOINTS)
+    if desconocidos:
+        parser.error(f"Endpoints desconocidos: {', '.join(sorted(desconocidos))}")
+    args.concurrencias = [int(c) for c in args.concurrencias.split(",")]
+    if args.backend == "stub":
+        os.environ["MODELO_BACKEND"] = "stub"
+
+    latencias = dict(LATENCIAS_POR_DEFECTO)
+    for especificacion in args.latencia:
+        tipo, _, distribucion = especificacion.rpartition("=")
+        latencias[tipo or "*"] = distribucion
+    config = ConfigFalso(
+        latencias=latencias,
+        tasa_errores=args.tasa_errores,
+        tamano_salida=args.tamano_salida,
+        escala_tiempo=args.escala_tiempo,
+        semilla=args.semilla,
+    )
+
+    resultados = asyncio.run(_ejecutar(args, config))
+
+    commit = _commit_actual()
+    salida = args.salida or os.path.join("benchmarks", "resultados", f"{commit or 'sin-commit'}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "modo": "url" if args.url else "asgi",
+                "backend": None if args.url else args.backend,
+                "modelo_falso": asdict(config) if not args.url and args.backend == "falso" else None,
+                "resultados": resultados,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
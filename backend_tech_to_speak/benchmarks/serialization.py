@@ -0,0 +1,169 @@
+"""
+Benchmark de la serialización de respuestas con textos extraídos grandes.
+
+Mide, para varios tamaños de texto_extraido, el tiempo por respuesta y el pico de
+memoria asignada (tracemalloc) de cada forma de devolver un resultado:
+
+- dict_json / dict_orjson: endpoint que devuelve un dict (como /api/v1/audio/*) con la
+  clase de respuesta por defecto de FastAPI o con RespuestaJSON.
+- modelo_json / modelo_orjson: endpoint con response_model (como /api/v1/file/traducir).
+  Con la clase por defecto de FastAPI, Pydantic serializa el modelo directamente a
+  bytes; con RespuestaJSON, FastAPI lo pasa a dict y lo codifica orjson.
+- job_json / job_orjson: guardar y leer el resultado de un job (services.jobs)
+  codificándolo con json.dumps o con a_json.
+
+Los endpoints se llaman por ASGI directamente, sin red ni cliente HTTP, para medir
+solo validación y codificación. El modelo devuelto ya viene validado: FastAPI no
+lo vuelve a validar (Pydantic no revalida instancias), solo lo serializa.
+
+Uso:
+    uv run python -m benchmarks.serialization
+    uv run python -m benchmarks.serialization --tamanos 20000,2000000 --salida /tmp/serializacion.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import time
+import tracemalloc
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+
+from benchmarks.run_benchmarks import _commit_actual
+from controllers.responses import RespuestaJSON
+from models.file_models import FileExplainResponse
+from services.serialization import a_json
+
+FRAGMENTO = "Presión de aceite baja (0,8 bar) en el cárter; revisar la bomba y el filtro. "
+
+
+def _resultado(tamano: int) -> dict:
+    return {
+        "nombre_archivo": "informe.pdf",
+        "mime_type": "application/pdf",
+        "texto_extraido": (FRAGMENTO * (tamano // len(FRAGMENTO) + 1))[:tamano],
+        "explicacion_clara": "La presión de aceite está por debajo de lo normal. " * 10,
+        "acciones_sugeridas": ["Revisar el nivel de aceite", "Cambiar el filtro", "Probar la bomba"],
+        "nivel_urgencia": "alta",
+    }
+
+
+def _app(datos: dict, clase_respuesta: type[JSONResponse]) -> FastAPI:
+    router = APIRouter()
+
+    @router.post("/dict")
+    async def como_dict():
+        return dict(datos)
+
+    @router.post("/modelo", response_model=FileExplainResponse)
+    async def como_modelo():
+        return FileExplainResponse(**datos)
+
+    if clase_respuesta is JSONResponse:
+        # Sin clase por defecto explícita, como antes de RespuestaJSON
+        app = FastAPI()
+    else:
+        app = FastAPI(default_response_class=clase_respuesta)
+    app.include_router(router)
+    return app
+
+
+async def _llamar(app: FastAPI, ruta: str) -> bytes:
+    cuerpo = []
+
+    async def recibir():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensaje):
+        if mensaje["type"] == "http.response.body":
+            cuerpo.append(mensaje.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": ruta, "raw_path": ruta.encode(), "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80), "root_path": "",
+    }
+    await app(scope, recibir, enviar)
+    return b"".join(cuerpo)
+
+
+def _job_json(datos: dict) -> dict:
+    return json.loads(json.dumps(datos, ensure_ascii=False))
+
+
+def _job_orjson(datos: dict) -> dict:
+    return json.loads(a_json(datos).decode())
+
+
+async def _medir(llamada, segundos: float) -> dict:
+    """Tiempo medio por llamada durante `segundos` y pico de memoria de una llamada."""
+    await llamada()
+    repeticiones = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        await llamada()
+        repeticiones += 1
+    duracion = (time.perf_counter() - inicio) / max(1, repeticiones)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    await llamada()
+    pico = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return {"microsegundos": round(duracion * 1e6, 1), "pico_kib": round(pico / 1024, 1)}
+
+
+async def _ejecutar(tamanos: list[int], segundos: float) -> list[dict]:
+    resultados = []
+    for tamano in tamanos:
+        datos = _resultado(tamano)
+        casos = {}
+        for sufijo, clase in (("json", JSONResponse), ("orjson", RespuestaJSON)):
+            app = _app(datos, clase)
+            for ruta in ("dict", "modelo"):
+                casos[f"{ruta}_{sufijo}"] = lambda app=app, ruta=ruta: _llamar(app, f"/{ruta}")
+
+        async def job_json():
+            return _job_json(datos)
+
+        async def job_orjson():
+            return _job_orjson(datos)
+
+        casos.update(job_json=job_json, job_orjson=job_orjson)
+        for caso, llamada in casos.items():
+            medida = await _medir(llamada, segundos)
+            resultado = {"caso": caso, "tamano": tamano, **medida}
+            resultados.append(resultado)
+            print(
+                f"{tamano:>9} {caso:>15} {medida['microsegundos']:>10.1f} µs "
+                f"pico={medida['pico_kib']:>9.1f} KiB",
+                flush=True,
+            )
+    return resultados
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", default="20000,200000,2000000",
+                        help="Caracteres de texto_extraido, separados por comas")
+    parser.add_argument("--segundos", type=float, default=1.0, help="Tiempo de medida por caso")
+    parser.add_argument("--salida", help="Guardar los resultados en este JSON")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(
+        _ejecutar([int(t) for t in args.tamanos.split(",")], args.segundos)
+    )
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": _commit_actual(),
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Benchmark del servidor de producción (server.py) frente al modo de desarrollo
+(`uvicorn main:app --reload`, un solo worker).
+
+Levanta cada modo como un proceso aparte con el backend local (stub) y una latencia
+de modelo fija, lanza las mismas peticiones por HTTP real y mide throughput, latencias
+p50/p95/p99 y la memoria de todo el árbol de procesos: RSS (cuenta varias veces las
+páginas compartidas) y PSS (las reparte entre los procesos que las comparten, así que
+refleja lo que ahorra la precarga con copy-on-write).
+
+Con --drenaje, además, envía SIGTERM al servidor con peticiones en curso y cuenta
+cuántas terminan bien.
+
+Uso:
+    uv run python -m benchmarks.server_modes
+    uv run python -m benchmarks.server_modes --workers 4 --endpoints jargon,archivo --drenaje
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.run_benchmarks import ENDPOINTS, _commit_actual, _medir_nivel, _peticion
+
+MODOS = ("desarrollo", "produccion")
+
+
+# ==========================
+# PROCESOS
+# ==========================
+def _comando(modo: str, puerto: int) -> list[str]:
+    if modo == "desarrollo":
+        # El comando que documenta el README para desarrollo
+        return [sys.executable, "-m", "uvicorn", "main:app", "--reload",
+                "--port", str(puerto), "--log-level", "warning"]
+    return [sys.executable, "server.py"]
+
+
+def _entorno(args, puerto: int, jobs_dir: str) -> dict:
+    return {
+        **os.environ,
+        "MODELO_BACKEND": "stub",
+        "STUB_LATENCIA_SEGUNDOS": str(args.latencia),
+        "RATE_LIMIT_ACTIVO": "0",
+        "GRABACION_ACTIVA": "0",
+        "USO_FLUSH_SEGUNDOS": "0",
+        "JOBS_DIR": jobs_dir,
+        "SERVIDOR_PUERTO": str(puerto),
+        "SERVIDOR_WORKERS": str(args.workers),
+    }
+
+
+def _arbol(pid: int) -> list[int]:
+    """El proceso y todos sus descendientes (Linux: /proc)."""
+    pids = [pid]
+    for actual in pids:
+        try:
+            for tarea in os.listdir(f"/proc/{actual}/task"):
+                with open(f"/proc/{actual}/task/{tarea}/children") as f:
+                    pids.extend(int(hijo) for hijo in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def _memoria_arbol_mb(pid: int) -> dict:
+    """RSS y PSS sumados sobre el árbol de procesos, o None si no se pueden leer."""
+    rss = pss = 0
+    try:
+        for proceso in _arbol(pid):
+            with open(f"/proc/{proceso}/smaps_rollup") as f:
+                campos = dict(linea.split(":", 1) for linea in f if ":" in linea)
+            rss += int(campos["Rss"].split()[0])
+            pss += int(campos["Pss"].split()[0])
+    except (OSError, KeyError, ValueError):
+        return {"procesos": None, "rss_mb": None, "pss_mb": None}
+    return {"procesos": len(_arbol(pid)), "rss_mb": round(rss / 1024, 1), "pss_mb": round(pss / 1024, 1)}
+
+
+async def _esperar_listo(url: str, proceso: subprocess.Popen, segundos: float) -> None:
+    limite = time.monotonic() + segundos
+    async with httpx.AsyncClient(base_url=url, timeout=2) as cliente:
+        while time.monotonic() < limite:
+            if proceso.poll() is not None:
+                raise RuntimeError(f"El servidor terminó al arrancar (código {proceso.returncode})")
+            try:
+                if (await cliente.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {segundos} s")
+
+
+def _detener(proceso: subprocess.Popen) -> int | None:
+    if proceso.poll() is None:
+        proceso.send_signal(signal.SIGTERM)
+    try:
+        return proceso.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        proceso.kill()
+        proceso.wait()
+        return None
+
+
+# ==========================
+# MEDICIÓN
+# ==========================
+async def _drenaje(cliente: httpx.AsyncClient, proceso: subprocess.Popen, peticiones: int, contador) -> dict:
+    """Lanza peticiones, envía SIGTERM con todas en curso y cuenta las que terminan bien."""
+    tareas = [
+        asyncio.create_task(cliente.request(**_peticion("jargon", next(contador))))
+        for _ in range(peticiones)
+    ]
+    await asyncio.sleep(0.5)
+    proceso.send_signal(signal.SIGTERM)
+    respuestas = await asyncio.gather(*tareas, return_exceptions=True)
+    correctas = sum(
+        1 for r in respuestas if isinstance(r, httpx.Response) and r.status_code == 200
+    )
+    return {"peticiones": peticiones, "correctas": correctas, "codigo_salida": _detener(proceso)}
+
+
+async def _medir_modo(args, modo: str, puerto: int, contador) -> dict:
+    url = f"http://127.0.0.1:{puerto}"
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        proceso = subprocess.Popen(_comando(modo, puerto), env=_entorno(args, puerto, jobs_dir))
+        try:
+            await _esperar_listo(url, proceso, args.arranque)
+            resultado = {"modo": modo, "memoria_inicial": _memoria_arbol_mb(proceso.pid), "niveles": []}
+            limites = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+            async with httpx.AsyncClient(base_url=url, limits=limites, timeout=args.timeout) as cliente:
+                for endpoint in args.endpoints:
+                    for concurrencia in args.concurrencias:
+                        nivel = await _medir_nivel(
+                            cliente, endpoint, concurrencia, args.peticiones, contador
+                        )
+                        nivel.update(_memoria_arbol_mb(proceso.pid))
+                        resultado["niveles"].append(nivel)
+                        _imprimir(modo, nivel)
+                if args.drenaje:
+                    resultado["drenaje"] = await _drenaje(cliente, proceso, args.drenaje, contador)
+                    print(f"{modo:>11} drenaje: {resultado['drenaje']}", flush=True)
+            return resultado
+        finally:
+            _detener(proceso)
+
+
+def _imprimir(modo: str, nivel: dict) -> None:
+    def ms(valor):
+        return f"{valor * 1000:8.1f}" if valor is not None else "       -"
+
+    print(
+        f"{modo:>11} {nivel['endpoint']:>10} c={nivel['concurrencia']:<4} "
+        f"rps={nivel['throughput_rps'] or 0:8.2f} p50={ms(nivel['p50_segundos'])}ms "
+        f"p99={ms(nivel['p99_segundos'])}ms errores={nivel['errores']} "
+        f"pss={nivel.get('pss_mb')}MB",
+        flush=True,
+    )
+
+
+def _tabla(resultados: list[dict]) -> None:
+    """Los dos modos lado a lado para cada endpoint y nivel de concurrencia."""
+    desarrollo, produccion = resultados
+    print(f"\n{'endpoint':>10} {'c':>4} {'rps dev':>9} {'rps prod':>9} {'p99 dev':>9} {'p99 prod':>9}")
+    for a, b in zip(desarrollo["niveles"], produccion["niveles"]):
+        print(
+            f"{a['endpoint']:>10} {a['concurrencia']:>4} {a['throughput_rps'] or 0:>9.1f} "
+            f"{b['throughput_rps'] or 0:>9.1f} {(a['p99_segundos'] or 0) * 1000:>7.1f}ms "
+            f"{(b['p99_segundos'] or 0) * 1000:>7.1f}ms"
+        )
+    for resultado in resultados:
+        memoria = resultado["memoria_inicial"]
+        print(f"{resultado['modo']:>11}: {memoria['procesos']} procesos, "
+              f"RSS {memoria['rss_mb']} MB, PSS {memoria['pss_mb']} MB al arrancar")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default="jargon,archivo,stt",
+                        help=f"Lista separada por comas de: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrencias", default="1,16,64",
+                        help="Niveles de concurrencia, separados por comas")
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones por endpoint y nivel")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Workers del servidor de producción (0: uno por núcleo)")
+    parser.add_argument("--latencia", type=float, default=0.05,
+                        help="Latencia simulada del backend stub por llamada (s)")
+    parser.add_argument("--drenaje", type=int, default=0,
+                        help="Peticiones en curso al enviar SIGTERM (0: no se prueba el apagado)")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--arranque", type=float, default=60, help="Espera máxima al arranque (s)")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout de cada petición (s)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados "
+                        "(por defecto benchmarks/resultados/servidor-<commit>.json)")
+    args = parser.parse_args()
+
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    desconocidos = set(args.endpoints) - set(ENDPOINTS)
+    if desconocidos:
+        parser.error(f"Endpoints desconocidos: {', '.join(sorted(desconocidos))}")
+    args.concurrencias = [int(c) for c in args.concurrencias.split(",")]
+
+    contador = itertools.count()
+    resultados = [
+        asyncio.run(_medir_modo(args, modo, args.puerto + i, contador))
+        for i, modo in enumerate(MODOS)
+    ]
+    _tabla(resultados)
+
+    commit = _commit_actual()
+    salida = args.salida or os.path.join(
+        "benchmarks", "resultados", f"servidor-{commit or 'sin-commit'}.json"
+    )
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "nucleos": os.cpu_count(),
+                "latencia_stub_segundos": args.latencia,
+                "resultados": resultados,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
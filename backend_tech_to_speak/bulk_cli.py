@@ -0,0 +1,280 @@
+"""
+Procesamiento masivo sin pasar por la API HTTP.
+
+Recorre un directorio (audios, imágenes y documentos) o lee un JSONL
+({"id": ..., "texto": ...} o {"id": ..., "ruta": ...}), reparte el trabajo entre
+varios procesos reutilizando el backend de modelo configurado (MODELO_BACKEND) y va escribiendo los resultados en
+JSONL o Parquet. Un archivo .checkpoint junto a la salida guarda los elementos
+terminados, así que una ejecución interrumpida se retoma sin repetirlos. Los fallidos
+van aparte, a <salida>.errores.jsonl, y se reintentan en la siguiente ejecución.
+
+Uso:
+    uv run python bulk_cli.py --dir ./archivo --salida resultados.jsonl --area mecanica
+    uv run python bulk_cli.py --jsonl notas.jsonl --salida resultados.parquet --procesos 8
+"""
+import argparse
+import json
+import mimetypes
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator
+
+from dotenv import load_dotenv
+
+# Antes de importar los servicios: su configuración se lee del entorno al importarlos
+load_dotenv()
+
+from controllers.file_controller import ALLOWED_EXTENSIONS
+
+EXTENSIONES_AUDIO = {".wav", ".mp3", ".ogg", ".m4a", ".webm", ".flac", ".aac"}
+EXTENSIONES_IMAGEN = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
+
+# Semáforo compartido entre procesos que acota las llamadas simultáneas al modelo
+_semaforo_upstream = None
+
+
+# ==========================
+# ENTRADAS
+# ==========================
+def _elementos_directorio(directorio: str) -> Iterator[dict]:
+    soportadas = EXTENSIONES_AUDIO | EXTENSIONES_IMAGEN | ALLOWED_EXTENSIONS
+    for raiz, _, nombres in os.walk(directorio):
+        for nombre in sorted(nombres):
+            if os.path.splitext(nombre)[1].lower() not in soportadas:
+                continue
+            ruta = os.path.join(raiz, nombre)
+            yield {"id": os.path.relpath(ruta, directorio), "ruta": ruta}
+
+
+def _elementos_jsonl(path: str) -> Iterator[dict]:
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8") as f:
+        for numero, linea in enumerate(f, start=1):
+            if not linea.strip():
+                continue
+            elemento = json.loads(linea)
+            elemento.setdefault("id", str(numero))
+            elemento["id"] = str(elemento["id"])
+            if "ruta" in elemento and not os.path.isabs(elemento["ruta"]):
+                elemento["ruta"] = os.path.join(base, elemento["ruta"])
+            yield elemento
+
+
+# ==========================
+# PROCESAMIENTO (en los procesos hijos)
+# ==========================
+def _inicializar_proceso(semaforo) -> None:
+    global _semaforo_upstream
+    _semaforo_upstream = semaforo
+
+
+def _procesar(elemento: dict, area_oficio: str | None) -> dict:
+    # Import diferido: cada proceso hijo crea su propio backend (y pool de claves)
+    from services import backends
+
+    inicio = time.monotonic()
+    area = elemento.get("area_oficio") or area_oficio
+    fila = {"id": elemento["id"], "fuente": elemento.get("ruta", "texto")}
+    try:
+        with _semaforo_upstream:
+            if "texto" in elemento:
+                resultado = backends.explicar_jerga(elemento["texto"], area)
+            else:
+                with open(elemento["ruta"], "rb") as f:
+                    contenido = f.read()
+                nombre = os.path.basename(elemento["ruta"])
+                extension = os.path.splitext(nombre)[1].lower()
+                if extension in EXTENSIONES_AUDIO:
+                    mime_type = mimetypes.guess_type(nombre)[0] or "audio/wav"
+                    texto = backends.transcribir_audio(contenido, mime_type)
+                    resultado = {
+                        "texto_transcrito": texto,
+                        **backends.explicar_jerga(texto, area),
+                    }
+                elif extension in EXTENSIONES_IMAGEN:
+                    resultado = backends.analizar_imagen(contenido, nombre, area)
+                else:
+                    resultado = backends.analizar_archivo(contenido, nombre, area)
+        fila.update(estado="ok", resultado=resultado, error=None)
+    except Exception as e:
+        fila.update(estado="error", resultado=None, error=str(e))
+    fila["segundos"] = round(time.monotonic() - inicio, 3)
+    return fila
+
+
+# ==========================
+# SALIDAS
+# ==========================
+class EscritorJSONL:
+    """Escribe una línea por resultado; cada línea queda confirmada al escribirse."""
+
+    def __init__(self, path: str, modo: str = "a"):
+        self._f = open(path, modo, encoding="utf-8")
+
+    def escribir(self, fila: dict) -> list[str]:
+        self._f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+        self._f.flush()
+        return [fila["id"]]
+
+    def cerrar(self) -> list[str]:
+        self._f.close()
+        return []
+
+
+class EscritorParquet:
+    """
+    Escribe un archivo Parquet por cada `filas_por_parte` resultados dentro del
+    directorio de salida. Un Parquet a medio escribir no es legible, así que los
+    resultados solo se confirman cuando se cierra su parte.
+    """
+
+    def __init__(self, directorio: str, filas_por_parte: int):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            sys.exit("❌ La salida Parquet requiere el paquete 'pyarrow' (uv add pyarrow)")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.directorio = directorio
+        self.filas_por_parte = filas_por_parte
+        os.makedirs(directorio, exist_ok=True)
+        self._pendientes: list[dict] = []
+
+    def escribir(self, fila: dict) -> list[str]:
+        self._pendientes.append(fila)
+        if len(self._pendientes) >= self.filas_por_parte:
+            return self._volcar()
+        return []
+
+    def _volcar(self) -> list[str]:
+        if not self._pendientes:
+            return []
+        columnas = {
+            "id": [f["id"] for f in self._pendientes],
+            "fuente": [f["fuente"] for f in self._pendientes],
+            "estado": [f["estado"] for f in self._pendientes],
+            # El resultado varía por tipo de entrada: se guarda como JSON
+            "resultado": [
+                json.dumps(f["resultado"], ensure_ascii=False) if f["resultado"] else None
+                for f in self._pendientes
+            ],
+            "error": [f["error"] for f in self._pendientes],
+            "segundos": [f["segundos"] for f in self._pendientes],
+        }
+        nombre = f"part-{time.time_ns()}.parquet"
+        temporal = os.path.join(self.directorio, "." + nombre)
+        self._pq.write_table(self._pa.table(columnas), temporal)
+        os.replace(temporal, os.path.join(self.directorio, nombre))
+        ids = columnas["id"]
+        self._pendientes = []
+        return ids
+
+    def cerrar(self) -> list[str]:
+        return self._volcar()
+
+
+def _leer_checkpoint(path: str) -> set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {linea.rstrip("\n") for linea in f if linea.strip()}
+
+
+# ==========================
+# ORQUESTACIÓN
+# ==========================
+def ejecutar(args: argparse.Namespace) -> int:
+    if args.salida.endswith(".parquet"):
+        escritor = EscritorParquet(args.salida, args.filas_por_parte)
+    else:
+        escritor = EscritorJSONL(args.salida)
+
+    path_checkpoint = args.salida.rstrip("/") + ".checkpoint"
+    terminados = _leer_checkpoint(path_checkpoint)
+    checkpoint = open(path_checkpoint, "a", encoding="utf-8")
+    # Los fallidos no entran en la salida (así cada id aparece una sola vez) ni en el
+    # checkpoint. Como todos se reintentan, el archivo de errores se reescribe entero
+    # en cada ejecución y solo contiene los que siguen fallando
+    errores_jsonl = EscritorJSONL(args.salida.rstrip("/") + ".errores.jsonl", modo="w")
+
+    def confirmar(ids: list[str]) -> None:
+        for id_ in ids:
+            checkpoint.write(id_ + "\n")
+        checkpoint.flush()
+
+    elementos = _elementos_directorio(args.dir) if args.dir else _elementos_jsonl(args.jsonl)
+    elementos = (e for e in elementos if e["id"] not in terminados)
+
+    contexto = multiprocessing.get_context("spawn")
+    semaforo = contexto.BoundedSemaphore(args.concurrencia_upstream)
+    # Ventana de trabajos en vuelo: no encolamos todo el corpus de golpe
+    max_en_vuelo = args.procesos * 4
+    procesados = errores = 0
+    inicio = time.monotonic()
+
+    with ProcessPoolExecutor(
+        max_workers=args.procesos,
+        mp_context=contexto,
+        initializer=_inicializar_proceso,
+        initargs=(semaforo,),
+    ) as executor:
+        en_vuelo = set()
+        agotados = False
+        while en_vuelo or not agotados:
+            while not agotados and len(en_vuelo) < max_en_vuelo:
+                elemento = next(elementos, None)
+                if elemento is None:
+                    agotados = True
+                    break
+                en_vuelo.add(executor.submit(_procesar, elemento, args.area))
+
+            if not en_vuelo:
+                break
+            hechas, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futura in hechas:
+                fila = futura.result()
+                procesados += 1
+                if fila["estado"] == "error":
+                    errores += 1
+                    errores_jsonl.escribir(fila)
+                    print(f"⚠️ {fila['id']}: {fila['error']}", file=sys.stderr)
+                else:
+                    confirmar(escritor.escribir(fila))
+
+    confirmar(escritor.cerrar())
+    checkpoint.close()
+    errores_jsonl.cerrar()
+
+    duracion = time.monotonic() - inicio
+    print(
+        f"✅ {procesados} procesados ({errores} con error, {len(terminados)} ya hechos) "
+        f"en {duracion:.1f} s"
+    )
+    return 1 if errores else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Procesamiento masivo con el backend de modelo")
+    entrada = parser.add_mutually_exclusive_group(required=True)
+    entrada.add_argument("--dir", help="Directorio con audios, imágenes y documentos")
+    entrada.add_argument("--jsonl", help="JSONL con {id, texto} o {id, ruta} por línea")
+    parser.add_argument("--salida", required=True, help="Archivo .jsonl o directorio .parquet")
+    parser.add_argument("--area", default=None, help="area_oficio por defecto")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 4)
+    parser.add_argument(
+        "--concurrencia-upstream", type=int, default=8,
+        help="Máximo de llamadas simultáneas al modelo entre todos los procesos",
+    )
+    parser.add_argument(
+        "--filas-por-parte", type=int, default=500,
+        help="Resultados por archivo en la salida Parquet",
+    )
+    sys.exit(ejecutar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from services.usage import (
+    PRECIO_CACHEADO_POR_MILLON,
+    PRECIO_ENTRADA_POR_MILLON,
+    PRECIO_SALIDA_POR_MILLON,
+    contabilidad,
+)
+
+router = APIRouter()
+
+# Los endpoints de administración exigen la cabecera X-Admin-Token con este valor;
+# sin ADMIN_TOKEN están cerrados (exponen IPs, hashes de API keys y gasto)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+DIMENSIONES_USO = ("operacion", "area", "cliente")
+
+
+def verificar_admin(x_admin_token: str | None = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail="Los endpoints de administración están desactivados: define ADMIN_TOKEN",
+        )
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="X-Admin-Token inválido")
+
+
+@router.get("/uso", dependencies=[Depends(verificar_admin)])
+def obtener_uso(agrupar_por: str = "operacion,area,cliente"):
+    """
+    Tokens y costo estimado desde el arranque, agrupados por las dimensiones indicadas
+    (operacion, area, cliente) y ordenados de mayor a menor costo.
+    """
+    dimensiones = tuple(d.strip() for d in agrupar_por.split(",") if d.strip())
+    invalidas = [d for d in dimensiones if d not in DIMENSIONES_USO]
+    if invalidas or not dimensiones:
+        raise HTTPException(
+            status_code=400,
+            detail=f"agrupar_por admite: {', '.join(DIMENSIONES_USO)}",
+        )
+
+    return {
+        "precios_usd_por_millon": {
+            "entrada": PRECIO_ENTRADA_POR_MILLON,
+            "salida": PRECIO_SALIDA_POR_MILLON,
+            "cacheados": PRECIO_CACHEADO_POR_MILLON,
+        },
+        "grupos": contabilidad.resumen(dimensiones),
+    }
@@ -1,5 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from services.gemini_service import transcribir_audio, explicar_jerga
+from starlette.concurrency import run_in_threadpool
+from services.circuit_breaker import CircuitoAbiertoError
+from services.deadline import DeadlineExcedidoError
+from services.backends import transcribir_audio, explicar_jerga
+from services.tracing import span
 import time
 router = APIRouter()
 
@@ -13,13 +17,15 @@ async def audio_to_text(file: UploadFile = File(...)):
     """
     start_time = time.time()
     try:
-        audio_bytes = await file.read()
+        with span("leer_archivo", **{"tts.mime_type": file.content_type}) as traza:
+            audio_bytes = await file.read()
+            traza.set_attribute("tts.tamano_bytes", len(audio_bytes))
         if not audio_bytes:
             raise HTTPException(status_code=400, detail="El archivo de audio está vacío.")
 
         mime_type = file.content_type or "audio/wav"
 
-        texto = transcribir_audio(audio_bytes, mime_type)
+        texto = await run_in_threadpool(transcribir_audio, audio_bytes, mime_type)
         elapsed_time = round(time.time() - start_time, 3)
 
         return {
@@ -31,6 +37,12 @@ async def audio_to_text(file: UploadFile = File(...)):
 
     except HTTPException:
         raise
+    except CircuitoAbiertoError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.segundos_reintento)}
+        )
+    except DeadlineExcedidoError as e:
+        raise HTTPException(status_code=504, detail=f"Tiempo de espera agotado al transcribir audio: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al transcribir audio: {e}")
 
@@ -51,17 +63,19 @@ async def audio_to_explained_jargon(
     con lista de acciones y nivel de urgencia.
     """
     try:
-        audio_bytes = await file.read()
+        with span("leer_archivo", **{"tts.mime_type": file.content_type}) as traza:
+            audio_bytes = await file.read()
+            traza.set_attribute("tts.tamano_bytes", len(audio_bytes))
         if not audio_bytes:
             raise HTTPException(status_code=400, detail="El archivo de audio está vacío.")
 
         mime_type = file.content_type or "audio/wav"
 
         # 1) AUDIO → TEXTO
-        texto = transcribir_audio(audio_bytes, mime_type)
+        texto = await run_in_threadpool(transcribir_audio, audio_bytes, mime_type)
 
         # 2) TEXTO → EXPLICACIÓN + ACCIONES
-        resultado = explicar_jerga(texto, area_oficio)
+        resultado = await run_in_threadpool(explicar_jerga, texto, area_oficio)
 
         return {
             "nombre_archivo": file.filename,
@@ -70,9 +84,16 @@ async def audio_to_explained_jargon(
             "explicacion_clara": resultado.get("explicacion_clara", ""),
             "acciones_sugeridas": resultado.get("acciones_sugeridas", []),
             "nivel_urgencia": resultado.get("nivel_urgencia", "media"),
+            "origen": resultado.get("origen", "modelo"),
         }
 
     except HTTPException:
         raise
+    except CircuitoAbiertoError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.segundos_reintento)}
+        )
+    except DeadlineExcedidoError as e:
+        raise HTTPException(status_code=504, detail=f"Tiempo de espera agotado al procesar audio: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al procesar audio y explicar jerga: {e}")
@@ -1,6 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from starlette.concurrency import run_in_threadpool
 from models.file_models import FileExplainResponse
-from services.gemini_service import analizar_archivo
+from services.circuit_breaker import CircuitoAbiertoError
+from services.deadline import DeadlineExcedidoError
+from services.backends import analizar_archivo
+from services.sniffing import familia, tipo_archivo
+from services.tracing import span
 
 router = APIRouter()
 
@@ -10,6 +15,21 @@ ALLOWED_EXTENSIONS = {
     '.rtf', '.odt', '.csv', '.html', '.xml', '.json'
 }
 
+def validar_formato(archivo_bytes: bytes, nombre_archivo: str) -> str:
+    """
+    Tipo MIME real del archivo según su contenido. Con el archivo entero, los ZIP y
+    OLE2 solo se aceptan si son documentos Office u OpenDocument; la extensión solo
+    cuenta cuando el contenido no distingue el formato (CSV frente a texto).
+    El middleware de subidas ya rechazó lo evidente con los primeros bytes.
+    """
+    mime_type = tipo_archivo(archivo_bytes, nombre_archivo)
+    if familia(mime_type) not in ("documento", "texto"):
+        raise HTTPException(
+            status_code=415,
+            detail=f"Tipo de archivo no soportado. Soportados: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
+        )
+    return mime_type
+
 @router.post("/traducir", response_model=FileExplainResponse)
 async def traducir_archivo(
     file: UploadFile = File(...),
@@ -38,19 +58,10 @@ async def traducir_archivo(
                 detail="El archivo debe tener un nombre"
             )
         
-        # Validar extensión
-        file_ext = None
-        if '.' in file.filename:
-            file_ext = '.' + file.filename.split('.')[-1].lower()
-        
-        if file_ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Tipo de archivo no soportado. Soportados: {', '.join(ALLOWED_EXTENSIONS)}"
-            )
-        
         # Leer contenido del archivo
-        archivo_bytes = await file.read()
+        with span("leer_archivo", **{"tts.mime_type": file.content_type}) as traza:
+            archivo_bytes = await file.read()
+            traza.set_attribute("tts.tamano_bytes", len(archivo_bytes))
 
         if not archivo_bytes:
             raise HTTPException(
@@ -58,8 +69,12 @@ async def traducir_archivo(
                 detail="El archivo está vacío"
             )
 
+        # Validar el formato real por el contenido, no por la extensión
+        mime_type = validar_formato(archivo_bytes, file.filename)
+
         # Analizar archivo con Gemini
-        resultado = analizar_archivo(
+        resultado = await run_in_threadpool(
+            analizar_archivo,
             archivo_bytes,
             file.filename,
             area_oficio
@@ -67,7 +82,7 @@ async def traducir_archivo(
 
         return FileExplainResponse(
             nombre_archivo=file.filename,
-            mime_type=file.content_type or "application/octet-stream",
+            mime_type=mime_type,
             texto_extraido=resultado.get("texto_extraido", ""),
             explicacion_clara=resultado.get("explicacion_clara", ""),
             acciones_sugeridas=resultado.get("acciones_sugeridas", []),
@@ -75,6 +90,17 @@ async def traducir_archivo(
         )
     except HTTPException:
         raise
+    except CircuitoAbiertoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.segundos_reintento)}
+        )
+    except DeadlineExcedidoError as e:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Tiempo de espera agotado al analizar archivo: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,6 +1,12 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from starlette.concurrency import run_in_threadpool
 from models.image_models import ImageExplainResponse
-from services.gemini_service import analizar_imagen
+from services.circuit_breaker import CircuitoAbiertoError
+from services.deadline import DeadlineExcedidoError
+from services.backends import analizar_imagen
+from services.sniffing import detectar_tipo, familia
+from services.tracing import span
+from services.upload_limits import SUBIDA_BYTES_SNIFFING
 
 router = APIRouter()
 
@@ -22,15 +28,19 @@ async def traducir_imagen(
     - nivel_urgencia: baja / media / alta
     """
     try:
-        # Validar que sea una imagen
-        if not file.content_type.startswith("image/"):
+        # Validar que sea una imagen por sus primeros bytes y no por el Content-Type
+        # declarado. Con SUBIDA_LIMITES_ACTIVOS=1 el middleware ya lo rechazó al llegar
+        if familia(detectar_tipo(await file.read(SUBIDA_BYTES_SNIFFING))) != "imagen":
             raise HTTPException(
                 status_code=400,
                 detail="El archivo debe ser una imagen (PNG, JPG, JPEG, etc.)"
             )
+        await file.seek(0)
         
         # Leer contenido de la imagen
-        imagen_bytes = await file.read()
+        with span("leer_archivo", **{"tts.mime_type": file.content_type}) as traza:
+            imagen_bytes = await file.read()
+            traza.set_attribute("tts.tamano_bytes", len(imagen_bytes))
 
         if not imagen_bytes:
             raise HTTPException(
@@ -39,7 +49,8 @@ async def traducir_imagen(
             )
 
         # Analizar imagen con Gemini
-        resultado = analizar_imagen(
+        resultado = await run_in_threadpool(
+            analizar_imagen,
             imagen_bytes,
             file.filename or "imagen",
             area_oficio
@@ -53,6 +64,17 @@ async def traducir_imagen(
         )
     except HTTPException:
         raise
+    except CircuitoAbiertoError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.segundos_reintento)}
+        )
+    except DeadlineExcedidoError as e:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Tiempo de espera agotado al analizar imagen: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,6 +1,15 @@
 from fastapi import APIRouter, HTTPException
-from models.jargon_models import JargonRequest, JargonResponse
-from services.gemini_service import explicar_jerga
+from starlette.concurrency import run_in_threadpool
+from models.jargon_models import (
+    JargonRequest,
+    JargonResponse,
+    JargonBatchRequest,
+    JargonBatchResponse,
+    JargonBatchItemResult,
+)
+from services.circuit_breaker import CircuitoAbiertoError
+from services.deadline import DeadlineExcedidoError
+from services.backends import explicar_jerga, explicar_jerga_lote
 
 router = APIRouter()
 
@@ -13,13 +22,64 @@ async def traducir_jerga(payload: JargonRequest):
     - nivel de urgencia
     """
     try:
-        resultado = explicar_jerga(payload.texto, payload.area_oficio)
+        resultado = await run_in_threadpool(explicar_jerga, payload.texto, payload.area_oficio)
 
         return JargonResponse(
             texto_original=payload.texto,
             explicacion_clara=resultado.get("explicacion_clara", ""),
             acciones_sugeridas=resultado.get("acciones_sugeridas", []),
             nivel_urgencia=resultado.get("nivel_urgencia", "media"),
+            origen=resultado.get("origen", "modelo"),
         )
+    except CircuitoAbiertoError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.segundos_reintento)}
+        )
+    except DeadlineExcedidoError as e:
+        raise HTTPException(status_code=504, detail=f"Tiempo de espera agotado al traducir jerga: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al traducir jerga: {e}")
+
+
+@router.post("/traducir/batch", response_model=JargonBatchResponse)
+async def traducir_jerga_lote(payload: JargonBatchRequest):
+    """
+    Traduce muchos textos técnicos en una sola petición.
+    Los textos se empaquetan en pocos prompts al modelo; cada elemento del
+    resultado indica si se explicó bien (estado "ok") o el error que tuvo.
+    """
+    try:
+        resultados = await run_in_threadpool(
+            explicar_jerga_lote,
+            [item.texto for item in payload.items],
+            payload.area_oficio,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al traducir lote de jerga: {e}")
+
+    items = []
+    for item, resultado in zip(payload.items, resultados):
+        if isinstance(resultado, Exception):
+            items.append(JargonBatchItemResult(
+                id=item.id,
+                texto_original=item.texto,
+                estado="error",
+                error=str(resultado),
+            ))
+        else:
+            items.append(JargonBatchItemResult(
+                id=item.id,
+                texto_original=item.texto,
+                estado="ok",
+                explicacion_clara=resultado.get("explicacion_clara", ""),
+                acciones_sugeridas=resultado.get("acciones_sugeridas", []),
+                nivel_urgencia=resultado.get("nivel_urgencia", "media"),
+            ))
+
+    correctos = sum(1 for item in items if item.estado == "ok")
+    return JargonBatchResponse(
+        total=len(items),
+        correctos=correctos,
+        fallidos=len(items) - correctos,
+        resultados=items,
+    )
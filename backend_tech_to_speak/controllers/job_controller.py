@@ -0,0 +1,199 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from controllers.file_controller import validar_formato
+from models.file_models import FileExplainResponse
+from models.job_models import JobCreadoResponse, JobEstadoResponse
+from services.backends import analizar_archivo, transcribir_audio, explicar_jerga
+from services.jobs import ESTADOS_FINALES, GestorJobs
+from services.tracing import span
+
+router = APIRouter()
+
+# Intervalo con el que el stream SSE revisa el estado del job
+JOBS_SSE_INTERVALO_SEGUNDOS = float(os.getenv("JOBS_SSE_INTERVALO_SEGUNDOS", "0.5"))
+
+
+# ==========================
+# MANEJADORES DE JOBS
+# ==========================
+def _procesar_archivo(archivo_bytes: bytes, parametros: dict) -> dict:
+    resultado = analizar_archivo(
+        archivo_bytes,
+        parametros["nombre_archivo"],
+        parametros["area_oficio"]
+    )
+    return FileExplainResponse(
+        nombre_archivo=parametros["nombre_archivo"],
+        mime_type=parametros["mime_type"],
+        texto_extraido=resultado.get("texto_extraido", ""),
+        explicacion_clara=resultado.get("explicacion_clara", ""),
+        acciones_sugeridas=resultado.get("acciones_sugeridas", []),
+        nivel_urgencia=resultado.get("nivel_urgencia", "media"),
+    ).model_dump()
+
+
+def _procesar_audio(audio_bytes: bytes, parametros: dict) -> dict:
+    texto = transcribir_audio(audio_bytes, parametros["mime_type"])
+    if not parametros["explicar"]:
+        return {
+            "nombre_archivo": parametros["nombre_archivo"],
+            "mime_type": parametros["mime_type"],
+            "texto": texto,
+        }
+
+    resultado = explicar_jerga(texto, parametros["area_oficio"])
+    return {
+        "nombre_archivo": parametros["nombre_archivo"],
+        "mime_type": parametros["mime_type"],
+        "texto_transcrito": texto,
+        "explicacion_clara": resultado.get("explicacion_clara", ""),
+        "acciones_sugeridas": resultado.get("acciones_sugeridas", []),
+        "nivel_urgencia": resultado.get("nivel_urgencia", "media"),
+        "origen": resultado.get("origen", "modelo"),
+    }
+
+
+gestor_jobs = GestorJobs({
+    "archivo": _procesar_archivo,
+    "audio": _procesar_audio,
+})
+
+
+def _creado(job_id: str) -> JobCreadoResponse:
+    return JobCreadoResponse(
+        job_id=job_id,
+        estado="pendiente",
+        url_estado=f"/api/v1/jobs/{job_id}",
+        url_eventos=f"/api/v1/jobs/{job_id}/eventos",
+    )
+
+
+def _estado(job: dict) -> JobEstadoResponse:
+    return JobEstadoResponse(
+        job_id=job["id"],
+        tipo=job["tipo"],
+        estado=job["estado"],
+        creado=job["creado"],
+        actualizado=job["actualizado"],
+        resultado=job["resultado"],
+        error=job["error"],
+    )
+
+
+# ==========================
+# 1) CREAR JOBS
+# ==========================
+@router.post("/archivo", response_model=JobCreadoResponse, status_code=202)
+async def crear_job_archivo(
+    file: UploadFile = File(...),
+    area_oficio: str = Form("TI")
+):
+    """
+    Variante asíncrona de /api/v1/file/traducir: guarda el archivo, devuelve
+    un job_id al instante y lo analiza en segundo plano.
+    El resultado se consulta por polling o por SSE.
+    """
+    if not file.filename:
+        raise HTTPException(
+            status_code=400,
+            detail="El archivo debe tener un nombre"
+        )
+
+    with span("leer_archivo", **{"tts.mime_type": file.content_type}) as traza:
+        archivo_bytes = await file.read()
+        traza.set_attribute("tts.tamano_bytes", len(archivo_bytes))
+    if not archivo_bytes:
+        raise HTTPException(
+            status_code=400,
+            detail="El archivo está vacío"
+        )
+    mime_type = validar_formato(archivo_bytes, file.filename)
+
+    job_id = await run_in_threadpool(
+        gestor_jobs.encolar,
+        "archivo",
+        archivo_bytes,
+        {
+            "nombre_archivo": file.filename,
+            "mime_type": mime_type,
+            "area_oficio": area_oficio,
+        },
+    )
+    return _creado(job_id)
+
+
+@router.post("/audio", response_model=JobCreadoResponse, status_code=202)
+async def crear_job_audio(
+    file: UploadFile = File(...),
+    explicar: bool = Form(True, description="Además de transcribir, explicar la jerga"),
+    area_oficio: str | None = Form(
+        default=None, description="mecanica, medicina, derecho, TI, etc."
+    ),
+):
+    """
+    Variante asíncrona de /api/v1/audio/stt y /api/v1/audio/explicar.
+    """
+    with span("leer_archivo", **{"tts.mime_type": file.content_type}) as traza:
+        audio_bytes = await file.read()
+        traza.set_attribute("tts.tamano_bytes", len(audio_bytes))
+    if not audio_bytes:
+        raise HTTPException(status_code=400, detail="El archivo de audio está vacío.")
+
+    job_id = await run_in_threadpool(
+        gestor_jobs.encolar,
+        "audio",
+        audio_bytes,
+        {
+            "nombre_archivo": file.filename,
+            "mime_type": file.content_type or "audio/wav",
+            "explicar": explicar,
+            "area_oficio": area_oficio,
+        },
+    )
+    return _creado(job_id)
+
+
+# ==========================
+# 2) CONSULTAR JOBS
+# ==========================
+@router.get("/{job_id}", response_model=JobEstadoResponse)
+async def obtener_job(job_id: str):
+    """Estado del job y, cuando termina, su resultado o su error."""
+    job = await run_in_threadpool(gestor_jobs.obtener, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return _estado(job)
+
+
+@router.get("/{job_id}/eventos")
+async def eventos_job(job_id: str):
+    """
+    Server-Sent Events: emite un evento "estado" cada vez que cambia el estado
+    del job y cierra el stream cuando termina.
+    """
+    if await run_in_threadpool(gestor_jobs.obtener, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+
+    async def generar():
+        ultimo_estado = None
+        while True:
+            job = await run_in_threadpool(gestor_jobs.obtener, job_id)
+            if job is None:
+                return
+            if job["estado"] != ultimo_estado:
+                ultimo_estado = job["estado"]
+                datos = _estado(job).model_dump_json()
+                yield f"event: estado\ndata: {datos}\n\n"
+            if job["estado"] in ESTADOS_FINALES:
+                return
+            await asyncio.sleep(JOBS_SSE_INTERVALO_SEGUNDOS)
+
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
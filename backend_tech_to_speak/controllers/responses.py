@@ -0,0 +1,16 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from services.serialization import a_json
+
+
+class RespuestaJSON(JSONResponse):
+    """
+    Clase de respuesta por defecto de la app: la JSONResponse de FastAPI pero codificada
+    con a_json (orjson si está instalado).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return a_json(content)
+
@@ -1,30 +1,227 @@
-from fastapi import FastAPI
+import math
+import time
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+# El .env se carga una sola vez y antes que nada: la configuración de cada módulo
+# se lee del entorno al importarlo
+load_dotenv()
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from controllers.audio_controller import router as audio_router
 from controllers.jargon_controller import router as jargon_router
 from controllers.image_controller import router as image_router
 from controllers.file_controller import router as file_router
+from controllers.job_controller import gestor_jobs, router as job_router
+from controllers.admin_controller import router as admin_router
+from controllers.responses import RespuestaJSON
+from services.backends import iniciar_backends
+from services.deadline import establecer_deadline, restablecer_deadline
+from services.metrics import latencia_peticiones, metricas, plantilla_ruta, tamano_peticiones
+from services.tracing import cerrar_tracing, configurar_tracing, span
+from services.usage import USO_CABECERAS, Uso, cliente_actual, contabilidad, uso_peticion
+from services.scheduler import FACTORES_PRIORIDAD, prioridad_actual
+from services.rate_limit import (
+    RATE_LIMIT_ACTIVO,
+    area_limitada,
+    crear_rate_limiter,
+    identificar_cliente,
+)
+from services.recording import MiddlewareGrabacion, grabador
+from services.upload_limits import SUBIDA_LIMITES_ACTIVOS, MiddlewareLimiteSubida
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configurar_tracing()
+    # Una configuración de backend inválida (p. ej. Gemini sin API key) falla aquí
+    iniciar_backends()
+    # Retoma los jobs que quedaron pendientes antes del último reinicio
+    gestor_jobs.iniciar()
+    contabilidad.iniciar()
+    if grabador:
+        grabador.iniciar()
+    yield
+    gestor_jobs.detener()
+    contabilidad.detener()
+    if grabador:
+        grabador.detener()
+    cerrar_tracing()
 
 app = FastAPI(
     title="Tech To Speak API",
     description="Backend del Traductor de Jerga de Oficio",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    # JSON con orjson (si está instalado) en vez de json.dumps; ver services/serialization.py
+    default_response_class=RespuestaJSON,
 )
 
+@app.middleware("http")
+async def propagar_contexto(request: Request, call_next):
+    """
+    Lee la cabecera X-Request-Timeout (segundos que el cliente está dispuesto a esperar)
+    y fija el deadline de la petición para que la capa de servicio no reintente
+    más allá del momento en que el cliente se rinde.
+
+    La cabecera opcional X-Priority (alta / normal / baja) ajusta el peso de la
+    petición en la cola de llamadas al modelo.
+
+    También identifica al cliente para la contabilidad de tokens y, con USO_CABECERAS=1,
+    devuelve en X-Tokens-Entrada / X-Tokens-Salida / X-Costo-Estimado-USD lo que consumió.
+    """
+    timeout = request.headers.get("x-request-timeout")
+    try:
+        timeout_segundos = float(timeout) if timeout else None
+    except ValueError:
+        timeout_segundos = math.nan
+    # nan, inf, 0 y negativos rompen los timeouts y las esperas de la cola
+    if timeout_segundos is not None and not (math.isfinite(timeout_segundos) and timeout_segundos > 0):
+        return JSONResponse(
+            status_code=400,
+            content={"detail": "La cabecera X-Request-Timeout debe ser un número de segundos mayor que 0"},
+        )
+
+    prioridad = request.headers.get("x-priority", "normal").lower()
+    if prioridad not in FACTORES_PRIORIDAD:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"X-Priority debe ser una de: {', '.join(FACTORES_PRIORIDAD)}"},
+        )
+
+    token = establecer_deadline(timeout_segundos)
+    token_prioridad = prioridad_actual.set(prioridad)
+    token_cliente = cliente_actual.set(
+        identificar_cliente(
+            request.headers.get("x-api-key"),
+            request.client.host if request.client else None,
+        )
+    )
+    uso = Uso()
+    token_uso = uso_peticion.set(uso)
+    try:
+        response = await call_next(request)
+        if USO_CABECERAS and uso.llamadas:
+            response.headers["X-Tokens-Entrada"] = str(uso.tokens_entrada)
+            response.headers["X-Tokens-Salida"] = str(uso.tokens_salida)
+            response.headers["X-Costo-Estimado-USD"] = f"{uso.costo_usd:.6f}"
+        return response
+    finally:
+        uso_peticion.reset(token_uso)
+        cliente_actual.reset(token_cliente)
+        prioridad_actual.reset(token_prioridad)
+        restablecer_deadline(token)
+
+rate_limiter = crear_rate_limiter() if RATE_LIMIT_ACTIVO else None
+
+async def limitar_peticiones(request: Request, response: Response):
+    """
+    Token bucket por cliente (API key conocida o IP) y por area_oficio. Los endpoints
+    que suben archivos o audio consumen más tokens que los de texto.
+
+    Es una dependencia de las rutas /api/ y no un middleware: se ejecuta con el cuerpo
+    ya leído por FastAPI, así que el área sale del campo area_oficio del JSON o del
+    formulario multipart, el mismo que usa el endpoint, sin leer el archivo dos veces.
+    """
+    if rate_limiter is None:
+        return
+
+    area = None
+    tipo = request.headers.get("content-type", "")
+    if tipo.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        area = (await request.form()).get("area_oficio")
+    elif tipo.startswith("application/json"):
+        try:
+            cuerpo = await request.json()
+            area = cuerpo.get("area_oficio") if isinstance(cuerpo, dict) else None
+        except ValueError:
+            area = None
+
+    cliente = identificar_cliente(
+        request.headers.get("x-api-key"),
+        request.client.host if request.client else None,
+    )
+    resultado = await rate_limiter.consumir(cliente, area_limitada(area), request.url.path)
+    cabeceras = {
+        "X-RateLimit-Limit": str(int(resultado.limite)),
+        "X-RateLimit-Remaining": str(int(resultado.restantes)),
+    }
+    if not resultado.permitido:
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiadas peticiones, espera antes de reintentar",
+            headers={**cabeceras, "Retry-After": str(max(1, math.ceil(resultado.segundos_reintento)))},
+        )
+    response.headers.update(cabeceras)
+
+# Límite de tamaño y formato de las subidas por ruta, antes de que se lea el cuerpo.
+# Va por dentro de la medición, para que los 413 y 415 también cuenten en las métricas
+if SUBIDA_LIMITES_ACTIVOS:
+    app.add_middleware(MiddlewareLimiteSubida)
+
+@app.middleware("http")
+async def medir_peticiones(request: Request, call_next):
+    """
+    Latencia y tamaño de cada petición por ruta, y el span raíz de su traza. Se usa la
+    plantilla de la ruta (/api/v1/jobs/{job_id}) y no la URL concreta, para no crear una
+    serie por job. Cuenta también las respuestas 429 del rate limit.
+    """
+    inicio = time.perf_counter()
+    estado = 500
+    with span(
+        f"{request.method} {request.url.path}",
+        **{"http.request.method": request.method, "url.path": request.url.path},
+    ) as traza:
+        try:
+            response = await call_next(request)
+            estado = response.status_code
+            return response
+        finally:
+            ruta = plantilla_ruta(request.scope)
+            latencia_peticiones.observar(
+                time.perf_counter() - inicio, ruta=ruta, metodo=request.method, estado=str(estado)
+            )
+            longitud = request.headers.get("content-length")
+            if longitud and longitud.isdigit():
+                tamano_peticiones.observar(int(longitud), ruta=ruta)
+            traza.update_name(f"{request.method} {ruta}")
+            traza.set_attributes({"http.route": ruta, "http.response.status_code": estado})
+
+# Graba una muestra del tráfico (GRABACION_ACTIVA=1) para reproducirlo con benchmarks/replay.py
+if grabador:
+    app.add_middleware(MiddlewareGrabacion, grabador=grabador)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "Retry-After",
+        "X-Tokens-Entrada",
+        "X-Tokens-Salida",
+        "X-Costo-Estimado-USD",
+    ],
 )
 
 @app.get("/", tags=["health"])
 def read_root():
     return {"mensaje": "Tech To Speak API operativa 🚀"}
 
-app.include_router(audio_router, prefix="/api/v1/audio", tags=["audio"])
-app.include_router(jargon_router, prefix="/api/v1/jargon", tags=["traductor"])
-app.include_router(image_router, prefix="/api/v1/image", tags=["imagen"])
-app.include_router(file_router, prefix="/api/v1/file", tags=["archivo"])
\ No newline at end of file
+@app.get("/metrics", include_in_schema=False)
+def exportar_metricas():
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+limite_api = [Depends(limitar_peticiones)]
+app.include_router(audio_router, prefix="/api/v1/audio", tags=["audio"], dependencies=limite_api)
+app.include_router(jargon_router, prefix="/api/v1/jargon", tags=["traductor"], dependencies=limite_api)
+app.include_router(image_router, prefix="/api/v1/image", tags=["imagen"], dependencies=limite_api)
+app.include_router(file_router, prefix="/api/v1/file", tags=["archivo"], dependencies=limite_api)
+app.include_router(job_router, prefix="/api/v1/jobs", tags=["jobs"], dependencies=limite_api)
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
\ No newline at end of file
@@ -18,3 +18,37 @@ class JargonResponse(BaseModel):
     nivel_urgencia: str = Field(
         description="baja / media / alta"
     )
+    origen: str = Field(
+        "modelo",
+        description="De dónde sale la explicación: modelo / cache / cache_semantica / glosario / stub"
+    )
+
+
+class JargonBatchItem(BaseModel):
+    id: Optional[str] = Field(
+        None,
+        description="Identificador propio del cliente, se devuelve tal cual en el resultado."
+    )
+    texto: str = Field(..., description="Texto con jerga técnica.")
+
+class JargonBatchRequest(BaseModel):
+    items: List[JargonBatchItem] = Field(..., min_length=1, max_length=500)
+    area_oficio: Optional[str] = Field(
+        None,
+        description="Área del experto: mecanica, medicina, derecho, banca, TI, etc."
+    )
+
+class JargonBatchItemResult(BaseModel):
+    id: Optional[str] = None
+    texto_original: str
+    estado: str = Field(description="ok / error")
+    explicacion_clara: Optional[str] = None
+    acciones_sugeridas: List[str] = []
+    nivel_urgencia: Optional[str] = None
+    error: Optional[str] = None
+
+class JargonBatchResponse(BaseModel):
+    total: int
+    correctos: int
+    fallidos: int
+    resultados: List[JargonBatchItemResult]
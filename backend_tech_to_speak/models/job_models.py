@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Any, Optional
+
+class JobCreadoResponse(BaseModel):
+    job_id: str
+    estado: str
+    url_estado: str = Field(description="Consultar aquí el estado (polling)")
+    url_eventos: str = Field(description="Stream SSE con los cambios de estado")
+
+class JobEstadoResponse(BaseModel):
+    job_id: str
+    tipo: str
+    estado: str = Field(description="pendiente / en_proceso / completado / error")
+    creado: float
+    actualizado: float
+    resultado: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
@@ -0,0 +1,220 @@
+"""
+Servidor de producción: varios procesos uvicorn con uvloop y httptools que atienden
+el mismo socket.
+
+El proceso maestro importa la app una sola vez (precarga) y después crea los workers
+con fork, así que el código, los modelos de Pydantic y el glosario se comparten entre
+procesos por copy-on-write. El lifespan (clientes de Gemini, jobs, contabilidad) se
+ejecuta en cada worker, después del fork. El maestro reemplaza los workers que
+terminan y, con SIGTERM o SIGINT, deja de aceptar conexiones y espera a que cada
+worker termine sus peticiones en curso (y con ellas sus llamadas al modelo) antes
+de salir.
+
+Para desarrollo se sigue usando `uvicorn main:app --reload`.
+
+Uso:
+    uv run python server.py
+    SERVIDOR_WORKERS=8 SERVIDOR_PUERTO=8080 uv run python server.py
+"""
+import gc
+import math
+import os
+import signal
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import uvicorn
+
+# ==========================
+# CONFIGURACIÓN DEL SERVIDOR
+# ==========================
+SERVIDOR_HOST = os.getenv("SERVIDOR_HOST", "0.0.0.0")
+SERVIDOR_PUERTO = int(os.getenv("SERVIDOR_PUERTO", "8000"))
+# 0: un worker por núcleo disponible (afinidad de CPU y cuota del cgroup)
+SERVIDOR_WORKERS = int(os.getenv("SERVIDOR_WORKERS", "0"))
+# Conexiones pendientes de aceptar en el socket; el kernel lo acota a net.core.somaxconn
+SERVIDOR_BACKLOG = int(os.getenv("SERVIDOR_BACKLOG", "2048"))
+# Mayor que el timeout de inactividad del balanceador (60 s en la mayoría), para que
+# sea él quien cierre las conexiones ociosas y no reenvíe peticiones a una ya cerrada
+SERVIDOR_KEEPALIVE_SEGUNDOS = int(os.getenv("SERVIDOR_KEEPALIVE_SEGUNDOS", "75"))
+# Tiempo que un worker espera a sus peticiones en curso al apagarse
+SERVIDOR_APAGADO_SEGUNDOS = int(os.getenv("SERVIDOR_APAGADO_SEGUNDOS", "30"))
+# Margen adicional para el apagado del lifespan (jobs en curso, volcados) antes de SIGKILL
+SERVIDOR_APAGADO_MARGEN_SEGUNDOS = float(os.getenv("SERVIDOR_APAGADO_MARGEN_SEGUNDOS", "30"))
+# Conexiones simultáneas por worker antes de responder 503 (0: sin límite)
+SERVIDOR_MAX_CONEXIONES = int(os.getenv("SERVIDOR_MAX_CONEXIONES", "0"))
+# Reciclar cada worker tras este número de peticiones (0: nunca); el jitter evita que
+# todos se reinicien a la vez
+SERVIDOR_MAX_PETICIONES = int(os.getenv("SERVIDOR_MAX_PETICIONES", "0"))
+SERVIDOR_MAX_PETICIONES_JITTER = int(os.getenv("SERVIDOR_MAX_PETICIONES_JITTER", "0"))
+SERVIDOR_PRECARGA = os.getenv("SERVIDOR_PRECARGA", "1") == "1"
+SERVIDOR_ACCESS_LOG = os.getenv("SERVIDOR_ACCESS_LOG", "0") == "1"
+
+# Código de salida de uvicorn cuando falla el arranque (p. ej. el lifespan)
+FALLO_ARRANQUE = 3
+
+
+def nucleos_disponibles() -> int:
+    """Núcleos que puede usar el proceso: afinidad de CPU acotada por la cuota del cgroup."""
+    try:
+        nucleos = len(os.sched_getaffinity(0))
+    except AttributeError:
+        nucleos = os.cpu_count() or 1
+    try:
+        # cgroup v2: "max 100000" sin límite, "200000 100000" son 2 CPUs
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            cuota, periodo = f.read().split()
+        if cuota != "max":
+            nucleos = min(nucleos, max(1, math.ceil(int(cuota) / int(periodo))))
+    except (OSError, ValueError):
+        pass
+    return nucleos
+
+
+def crear_config(app) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=SERVIDOR_HOST,
+        port=SERVIDOR_PUERTO,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        backlog=SERVIDOR_BACKLOG,
+        timeout_keep_alive=SERVIDOR_KEEPALIVE_SEGUNDOS,
+        timeout_graceful_shutdown=SERVIDOR_APAGADO_SEGUNDOS,
+        limit_concurrency=SERVIDOR_MAX_CONEXIONES or None,
+        limit_max_requests=SERVIDOR_MAX_PETICIONES or None,
+        limit_max_requests_jitter=SERVIDOR_MAX_PETICIONES_JITTER,
+        access_log=SERVIDOR_ACCESS_LOG,
+    )
+
+
+# ==========================
+# WORKERS
+# ==========================
+def _ejecutar_worker(config: uvicorn.Config, socket_servidor) -> int:
+    # El maestro es quien reparte las señales: un Ctrl+C en la terminal llega a todo el
+    # grupo de procesos, y uvicorn las reemite al terminar su apagado ordenado
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    servidor = uvicorn.Server(config)
+    try:
+        servidor.run(sockets=[socket_servidor])
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    return 0 if servidor.started else FALLO_ARRANQUE
+
+
+class Maestro:
+    """Crea los workers con fork, reemplaza los que terminan y coordina el apagado."""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.socket = config.bind_socket()
+        self._pids: set[int] = set()
+        self._parar = False
+
+    def _lanzar(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            codigo = FALLO_ARRANQUE
+            try:
+                codigo = _ejecutar_worker(self.config, self.socket)
+            finally:
+                # Sin pasar por los atexit ni los finally heredados del maestro
+                os._exit(codigo)
+        self._pids.add(pid)
+
+    def _senal_parar(self, sig, frame) -> None:
+        self._parar = True
+
+    def _recoger(self) -> list[tuple[int, int]]:
+        terminados = []
+        while self._pids:
+            try:
+                pid, estado = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._pids.clear()
+                break
+            if pid == 0:
+                break
+            self._pids.discard(pid)
+            terminados.append((pid, os.waitstatus_to_exitcode(estado)))
+        return terminados
+
+    def ejecutar(self) -> int:
+        signal.signal(signal.SIGTERM, self._senal_parar)
+        signal.signal(signal.SIGINT, self._senal_parar)
+        print(f"🚀 Maestro {os.getpid()}: {self.workers} workers en "
+              f"http://{self.config.host}:{self.config.port}")
+        for _ in range(self.workers):
+            self._lanzar()
+
+        codigo = 0
+        while not self._parar:
+            for pid, salida in self._recoger():
+                if salida == FALLO_ARRANQUE:
+                    # Un fallo de arranque (p. ej. sin API key) se repetiría en bucle
+                    print(f"❌ El worker {pid} no pudo arrancar; se detiene el servidor")
+                    self._parar = True
+                    codigo = FALLO_ARRANQUE
+                    break
+                if not self._parar:
+                    # Terminó por SERVIDOR_MAX_PETICIONES o se cayó: se reemplaza
+                    print(f"⚠️ Worker {pid} terminó (código {salida}); se lanza otro")
+                    self._lanzar()
+            time.sleep(0.2)
+
+        self._apagar()
+        return codigo
+
+    def _apagar(self) -> None:
+        print(f"🛑 Apagando {len(self._pids)} workers (hasta {SERVIDOR_APAGADO_SEGUNDOS} s "
+              "para terminar las peticiones en curso)")
+        for pid in self._pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        limite = time.monotonic() + SERVIDOR_APAGADO_SEGUNDOS + SERVIDOR_APAGADO_MARGEN_SEGUNDOS
+        while self._pids and time.monotonic() < limite:
+            self._recoger()
+            time.sleep(0.1)
+        for pid in self._pids:
+            print(f"⚠️ El worker {pid} no terminó a tiempo; se fuerza su salida")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while self._pids:
+            self._recoger()
+            time.sleep(0.05)
+        self.socket.close()
+
+
+def main() -> None:
+    workers = SERVIDOR_WORKERS or nucleos_disponibles()
+    # Cada worker crea su propio pool de API keys: se reparten la cuota de cada clave.
+    # Antes de importar la app, que lee la configuración al importarse
+    os.environ.setdefault("GEMINI_PROCESOS_POR_CLAVE", str(workers))
+    if SERVIDOR_PRECARGA:
+        from main import app
+
+        # Los objetos creados al importar no cambian: fuera del GC, sus páginas de
+        # memoria no se copian en cada worker al recorrerlas el recolector
+        gc.collect()
+        gc.freeze()
+    else:
+        app = "main:app"
+
+    config = crear_config(app)
+    sys.exit(Maestro(config, workers).ejecutar())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from typing import Callable
+
+from services.backends.base import BackendModelo
+from services.recording import grabador, peticion_grabada
+
+# ==========================
+# CONFIGURACIÓN DEL BACKEND DE MODELO
+# ==========================
+# Backend por defecto: "gemini", "stub" (local, sin red ni API key) o "replay"
+# (respuestas y latencias grabadas con GRABACION_ACTIVA=1)
+MODELO_BACKEND = os.getenv("MODELO_BACKEND", "gemini").lower()
+# Cada operación puede ir a otro backend con MODELO_BACKEND_<OPERACION>,
+# p. ej. MODELO_BACKEND_STT=stub para probar sin gastar cuota de audio
+OPERACIONES = ("stt", "explicar", "lote", "archivo", "imagen")
+
+_lock = threading.Lock()
+_instancias: dict[str, BackendModelo] = {}
+
+
+def _crear_gemini() -> BackendModelo:
+    from services.backends.gemini import BackendGemini
+
+    return BackendGemini()
+
+
+def _crear_stub() -> BackendModelo:
+    from services.backends.stub import BackendStub
+
+    return BackendStub()
+
+
+def _crear_replay() -> BackendModelo:
+    from services.backends.replay import BackendReplay
+
+    return BackendReplay()
+
+
+# Los backends se importan al crearlos: el SDK de Gemini solo se carga si se usa
+_fabricas: dict[str, Callable[[], BackendModelo]] = {
+    "gemini": _crear_gemini,
+    "stub": _crear_stub,
+    "replay": _crear_replay,
+}
+
+
+def registrar_backend(nombre: str, fabrica: Callable[[], BackendModelo]) -> None:
+    """Añade un backend alternativo, seleccionable luego por configuración."""
+    _fabricas[nombre.lower()] = fabrica
+
+
+def backend_configurado(operacion: str) -> str:
+    return os.getenv(f"MODELO_BACKEND_{operacion.upper()}", MODELO_BACKEND).lower()
+
+
+def obtener_backend(operacion: str) -> BackendModelo:
+    """Backend que atiende `operacion`; cada backend se crea una sola vez."""
+    nombre = backend_configurado(operacion)
+    backend = _instancias.get(nombre)
+    if backend is not None:
+        return backend
+    with _lock:
+        if nombre not in _instancias:
+            if nombre not in _fabricas:
+                raise RuntimeError(
+                    f"❌ Backend de modelo desconocido: {nombre} "
+                    f"(disponibles: {', '.join(sorted(_fabricas))})"
+                )
+            _instancias[nombre] = _fabricas[nombre]()
+        return _instancias[nombre]
+
+
+def iniciar_backends() -> dict[str, str]:
+    """
+    Crea al arrancar los backends configurados, para que una configuración inválida
+    (p. ej. Gemini sin API key) falle en el arranque y no en la primera petición.
+    """
+    return {operacion: obtener_backend(operacion).nombre for operacion in OPERACIONES}
+
+
+# ==========================
+# OPERACIONES (misma firma que gemini_service)
+# ==========================
+def _llamar(operacion: str, metodo: str, entrada, area: str | None, *args, **detalles):
+    """
+    Llama al backend de `operacion` y, si la petición se está grabando, guarda la llamada
+    con `detalles` (tipo MIME, extensión) para poder reproducirla.
+    """
+    llamada = getattr(obtener_backend(operacion), metodo)
+    if grabador is None or peticion_grabada.get() is None:
+        return llamada(entrada, *args)
+
+    inicio = time.perf_counter()
+    try:
+        resultado = llamada(entrada, *args)
+    except Exception as e:
+        grabador.registrar_llamada(
+            operacion, entrada, area, error=e, duracion=time.perf_counter() - inicio, **detalles
+        )
+        raise
+    grabador.registrar_llamada(
+        operacion, entrada, area, resultado, duracion=time.perf_counter() - inicio, **detalles
+    )
+    return resultado
+
+
+def transcribir_audio(audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+    return _llamar("stt", "transcribir_audio", audio_bytes, None, mime_type, mime_type=mime_type)
+
+
+def explicar_jerga(texto: str, area_oficio: str | None = None) -> dict:
+    return _llamar("explicar", "explicar_jerga", texto, area_oficio, area_oficio)
+
+
+def explicar_jerga_lote(textos: list[str], area_oficio: str | None = None) -> list[dict | Exception]:
+    return _llamar("lote", "explicar_jerga_lote", textos, area_oficio, area_oficio)
+
+
+def analizar_archivo(archivo_bytes: bytes, nombre_archivo: str, area_oficio: str | None = None) -> dict:
+    return _llamar(
+        "archivo", "analizar_archivo", archivo_bytes, area_oficio, nombre_archivo, area_oficio,
+        extension=os.path.splitext(nombre_archivo)[1].lower(),
+    )
+
+
+def analizar_imagen(imagen_bytes: bytes, nombre_imagen: str, area_oficio: str | None = None) -> dict:
+    return _llamar(
+        "imagen", "analizar_imagen", imagen_bytes, area_oficio, nombre_imagen, area_oficio,
+        extension=os.path.splitext(nombre_imagen)[1].lower(),
+    )
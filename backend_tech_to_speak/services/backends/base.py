@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+
+
+class BackendModelo(ABC):
+    """
+    Operaciones de modelo que usan los controladores. Cada backend (Gemini, stub
+    local, u otro proveedor) implementa las cinco con la misma forma de entrada y
+    salida que services.gemini_service:
+
+    - explicar_jerga / analizar_*: dict con explicacion_clara, acciones_sugeridas
+      y nivel_urgencia (más texto_extraido en archivo e imagen, y origen en jerga).
+    - explicar_jerga_lote: un resultado o una excepción por texto, en el orden de entrada.
+
+    Los errores de disponibilidad se señalan con CircuitoAbiertoError y
+    DeadlineExcedidoError, que los controladores convierten en 503 y 504.
+    Un backend al que le falte alguna operación falla al instanciarse, no a mitad
+    de una petición.
+    """
+
+    nombre = ""
+
+    @abstractmethod
+    def transcribir_audio(self, audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+        ...
+
+    @abstractmethod
+    def explicar_jerga(self, texto: str, area_oficio: str | None = None) -> dict:
+        ...
+
+    @abstractmethod
+    def explicar_jerga_lote(
+        self, textos: list[str], area_oficio: str | None = None
+    ) -> list[dict | Exception]:
+        ...
+
+    @abstractmethod
+    def analizar_archivo(
+        self, archivo_bytes: bytes, nombre_archivo: str, area_oficio: str | None = None
+    ) -> dict:
+        ...
+
+    @abstractmethod
+    def analizar_imagen(
+        self, imagen_bytes: bytes, nombre_imagen: str, area_oficio: str | None = None
+    ) -> dict:
+        ...
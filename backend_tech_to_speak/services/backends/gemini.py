@@ -0,0 +1,37 @@
+from services.backends.base import BackendModelo
+
+
+class BackendGemini(BackendModelo):
+    """Gemini con toda la capa de resiliencia de gemini_service (pool, colas, cachés)."""
+
+    nombre = "gemini"
+
+    def __init__(self):
+        # Import diferido: con otro backend no se carga el SDK ni se exige API key
+        from services import gemini_service
+
+        # Lee las API keys y crea los clientes; sin clave falla aquí, en el arranque
+        gemini_service.configurar()
+
+        self._servicio = gemini_service
+
+    def transcribir_audio(self, audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+        return self._servicio.transcribir_audio(audio_bytes, mime_type)
+
+    def explicar_jerga(self, texto: str, area_oficio: str | None = None) -> dict:
+        return self._servicio.explicar_jerga(texto, area_oficio)
+
+    def explicar_jerga_lote(
+        self, textos: list[str], area_oficio: str | None = None
+    ) -> list[dict | Exception]:
+        return self._servicio.explicar_jerga_lote(textos, area_oficio)
+
+    def analizar_archivo(
+        self, archivo_bytes: bytes, nombre_archivo: str, area_oficio: str | None = None
+    ) -> dict:
+        return self._servicio.analizar_archivo(archivo_bytes, nombre_archivo, area_oficio)
+
+    def analizar_imagen(
+        self, imagen_bytes: bytes, nombre_imagen: str, area_oficio: str | None = None
+    ) -> dict:
+        return self._servicio.analizar_imagen(imagen_bytes, nombre_imagen, area_oficio)
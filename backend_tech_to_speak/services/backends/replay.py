@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+from services.backends.base import BackendModelo
+from services.backends.stub import BackendStub
+from services.circuit_breaker import CIRCUITO_SEGUNDOS_ABIERTO, CircuitoAbiertoError
+from services.deadline import DeadlineExcedidoError, tiempo_restante
+from services.recording import GRABACION_DIR, huella, leer_grabacion, restaurar_textos
+
+# ==========================
+# CONFIGURACIÓN DEL BACKEND REPLAY
+# ==========================
+# Archivo de grabación o directorio con varios (*.jsonl.gz)
+REPLAY_ARCHIVO = os.getenv("REPLAY_ARCHIVO", GRABACION_DIR)
+# Multiplicador de velocidad: 2 reproduce las latencias grabadas a la mitad
+REPLAY_VELOCIDAD = float(os.getenv("REPLAY_VELOCIDAD", "1"))
+
+
+class BackendReplay(BackendModelo):
+    """
+    Reproduce las respuestas y latencias del modelo grabadas en producción. Si la
+    entrada se grabó (misma huella) devuelve esa misma respuesta; si no, la siguiente
+    grabada de la misma operación, en orden circular, para conservar la mezcla de
+    latencias y tamaños. Las operaciones sin grabaciones se resuelven con el stub.
+    """
+
+    nombre = "replay"
+
+    def __init__(self, ruta: str = REPLAY_ARCHIVO, velocidad: float = REPLAY_VELOCIDAD):
+        self.velocidad = velocidad
+        self._por_huella: dict[tuple[str, str], dict] = {}
+        self._por_operacion: dict[str, list[dict]] = {}
+        self._posiciones: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stub = BackendStub(latencia=0)
+
+        if not os.path.exists(ruta):
+            print(f"⚠️ No hay grabaciones en {ruta}; el backend replay responderá como el stub")
+            return
+        for evento in leer_grabacion(ruta):
+            if evento["tipo"] != "modelo":
+                continue
+            self._por_huella.setdefault((evento["operacion"], evento["huella"]), evento)
+            self._por_operacion.setdefault(evento["operacion"], []).append(evento)
+
+    def estadisticas(self) -> dict:
+        return {operacion: len(eventos) for operacion, eventos in self._por_operacion.items()}
+
+    def _grabado(self, operacion: str, entrada) -> dict | None:
+        evento = self._por_huella.get((operacion, huella(entrada)))
+        if evento is not None:
+            return evento
+        eventos = self._por_operacion.get(operacion)
+        if not eventos:
+            return None
+        with self._lock:
+            posicion = self._posiciones.get(operacion, 0)
+            self._posiciones[operacion] = posicion + 1
+        return eventos[posicion % len(eventos)]
+
+    def _reproducir(self, evento: dict):
+        espera = evento["duracion"] / self.velocidad if self.velocidad > 0 else 0.0
+        restante = tiempo_restante()
+        if restante is not None and restante < espera:
+            time.sleep(max(0.0, restante))
+            raise DeadlineExcedidoError("Se agotó el tiempo de espera del cliente")
+        time.sleep(espera)
+
+        if "error" in evento:
+            tipo = evento.get("error_tipo")
+            if tipo == "CircuitoAbiertoError":
+                raise CircuitoAbiertoError(evento["operacion"], CIRCUITO_SEGUNDOS_ABIERTO)
+            if tipo == "DeadlineExcedidoError":
+                raise DeadlineExcedidoError(evento["error"])
+            raise RuntimeError(evento["error"])
+
+        # Los textos grabados solo como huella vuelven como relleno del mismo tamaño
+        resultado = restaurar_textos(evento["resultado"])
+        if isinstance(resultado, list):
+            # Los fallos por elemento de un lote vuelven a ser excepciones
+            return [
+                ValueError(r["error"]) if isinstance(r, dict) and set(r) == {"error"} else dict(r)
+                for r in resultado
+            ]
+        return dict(resultado) if isinstance(resultado, dict) else resultado
+
+    def transcribir_audio(self, audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+        evento = self._grabado("stt", audio_bytes)
+        if evento is None:
+            return self._stub.transcribir_audio(audio_bytes, mime_type)
+        return self._reproducir(evento)
+
+    def explicar_jerga(self, texto: str, area_oficio: str | None = None) -> dict:
+        evento = self._grabado("explicar", texto)
+        if evento is None:
+            return self._stub.explicar_jerga(texto, area_oficio)
+        return self._reproducir(evento)
+
+    def explicar_jerga_lote(
+        self, textos: list[str], area_oficio: str | None = None
+    ) -> list[dict | Exception]:
+        evento = self._grabado("lote", textos)
+        if evento is None or not evento.get("resultado", True):
+            return self._stub.explicar_jerga_lote(textos, area_oficio)
+        resultados = self._reproducir(evento)
+        # Un lote grabado de otro tamaño se ajusta al número de textos pedido
+        return [resultados[i % len(resultados)] for i in range(len(textos))]
+
+    def analizar_archivo(
+        self, archivo_bytes: bytes, nombre_archivo: str, area_oficio: str | None = None
+    ) -> dict:
+        evento = self._grabado("archivo", archivo_bytes)
+        if evento is None:
+            return self._stub.analizar_archivo(archivo_bytes, nombre_archivo, area_oficio)
+        return self._reproducir(evento)
+
+    def analizar_imagen(
+        self, imagen_bytes: bytes, nombre_imagen: str, area_oficio: str | None = None
+    ) -> dict:
+        evento = self._grabado("imagen", imagen_bytes)
+        if evento is None:
+            return self._stub.analizar_imagen(imagen_bytes, nombre_imagen, area_oficio)
+        return self._reproducir(evento)
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import time
+
+from services.backends.base import BackendModelo
+from services.deadline import DeadlineExcedidoError, tiempo_restante
+from services.glossary import NIVELES_URGENCIA, explicar_localmente, glosario
+
+# ==========================
+# CONFIGURACIÓN DEL BACKEND STUB
+# ==========================
+# Espera fija por cada llamada "al modelo", para simular la latencia de red
+STUB_LATENCIA_SEGUNDOS = float(os.getenv("STUB_LATENCIA_SEGUNDOS", "0"))
+# Caracteres del documento que se devuelven como texto extraído
+STUB_MAX_TEXTO_EXTRAIDO = int(os.getenv("STUB_MAX_TEXTO_EXTRAIDO", "20000"))
+
+EXTENSIONES_TEXTO = {".txt", ".csv", ".json", ".xml", ".html", ".md"}
+
+
+def _huella(*partes) -> int:
+    datos = "\x00".join(str(p) for p in partes).encode("utf-8", "surrogatepass")
+    return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), "big")
+
+
+class BackendStub(BackendModelo):
+    """
+    Backend local y determinista, sin red ni API key: la misma entrada produce siempre
+    la misma salida. Sirve para CI, pruebas de carga y desarrollo sin cuota de Gemini.
+    Usa el glosario del área cuando el texto tiene términos conocidos.
+    """
+
+    nombre = "stub"
+
+    def __init__(self, latencia: float = STUB_LATENCIA_SEGUNDOS):
+        self.latencia = latencia
+
+    def _esperar(self) -> None:
+        if self.latencia <= 0:
+            return
+        restante = tiempo_restante()
+        if restante is not None and restante < self.latencia:
+            time.sleep(max(0.0, restante))
+            raise DeadlineExcedidoError("Se agotó el tiempo de espera del cliente")
+        time.sleep(self.latencia)
+
+    def _explicacion(self, texto: str, area: str) -> dict:
+        coincidencias = glosario.buscar(texto, area)
+        local = explicar_localmente(texto, coincidencias, cobertura_minima=0, max_palabras=10**6)
+        if local:
+            return local
+        resumen = " ".join(texto.split()[:25])
+        return {
+            "explicacion_clara": f"En palabras sencillas (respuesta de prueba): {resumen}",
+            "acciones_sugeridas": [
+                "Pida al especialista que le explique el siguiente paso",
+                "Guarde este mensaje para consultarlo más tarde",
+            ],
+            "nivel_urgencia": NIVELES_URGENCIA[_huella(texto, area) % len(NIVELES_URGENCIA)],
+        }
+
+    def transcribir_audio(self, audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+        self._esperar()
+        return (
+            f"Transcripción de prueba de {len(audio_bytes)} bytes ({mime_type}), "
+            f"huella {_huella(audio_bytes):016x}."
+        )
+
+    def explicar_jerga(self, texto: str, area_oficio: str | None = None) -> dict:
+        self._esperar()
+        return {**self._explicacion(texto, area_oficio or "general"), "origen": "stub"}
+
+    def explicar_jerga_lote(
+        self, textos: list[str], area_oficio: str | None = None
+    ) -> list[dict | Exception]:
+        # Como en Gemini, todo el lote cuesta una sola llamada
+        self._esperar()
+        area = area_oficio or "general"
+        return [{**self._explicacion(texto, area), "origen": "stub"} for texto in textos]
+
+    def analizar_archivo(
+        self, archivo_bytes: bytes, nombre_archivo: str, area_oficio: str | None = None
+    ) -> dict:
+        self._esperar()
+        if os.path.splitext(nombre_archivo)[1].lower() in EXTENSIONES_TEXTO:
+            texto = archivo_bytes[:STUB_MAX_TEXTO_EXTRAIDO].decode("utf-8", errors="replace")
+        else:
+            texto = f"Contenido de prueba de {nombre_archivo} ({len(archivo_bytes)} bytes)."
+        return {"texto_extraido": texto, **self._explicacion(texto, area_oficio or "general")}
+
+    def analizar_imagen(
+        self, imagen_bytes: bytes, nombre_imagen: str, area_oficio: str | None = None
+    ) -> dict:
+        self._esperar()
+        texto = f"Texto de prueba de la imagen {nombre_imagen}, huella {_huella(imagen_bytes):016x}."
+        return {"texto_extraido": texto, **self._explicacion(texto, area_oficio or "general")}
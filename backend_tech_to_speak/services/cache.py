@@ -0,0 +1,34 @@
+import threading
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+
+class CacheLRU(Generic[V]):
+    """Caché en memoria acotada, segura entre hilos, que descarta lo menos usado."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._datos: OrderedDict[Hashable, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable) -> V | None:
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: Hashable, valor: V) -> None:
+        if self.capacidad <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._datos)
@@ -0,0 +1,136 @@
+import math
+import os
+import threading
+import time
+from enum import Enum
+from typing import Callable, TypeVar
+
+from services.retry import es_error_transitorio
+
+T = TypeVar("T")
+
+# ==========================
+# CONFIGURACIÓN DEL CIRCUIT BREAKER
+# ==========================
+CIRCUITO_UMBRAL_FALLOS = int(os.getenv("CIRCUITO_UMBRAL_FALLOS", "5"))
+CIRCUITO_SEGUNDOS_ABIERTO = float(os.getenv("CIRCUITO_SEGUNDOS_ABIERTO", "30"))
+CIRCUITO_MAX_SONDAS = int(os.getenv("CIRCUITO_MAX_SONDAS", "1"))
+
+
+class EstadoCircuito(str, Enum):
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbiertoError(RuntimeError):
+    """El circuito de la operación está abierto: se falla sin llamar al modelo."""
+
+    def __init__(self, operacion: str, reintentar_en: float):
+        super().__init__(
+            f"El servicio de {operacion} no está disponible temporalmente; "
+            f"reintenta en {reintentar_en:.0f} s"
+        )
+        self.operacion = operacion
+        self.reintentar_en = reintentar_en
+
+    @property
+    def segundos_reintento(self) -> int:
+        """Valor entero para la cabecera Retry-After."""
+        return max(1, math.ceil(self.reintentar_en))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico de tres estados:
+    - cerrado: las llamadas pasan; `umbral_fallos` fallos seguidos lo abren.
+    - abierto: las llamadas fallan al instante con CircuitoAbiertoError.
+    - semiabierto: pasado `segundos_abierto` se dejan pasar hasta `max_sondas`
+      llamadas de prueba; un éxito lo cierra y un fallo lo vuelve a abrir.
+
+    Solo cuentan como fallos los errores transitorios del servicio (cuota, 5xx, timeouts),
+    no los errores causados por la propia petición.
+    """
+
+    def __init__(
+        self,
+        operacion: str,
+        umbral_fallos: int = CIRCUITO_UMBRAL_FALLOS,
+        segundos_abierto: float = CIRCUITO_SEGUNDOS_ABIERTO,
+        max_sondas: int = CIRCUITO_MAX_SONDAS,
+    ):
+        self.operacion = operacion
+        self.umbral_fallos = umbral_fallos
+        self.segundos_abierto = segundos_abierto
+        self.max_sondas = max_sondas
+        self._lock = threading.Lock()
+        self._estado = EstadoCircuito.CERRADO
+        self._fallos_seguidos = 0
+        self._abierto_desde = 0.0
+        self._sondas_en_curso = 0
+
+    @property
+    def estado(self) -> EstadoCircuito:
+        with self._lock:
+            return self._estado
+
+    def _permitir(self) -> None:
+        with self._lock:
+            if self._estado == EstadoCircuito.CERRADO:
+                return
+
+            if self._estado == EstadoCircuito.ABIERTO:
+                transcurrido = time.monotonic() - self._abierto_desde
+                if transcurrido < self.segundos_abierto:
+                    raise CircuitoAbiertoError(self.operacion, self.segundos_abierto - transcurrido)
+                self._estado = EstadoCircuito.SEMIABIERTO
+                self._sondas_en_curso = 0
+
+            if self._sondas_en_curso >= self.max_sondas:
+                raise CircuitoAbiertoError(self.operacion, self.segundos_abierto)
+            self._sondas_en_curso += 1
+
+    def _registrar_exito(self) -> None:
+        with self._lock:
+            self._estado = EstadoCircuito.CERRADO
+            self._fallos_seguidos = 0
+            self._sondas_en_curso = 0
+
+    def _registrar_fallo(self) -> None:
+        with self._lock:
+            self._fallos_seguidos += 1
+            if (
+                self._estado == EstadoCircuito.SEMIABIERTO
+                or self._fallos_seguidos >= self.umbral_fallos
+            ):
+                self._estado = EstadoCircuito.ABIERTO
+                self._abierto_desde = time.monotonic()
+                self._sondas_en_curso = 0
+
+    def _liberar_sonda(self) -> None:
+        with self._lock:
+            if self._estado == EstadoCircuito.SEMIABIERTO and self._sondas_en_curso > 0:
+                self._sondas_en_curso -= 1
+
+    def ejecutar(self, llamada: Callable[[], T]) -> T:
+        self._permitir()
+        try:
+            resultado = llamada()
+        except Exception as e:
+            # DeadlineExcedidoError encadena el error transitorio que agotó los reintentos
+            if es_error_transitorio(e) or es_error_transitorio(e.__cause__):
+                self._registrar_fallo()
+            else:
+                # Error de la petición, no del servicio: la sonda no decide nada
+                self._liberar_sonda()
+            raise
+        self._registrar_exito()
+        return resultado
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "operacion": self.operacion,
+                "estado": self._estado.value,
+                "fallos_seguidos": self._fallos_seguidos,
+            }
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from services.key_pool import ClaveGemini
+from services.metrics import consultas_cache
+
+# ==========================
+# CONFIGURACIÓN DEL CONTEXT CACHING
+# ==========================
+# Desactivado por defecto: las instrucciones actuales no llegan al mínimo cacheable
+CACHE_CONTEXTO_ACTIVO = os.getenv("CACHE_CONTEXTO_ACTIVO", "0") == "1"
+CACHE_CONTEXTO_TTL_SEGUNDOS = int(os.getenv("CACHE_CONTEXTO_TTL_SEGUNDOS", "3600"))
+# Se renueva el TTL cuando quede menos que esto, para no usar nunca un handle caducado
+CACHE_CONTEXTO_MARGEN_SEGUNDOS = int(os.getenv("CACHE_CONTEXTO_MARGEN_SEGUNDOS", "120"))
+# Si la API rechaza cachear unas instrucciones (p. ej. por no llegar al mínimo de tokens),
+# no se vuelve a intentar hasta pasado este tiempo
+CACHE_CONTEXTO_REINTENTO_SEGUNDOS = int(os.getenv("CACHE_CONTEXTO_REINTENTO_SEGUNDOS", "3600"))
+# Tokens mínimos que Gemini acepta cachear (depende del modelo: 1024 en Flash, más en Pro).
+# Por debajo ni se intenta: la API respondería 400
+CACHE_CONTEXTO_MIN_TOKENS = int(os.getenv("CACHE_CONTEXTO_MIN_TOKENS", "1024"))
+# Estimación local, sin llamar a count_tokens: unos 4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+
+
+@dataclass
+class _Entrada:
+    nombre: str | None
+    expira: float
+    lock: threading.Lock
+
+
+class CacheContexto:
+    """
+    Registra en el context caching de Gemini las instrucciones fijas de cada prompt
+    (una vez por API key y modelo, porque las cachés pertenecen al proyecto de la clave)
+    y devuelve el nombre del handle para usarlo por referencia en generate_content.
+
+    El handle se crea y se renueva en un hilo aparte, nunca en el camino de la petición:
+    mientras no hay handle vigente (o si no se puede crear) se devuelve None y la llamada
+    envía las instrucciones como system_instruction, como siempre. Las instrucciones por
+    debajo de CACHE_CONTEXTO_MIN_TOKENS no se intentan cachear.
+    """
+
+    def __init__(
+        self,
+        ttl_segundos: int = CACHE_CONTEXTO_TTL_SEGUNDOS,
+        margen_segundos: int = CACHE_CONTEXTO_MARGEN_SEGUNDOS,
+    ):
+        self.ttl_segundos = ttl_segundos
+        self.margen_segundos = margen_segundos
+        self._entradas: dict[tuple, _Entrada] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-contexto")
+
+    @staticmethod
+    def _clave(clave: ClaveGemini, modelo: str, instrucciones: str) -> tuple:
+        huella = hashlib.sha256(instrucciones.encode()).hexdigest()[:16]
+        return (clave.indice, modelo, huella)
+
+    def _entrada(self, clave_cache: tuple) -> _Entrada:
+        with self._lock:
+            entrada = self._entradas.get(clave_cache)
+            if entrada is None:
+                entrada = _Entrada(nombre=None, expira=0.0, lock=threading.Lock())
+                self._entradas[clave_cache] = entrada
+            return entrada
+
+    def obtener(self, clave: ClaveGemini, modelo: str, instrucciones: str) -> str | None:
+        """Nombre del handle vigente para estas instrucciones, o None si no hay."""
+        nombre = self._obtener(clave, modelo, instrucciones)
+        consultas_cache.incrementar(cache="contexto", resultado="acierto" if nombre else "fallo")
+        return nombre
+
+    def _obtener(self, clave: ClaveGemini, modelo: str, instrucciones: str) -> str | None:
+        if len(instrucciones) / CARACTERES_POR_TOKEN < CACHE_CONTEXTO_MIN_TOKENS:
+            return None
+        clave_cache = self._clave(clave, modelo, instrucciones)
+        entrada = self._entrada(clave_cache)
+        ahora = time.monotonic()
+        if ahora < entrada.expira - self.margen_segundos:
+            return entrada.nombre
+
+        # Solo una actualización en curso por entrada; se libera el lock al terminarla
+        if entrada.lock.acquire(blocking=False):
+            self._executor.submit(self._actualizar, clave, modelo, instrucciones, clave_cache, entrada)
+        return entrada.nombre if ahora < entrada.expira else None
+
+    def _actualizar(
+        self, clave: ClaveGemini, modelo: str, instrucciones: str, clave_cache: tuple, entrada: _Entrada
+    ) -> None:
+        try:
+            if entrada.nombre and time.monotonic() < entrada.expira:
+                self._renovar(clave, entrada)
+            else:
+                self._crear(clave, modelo, instrucciones, clave_cache, entrada)
+        except Exception as e:
+            print(f"⚠️ Error al actualizar la caché de contexto: {e}")
+        finally:
+            entrada.lock.release()
+
+    def _crear(
+        self, clave: ClaveGemini, modelo: str, instrucciones: str, clave_cache: tuple, entrada: _Entrada
+    ) -> None:
+        from google.genai import errors, types
+
+        try:
+            cache = clave.client.caches.create(
+                model=modelo,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=instrucciones,
+                    ttl=f"{self.ttl_segundos}s",
+                    display_name=f"tech-to-speak-{clave_cache[2]}",
+                ),
+            )
+        except errors.APIError as e:
+            print(f"⚠️ No se pudo crear la caché de contexto ({e.code}): {e}")
+            entrada.nombre = None
+            # Un rechazo (400: contenido demasiado corto, modelo sin soporte) no cambia
+            # con reintentos inmediatos; un fallo transitorio se reintenta pronto
+            espera = CACHE_CONTEXTO_REINTENTO_SEGUNDOS if e.code == 400 else 30
+            entrada.expira = time.monotonic() + espera
+            return
+        entrada.nombre = cache.name
+        entrada.expira = time.monotonic() + self.ttl_segundos
+
+    def _renovar(self, clave: ClaveGemini, entrada: _Entrada) -> None:
+        from google.genai import errors, types
+
+        try:
+            clave.client.caches.update(
+                name=entrada.nombre,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_segundos}s"),
+            )
+        except errors.APIError as e:
+            print(f"⚠️ No se pudo renovar la caché de contexto ({e.code}): {e}")
+            return
+        entrada.expira = time.monotonic() + self.ttl_segundos
+
+    def invalidar(self, clave: ClaveGemini, modelo: str, instrucciones: str) -> None:
+        """Olvida el handle (p. ej. si la API dice que ya no existe) para recrearlo."""
+        entrada = self._entrada(self._clave(clave, modelo, instrucciones))
+        entrada.nombre = None
+        entrada.expira = 0.0
@@ -0,0 +1,46 @@
+import time
+from contextvars import ContextVar, Token
+
+# ==========================
+# DEADLINE POR PETICIÓN
+# ==========================
+# Instante (time.monotonic) a partir del cual el cliente ya no espera la respuesta.
+# Lo fija el middleware de main.py a partir de la cabecera X-Request-Timeout y
+# lo consultan los reintentos de la capa de servicio.
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExcedidoError(TimeoutError):
+    """Se agotó el tiempo que el cliente estaba dispuesto a esperar."""
+
+
+def establecer_deadline(timeout_segundos: float | None) -> Token:
+    """
+    Fija el deadline de la petición actual a `timeout_segundos` desde ahora.
+    Devuelve el token para restablecer el valor anterior.
+    """
+    deadline = None
+    if timeout_segundos is not None:
+        deadline = time.monotonic() + timeout_segundos
+    return _deadline.set(deadline)
+
+
+def restablecer_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def tiempo_restante() -> float | None:
+    """
+    Segundos que quedan antes del deadline, o None si la petición no tiene deadline.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def verificar_deadline() -> None:
+    """Lanza DeadlineExcedidoError si el deadline de la petición ya pasó."""
+    restante = tiempo_restante()
+    if restante is not None and restante <= 0:
+        raise DeadlineExcedidoError("Se agotó el tiempo de espera del cliente")
@@ -0,0 +1,176 @@
+"""
+Extracción local del texto de los archivos que no necesitan al modelo para leerse:
+texto plano (TXT, CSV, JSON, XML, HTML), documentos Office Open XML (DOCX, XLSX,
+PPTX), OpenDocument y, si está instalado pypdf, PDF con capa de texto.
+"""
+import html
+import io
+import re
+import zipfile
+from xml.etree import ElementTree
+
+from services.sniffing import pdf_tiene_texto
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+# Tamaño máximo descomprimido de cada XML de un documento (protege de ZIP bomb)
+MAX_BYTES_XML = 50 * 1024 * 1024
+# Por debajo de esta media, la capa de texto de un PDF son restos (números de página,
+# sellos) sobre páginas escaneadas: lo lee el modelo
+MIN_CARACTERES_POR_PAGINA_PDF = 20
+
+# Comentarios, scripts y estilos, cuyo contenido no es texto visible
+_APERTURA_BLOQUE = re.compile(r"<!--|<(script|style)\b", re.IGNORECASE)
+_CIERRES_BLOQUE = {
+    None: re.compile(r"-->"),
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+}
+# Sin "<" dentro: un "<" sin cerrar no hace que se recorra el resto del documento
+_ETIQUETA_HTML = re.compile(r"<[^<>]*>")
+
+_WORD = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+_POWERPOINT = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+def extraer_texto(contenido: bytes, mime_type: str) -> str | None:
+    """
+    Texto del archivo extraído en local, o None si su formato necesita al modelo
+    (PDF escaneado, imágenes, .doc antiguos) o no se pudo leer.
+    """
+    try:
+        if mime_type.startswith("text/") or mime_type in ("application/json", "application/xml"):
+            texto = _decodificar(contenido)
+            return _texto_html(texto) if mime_type == "text/html" else texto
+        if mime_type == _WORD:
+            return _xml_zip(contenido, ["word/document.xml"])
+        if mime_type == _POWERPOINT:
+            return _xml_zip(contenido, _ordenadas(contenido, "ppt/slides/slide"))
+        if mime_type == _EXCEL:
+            return _excel(contenido)
+        if mime_type.startswith("application/vnd.oasis.opendocument."):
+            return _xml_zip(contenido, ["content.xml"])
+        if mime_type == "application/pdf" and pypdf is not None and pdf_tiene_texto(contenido):
+            return _pdf(contenido)
+    except (zipfile.BadZipFile, ElementTree.ParseError, KeyError, IndexError, ValueError):
+        return None
+    except Exception as e:
+        # pypdf lanza sus propias excepciones con PDF dañados o cifrados
+        print(f"⚠️ No se pudo extraer el texto en local ({mime_type}): {e}")
+        return None
+    return None
+
+
+def _pdf(contenido: bytes) -> str | None:
+    paginas = pypdf.PdfReader(io.BytesIO(contenido)).pages
+    texto = "\n\n".join(pagina.extract_text() or "" for pagina in paginas)
+    if len("".join(texto.split())) < MIN_CARACTERES_POR_PAGINA_PDF * max(1, len(paginas)):
+        return None
+    return texto
+
+
+def _decodificar(contenido: bytes) -> str:
+    if contenido.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return contenido.decode("utf-16")
+    try:
+        return contenido.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # Archivos exportados por programas antiguos (CSV de Excel en Windows)
+        return contenido.decode("cp1252", errors="replace")
+
+
+def _texto_html(texto: str) -> str:
+    """
+    Texto visible del HTML. Ni html.parser ni una expresión regular con .*? son lineales
+    con bloques sin cerrar ("<script <script <script..."): cada bloque se busca con su
+    cierre desde donde terminó el anterior y, si no se cierra, el texto acaba ahí.
+    """
+    partes = []
+    posicion = 0
+    while (apertura := _APERTURA_BLOQUE.search(texto, posicion)) is not None:
+        partes.append(texto[posicion:apertura.start()])
+        nombre = apertura.group(1)
+        cierre = _CIERRES_BLOQUE[nombre.lower() if nombre else None].search(texto, apertura.end())
+        if cierre is None:
+            posicion = len(texto)
+            break
+        partes.append(" ")
+        posicion = cierre.end()
+    partes.append(texto[posicion:])
+    visible = _ETIQUETA_HTML.sub(" ", "".join(partes))
+    # Como mucho una línea en blanco seguida
+    lineas = []
+    for linea in html.unescape(visible).splitlines():
+        linea = linea.strip()
+        if linea or (lineas and lineas[-1]):
+            lineas.append(linea)
+    return "\n".join(lineas).strip()
+
+
+def _leer_xml(archivo: zipfile.ZipFile, nombre: str) -> ElementTree.Element:
+    if archivo.getinfo(nombre).file_size > MAX_BYTES_XML:
+        raise ValueError(f"{nombre} demasiado grande para extraerlo en local")
+    return ElementTree.fromstring(archivo.read(nombre))
+
+
+def _local(etiqueta: str) -> str:
+    """Nombre de la etiqueta sin el espacio de nombres: {ns}p -> p."""
+    return etiqueta.rsplit("}", 1)[-1]
+
+
+def _ordenadas(contenido: bytes, prefijo: str) -> list[str]:
+    """Entradas slide1.xml, slide2.xml... en orden numérico y no alfabético."""
+    with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+        nombres = [
+            n for n in archivo.namelist()
+            if n.startswith(prefijo) and n.endswith(".xml") and n[len(prefijo):-4].isdigit()
+        ]
+    return sorted(nombres, key=lambda n: int(n[len(prefijo):-4]))
+
+
+def _xml_zip(contenido: bytes, nombres: list[str]) -> str:
+    """Texto de los párrafos (w:p, a:p, text:p, text:h) de los XML indicados, uno por línea."""
+    parrafos = []
+    with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+        for nombre in nombres:
+            for elemento in _leer_xml(archivo, nombre).iter():
+                if _local(elemento.tag) in ("p", "h"):
+                    texto = "".join(elemento.itertext()).strip()
+                    if texto:
+                        parrafos.append(texto)
+    return "\n".join(parrafos)
+
+
+def _excel(contenido: bytes) -> str:
+    """Cada fila de cada hoja en una línea, con las celdas separadas por tabuladores."""
+    filas = []
+    with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+        compartidas = []
+        if "xl/sharedStrings.xml" in archivo.namelist():
+            compartidas = [
+                "".join(si.itertext())
+                for si in _leer_xml(archivo, "xl/sharedStrings.xml")
+                if _local(si.tag) == "si"
+            ]
+        hojas = _ordenadas(contenido, "xl/worksheets/sheet")
+        for hoja in hojas:
+            for fila in _leer_xml(archivo, hoja).iter():
+                if _local(fila.tag) != "row":
+                    continue
+                celdas = []
+                for celda in fila:
+                    if _local(celda.tag) != "c":
+                        continue
+                    valor = next((e.text for e in celda if _local(e.tag) == "v"), None)
+                    if celda.get("t") == "s" and valor is not None:
+                        valor = compartidas[int(valor)]
+                    elif celda.get("t") == "inlineStr":
+                        valor = "".join(celda.itertext())
+                    celdas.append(valor or "")
+                if any(celdas):
+                    filas.append("\t".join(celdas))
+    return "\n".join(filas)
@@ -1,47 +1,291 @@
 import json
 import re
 import os
-from dotenv import load_dotenv
-import google.generativeai as genai
-import mimetypes
 import tempfile
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from services.cache import CacheLRU
+from services.circuit_breaker import CircuitBreaker, CircuitoAbiertoError
+from services.context_cache import CACHE_CONTEXTO_ACTIVO, CacheContexto
+from services.deadline import DeadlineExcedidoError, tiempo_restante
+from services.extraction import extraer_texto
+from services.glossary import (
+    GLOSARIO_ANOTAR,
+    GLOSARIO_COBERTURA_DEGRADADA,
+    GLOSARIO_MAX_PALABRAS_DEGRADADA,
+    GLOSARIO_RESPUESTA_LOCAL,
+    anotar,
+    explicar_localmente,
+    glosario,
+)
+from services.hedging import HEDGING_ACTIVO, Hedger
+from services.key_pool import ClaveGemini, PoolClaves, cargar_api_keys
+from services.metrics import (
+    consultas_cache,
+    latencia_modelo,
+    metricas,
+    respuestas_no_json,
+    vias_archivo,
+)
+from services.prompts import PlantillaPrompt, registro as prompts
+from services.retry import ejecutar_con_reintentos
+from services.scheduler import CLASE_POR_OPERACION, PlanificadorWFQ
+from services.semantic_cache import CACHE_SEMANTICA_ACTIVA, CacheSemantica
+from services.sniffing import tipo_archivo
+from services.tracing import atributos_uso, span
+from services.usage import contabilidad
+
+if TYPE_CHECKING:
+    from google.genai import types
 
 # ==========================
 # CONFIGURACIÓN GEMINI
 # ==========================
-load_dotenv()
+# Un cliente, una cuota y un estado de salud por cada API key. Se crea en configurar()
+# (al arrancar la app), no al importar: importar el módulo no lee claves ni carga el SDK
+pool_claves: PoolClaves | None = None
+_lock_configuracion = threading.Lock()
+MODEL_NAME = "gemini-2.5-flash-lite"
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("❌ Falta GEMINI_API_KEY en el archivo .env")
+# Cola con prioridades delante del pool: las llamadas cortas no esperan tras los PDFs
+planificador = PlanificadorWFQ()
 
-genai.configure(api_key=API_KEY)
-MODEL_NAME = "gemini-2.5-flash-lite"
+# Instrucciones fijas de cada prompt registradas una vez en el context caching de Gemini
+cache_contexto = CacheContexto() if CACHE_CONTEXTO_ACTIVO else None
+
+# Hedging opcional para explicar_jerga (latencia de cola)
+hedger_explicar = Hedger("explicar") if HEDGING_ACTIVO else None
+
+# Un circuit breaker por operación: una caída del STT no bloquea las explicaciones
+circuitos = {
+    operacion: CircuitBreaker(operacion)
+    for operacion in ("stt", "explicar", "lote", "archivo", "imagen")
+}
+
+# Explicaciones reutilizables para textos casi idénticos (paráfrasis, otra conjugación)
+explicaciones_similares: CacheSemantica[dict] | None = (
+    CacheSemantica() if CACHE_SEMANTICA_ACTIVA else None
+)
+
+# Últimas explicaciones correctas, usadas como respuesta degradada con el circuito abierto
+explicaciones_recientes: CacheLRU[dict] = CacheLRU(
+    int(os.getenv("CACHE_DEGRADADA_CAPACIDAD", "1000"))
+)
+
+
+def _metricas_resiliencia():
+    """Estado de circuitos, API keys y cola para /metrics, leído al exportar."""
+    estados = {"cerrado": 0, "semiabierto": 1, "abierto": 2}
+    yield (
+        "tts_circuit_state",
+        "Estado del circuit breaker por operación (0 cerrado, 1 semiabierto, 2 abierto)",
+        [({"operacion": op}, estados[c.estadisticas()["estado"]]) for op, c in circuitos.items()],
+    )
+    claves = pool_claves.estadisticas()
+    yield (
+        "tts_api_key_healthy",
+        "1 si la API key está disponible, 0 si está en cuarentena",
+        [({"clave": c["clave"]}, int(c["sana"])) for c in claves],
+    )
+    yield (
+        "tts_api_key_quota_available",
+        "Llamadas disponibles ahora mismo en la cuota local de cada API key",
+        [({"clave": c["clave"]}, c["cuota_disponible"]) for c in claves],
+    )
+    cola = planificador.estadisticas()
+    yield (
+        "tts_upstream_in_flight",
+        "Llamadas al modelo en curso",
+        [({}, cola["en_curso"])],
+    )
+    yield (
+        "tts_queue_length",
+        "Llamadas esperando turno en el planificador por clase",
+        [({"clase": clase}, n) for clase, n in cola["en_cola"].items()],
+    )
+    if hedger_explicar:
+        hedging = hedger_explicar.estadisticas()
+        etiquetas = {"operacion": "explicar"}
+        yield (
+            "tts_hedge_rate",
+            "Fracción de llamadas de explicar con una copia de respaldo",
+            [(etiquetas, hedging["tasa_cobertura"])],
+        )
+        # Sin muestras en la ventana todavía no hay p99: la serie no se exporta
+        for nombre, campo, ayuda in (
+            ("tts_hedge_p99_unhedged_seconds", "p99_sin_cobertura_segundos",
+             "p99 de la llamada original, como si no hubiera hedging"),
+            ("tts_hedge_p99_observed_seconds", "p99_observada_segundos",
+             "p99 de la respuesta que llega primero, con hedging"),
+            ("tts_hedge_p99_improvement_seconds", "mejora_p99_segundos",
+             "Segundos de p99 que ahorra el hedging en la ventana reciente"),
+        ):
+            valor = hedging[campo]
+            yield nombre, ayuda, [(etiquetas, valor)] if valor is not None else []
+
+
+def configurar() -> PoolClaves:
+    """
+    Crea el pool de API keys (y con él los clientes del SDK) la primera vez que se llama.
+    Falla si no hay ninguna clave configurada.
+    """
+    global pool_claves
+    with _lock_configuracion:
+        if pool_claves is None:
+            api_keys = cargar_api_keys()
+            if not api_keys:
+                raise RuntimeError("❌ Falta GEMINI_API_KEY (o GEMINI_API_KEYS) en el archivo .env")
+            pool_claves = PoolClaves(api_keys)
+            metricas.registrar_recolector(_metricas_resiliencia)
+        return pool_claves
 
 
 # ==========================
-# 1) AUDIO → TEXTO
+# HELPER PARA LLAMAR AL MODELO
 # ==========================
-def transcribir_audio(audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
-    model = genai.GenerativeModel(MODEL_NAME)
+def _config(
+    instrucciones: str | None, nombre_cache: str | None, timeout: float | None
+) -> "types.GenerateContentConfig":
+    from google.genai import types
+
+    config = types.GenerateContentConfig()
+    if timeout is not None:
+        # El SDK espera el timeout en milisegundos
+        config.http_options = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+    if nombre_cache:
+        config.cached_content = nombre_cache
+    elif instrucciones:
+        config.system_instruction = instrucciones
+    return config
+
+
+def _llamar_modelo(clave: ClaveGemini, contenido, instrucciones: str | None, traza=None):
+    """
+    generate_content con las instrucciones fijas por referencia a la caché de contexto
+    cuando existe, o enviadas como system_instruction si no.
+    """
+    from google.genai import errors
 
-    prompt = (
-        "Transcribe el siguiente audio EXACTAMENTE al español. "
-        "No agregues explicaciones, ni resúmenes, ni comentarios. "
-        "Devuelve SOLO el texto transcrito."
-    )
+    nombre_cache = None
+    if instrucciones and cache_contexto:
+        nombre_cache = cache_contexto.obtener(clave, MODEL_NAME, instrucciones)
+    if traza is not None:
+        traza.set_attributes({"tts.clave": clave.nombre, "tts.cache_contexto": bool(nombre_cache)})
 
-    response = model.generate_content(
-        [
-            prompt,
-            {
-                "mime_type": mime_type,
-                "data": audio_bytes,
+    try:
+        return clave.client.models.generate_content(
+            model=MODEL_NAME,
+            contents=contenido,
+            config=_config(instrucciones, nombre_cache, tiempo_restante()),
+        )
+    except errors.APIError as e:
+        if not nombre_cache or e.code not in (400, 403, 404):
+            raise
+        # La caché caducó o se borró por fuera: se olvida y se repite sin ella
+        cache_contexto.invalidar(clave, MODEL_NAME, instrucciones)
+        return clave.client.models.generate_content(
+            model=MODEL_NAME,
+            contents=contenido,
+            config=_config(instrucciones, None, tiempo_restante()),
+        )
+
+
+def _generar(
+    contenido,
+    operacion: str,
+    clave: ClaveGemini | None = None,
+    prompt: PlantillaPrompt | None = None,
+    etapa: str | None = None,
+    area: str | None = None,
+):
+    """
+    Llama a generate_content a través del circuit breaker de `operacion`, con reintentos
+    y limitando cada intento al tiempo que le queda a la petición.
+    Cada intento espera su turno en el planificador y usa la API key con más cuota
+    libre, salvo que se fije `clave`. Las instrucciones de `prompt` son la parte fija,
+    que se envía aparte del contenido variable para poder cachearla.
+    `etapa` etiqueta la latencia en las métricas (por defecto, la operación) y,
+    junto con `area`, la contabilidad de tokens. Ambas llevan además el id del prompt,
+    para comparar las variantes de un experimento.
+    """
+    instrucciones = prompt.instrucciones if prompt else None
+    prompt_id = prompt.id if prompt else ""
+
+    def llamada(_timeout: float | None):
+        with planificador.turno(CLASE_POR_OPERACION[operacion]) as espera, span(
+            "gemini.generate_content",
+            **{
+                "gen_ai.request.model": MODEL_NAME,
+                "tts.etapa": etapa or operacion,
+                "tts.prompt": prompt_id,
+                "tts.espera_cola_segundos": espera,
             },
-        ]
-    )
+        ) as traza:
+            # El timeout se calcula tras la cola: la espera también cuenta para el deadline
+            inicio = time.perf_counter()
+            try:
+                response = pool_claves.ejecutar(
+                    lambda c: _llamar_modelo(c, contenido, instrucciones, traza),
+                    clave,
+                )
+            finally:
+                latencia_modelo.observar(
+                    time.perf_counter() - inicio, etapa=etapa or operacion, prompt=prompt_id
+                )
+            traza.set_attributes(atributos_uso(response))
+            contabilidad.registrar(response, etapa or operacion, area, prompt_id)
+            return response
+
+    return circuitos[operacion].ejecutar(lambda: ejecutar_con_reintentos(llamada))
+
+
+def _subir_archivo(path: str, mime_type: str, nombre_archivo: str) -> tuple[ClaveGemini, "types.File"]:
+    """Sube un archivo a la Files API y devuelve también la clave que lo subió."""
+    from google.genai import types
+
+    with planificador.turno(CLASE_POR_OPERACION["archivo"]), span(
+        "gemini.files.upload",
+        **{"tts.mime_type": mime_type, "tts.tamano_bytes": os.path.getsize(path)},
+    ):
+        inicio = time.perf_counter()
+        try:
+            return pool_claves.ejecutar(
+                lambda c: (
+                    c,
+                    c.client.files.upload(
+                        file=path,
+                        config=types.UploadFileConfig(
+                            mime_type=mime_type,
+                            display_name=nombre_archivo
+                        ),
+                    ),
+                )
+            )
+        finally:
+            latencia_modelo.observar(time.perf_counter() - inicio, etapa="upload")
+
+
+# ==========================
+# 1) AUDIO → TEXTO
+# ==========================
+def transcribir_audio(audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+    from google.genai import types
+
+    with span(
+        "transcribir_audio",
+        **{"tts.mime_type": mime_type, "tts.tamano_bytes": len(audio_bytes)},
+    ):
+        response = _generar(
+            [types.Part.from_bytes(data=audio_bytes, mime_type=mime_type)],
+            "stt",
+            prompt=prompts.obtener("stt"),
+        )
 
-    return response.text.strip()
+        return (response.text or "").strip()
 
 
 # ==========================
@@ -85,6 +329,15 @@ def _intentar_parsear_json(raw: str) -> dict | None:
     return None
 
 
+def _anotar_glosario(texto: str, area: str, coincidencias=None) -> str:
+    """Significados del glosario local para los términos conocidos del texto, si está activado."""
+    if not GLOSARIO_ANOTAR:
+        return ""
+    if coincidencias is None:
+        coincidencias = glosario.buscar(texto, area)
+    return anotar(coincidencias)
+
+
 # ==========================
 # 2) TEXTO TÉCNICO → EXPLICACIÓN + ACCIONES
 # ==========================
@@ -95,54 +348,244 @@ def explicar_jerga(texto: str, area_oficio: str | None = None) -> dict:
     - acciones_sugeridas: pasos concretos
     - nivel_urgencia: baja / media / alta
     """
-
-    model = genai.GenerativeModel(MODEL_NAME)
     area = area_oficio or "general"
+    with span(
+        "explicar_jerga", **{"tts.area": area, "tts.longitud_texto": len(texto)}
+    ) as traza:
+        resultado = _explicar_jerga(texto, area)
+        # De dónde salió la respuesta: glosario, cachés o modelo
+        traza.set_attribute("tts.origen", resultado["origen"])
+        return resultado
+
+
+def _explicar_jerga(texto: str, area: str) -> dict:
+    # Camino rápido: textos cortos formados solo por términos del glosario
+    # se responden en local, sin llamar al modelo
+    coincidencias = glosario.buscar(texto, area)
+    if GLOSARIO_RESPUESTA_LOCAL:
+        local = explicar_localmente(texto, coincidencias)
+        consultas_cache.incrementar(cache="glosario", resultado="acierto" if local else "fallo")
+        if local:
+            return {**local, "origen": "glosario"}
+
+    # Parte fija del prompt: va como system_instruction (o en la caché de contexto)
+    # y solo el texto y el área viajan en cada llamada
+    prompt = prompts.obtener("explicar", area)
+    contenido = prompt.renderizar(
+        texto=texto, area=area, glosario=_anotar_glosario(texto, area, coincidencias)
+    )
 
-    system_prompt = f"""
-Eres un traductor profesional de lenguaje técnico a lenguaje común.
-Tu tarea es convertir explicaciones complejas en un mensaje sencillo,
-amable y profesional, listo para que yo se lo lea o envíe a un usuario promedio.
-
-Instrucciones IMPORTANTES:
-1. Responde SIEMPRE en español.
-2. Mantén un tono tranquilo, empático y profesional.
-3. Devuelve SOLO un JSON válido, sin texto extra, sin bloques ```json.
-4. El JSON debe tener exactamente estas claves:
-   - "explicacion_clara": string
-   - "acciones_sugeridas": lista de strings (entre 2 y 5 elementos)
-   - "nivel_urgencia": string ("baja", "media" o "alta")
-
-La clave "explicacion_clara" debe ser un texto que yo pueda leerle directamente al usuario,
-explicándole qué está pasando de forma simple.
-
-La clave "acciones_sugeridas" debe contener cosas concretas que el usuario puede hacer o preguntar.
-
-TEXTO TÉCNICO ORIGINAL:
-\"\"\"{texto}\"\"\"
+    # La respuesta degradada sirve la última explicación del texto con cualquier
+    # variante del prompt (guarda cuál la generó). La caché semántica sí se parte por
+    # versión: un prompt nuevo no reutiliza explicaciones generadas con el anterior
+    clave_cache = (texto.strip().lower(), area)
+    particion = (area.lower(), prompt.version)
+    if explicaciones_similares:
+        similar = explicaciones_similares.buscar(texto, particion)
+        consultas_cache.incrementar(cache="semantica", resultado="acierto" if similar else "fallo")
+        if similar:
+            data, _ = similar
+            return {**data, "origen": "cache_semantica", "prompt": prompt.id}
 
-ÁREA DEL OFICIO: {area}
-"""
+    try:
+        if hedger_explicar:
+            response = hedger_explicar.ejecutar(
+                lambda: _generar(contenido, "explicar", prompt=prompt, area=area)
+            )
+        else:
+            response = _generar(contenido, "explicar", prompt=prompt, area=area)
+    except CircuitoAbiertoError:
+        # Respuesta degradada: la última explicación correcta del mismo texto, si existe,
+        # y si no, la del glosario con un umbral de cobertura más bajo
+        respaldo = explicaciones_recientes.obtener(clave_cache)
+        consultas_cache.incrementar(cache="degradada", resultado="acierto" if respaldo else "fallo")
+        if respaldo is not None:
+            return {**respaldo, "origen": "cache"}
+        local = explicar_localmente(
+            texto,
+            coincidencias,
+            cobertura_minima=GLOSARIO_COBERTURA_DEGRADADA,
+            max_palabras=GLOSARIO_MAX_PALABRAS_DEGRADADA,
+        )
+        consultas_cache.incrementar(cache="glosario_degradada", resultado="acierto" if local else "fallo")
+        if local is None:
+            raise
+        return {**local, "origen": "glosario"}
 
-    response = model.generate_content(system_prompt)
-    raw = response.text.strip()
+    raw = (response.text or "").strip()
 
-    data = _intentar_parsear_json(raw)
+    with span("parsear_json"):
+        data = _intentar_parsear_json(raw)
 
-    if not data:
+    if data:
+        explicaciones_recientes.guardar(clave_cache, {**data, "prompt": prompt.id})
+        if explicaciones_similares:
+            explicaciones_similares.guardar(texto, particion, data)
+    else:
         # Fallback por si Gemini no respeta el formato
+        respuestas_no_json.incrementar(operacion="explicar")
         data = {
             "explicacion_clara": raw,
             "acciones_sugeridas": [],
             "nivel_urgencia": "media",
         }
 
-    return data
+    return {**data, "origen": "modelo", "prompt": prompt.id}
+
+
+# ==========================
+# 2b) LOTE DE TEXTOS → EXPLICACIONES
+# ==========================
+# Tamaño máximo de cada paquete de textos que va en un mismo prompt
+LOTE_MAX_TOKENS_POR_PAQUETE = int(os.getenv("LOTE_MAX_TOKENS_POR_PAQUETE", "4000"))
+LOTE_MAX_TEXTOS_POR_PAQUETE = int(os.getenv("LOTE_MAX_TEXTOS_POR_PAQUETE", "20"))
+# Paquetes que se envían al modelo a la vez
+LOTE_CONCURRENCIA = int(os.getenv("LOTE_CONCURRENCIA", "4"))
+
+_executor_lote = ThreadPoolExecutor(max_workers=LOTE_CONCURRENCIA, thread_name_prefix="lote")
+
+
+def _estimar_tokens(texto: str) -> int:
+    # Aproximación habitual para español: ~4 caracteres por token
+    return len(texto) // 4 + 1
+
+
+def _empaquetar(textos: list[str]) -> list[list[int]]:
+    """
+    Agrupa los índices de `textos` en paquetes que no superan el límite de tokens
+    ni de textos por paquete, respetando el orden original.
+    """
+    paquetes: list[list[int]] = []
+    actual: list[int] = []
+    tokens_actual = 0
+    for i, texto in enumerate(textos):
+        tokens = _estimar_tokens(texto)
+        if actual and (
+            tokens_actual + tokens > LOTE_MAX_TOKENS_POR_PAQUETE
+            or len(actual) >= LOTE_MAX_TEXTOS_POR_PAQUETE
+        ):
+            paquetes.append(actual)
+            actual, tokens_actual = [], 0
+        actual.append(i)
+        tokens_actual += tokens
+    if actual:
+        paquetes.append(actual)
+    return paquetes
+
+
+def _intentar_parsear_lista_json(raw: str) -> list | None:
+    """Como _intentar_parsear_json, pero para respuestas que deben ser un array JSON."""
+    data = _intentar_parsear_json(raw)
+    if isinstance(data, list):
+        return data
+
+    inicio = raw.find("[")
+    fin = raw.rfind("]")
+    if inicio != -1 and fin != -1 and fin > inicio:
+        try:
+            data = json.loads(raw[inicio:fin + 1])
+        except Exception:
+            return None
+        if isinstance(data, list):
+            return data
+
+    return None
+
+
+def _explicar_paquete(textos: list[str], area: str) -> list[dict | Exception]:
+    bloques = "\n".join(
+        f'[ID {i}]\n"""{texto}"""' for i, texto in enumerate(textos)
+    )
+
+    prompt = prompts.obtener("lote", area)
+    response = _generar(
+        prompt.renderizar(bloques=bloques, area=area),
+        "lote",
+        prompt=prompt,
+        area=area,
+    )
+    raw = (response.text or "").strip()
+
+    data = _intentar_parsear_lista_json(raw)
+    if data is None:
+        respuestas_no_json.incrementar(operacion="lote")
+        error = ValueError("El modelo no devolvió un array JSON válido para este paquete")
+        return [error] * len(textos)
+
+    por_id: dict[int, dict] = {}
+    for item in data:
+        if isinstance(item, dict) and isinstance(item.get("id"), int):
+            por_id[item.pop("id")] = item
+
+    resultados: list[dict | Exception] = []
+    for i, texto in enumerate(textos):
+        item = por_id.get(i)
+        if item is None or "explicacion_clara" not in item:
+            resultados.append(ValueError("El modelo no devolvió la explicación de este texto"))
+            continue
+        resultados.append({**item, "origen": "modelo", "prompt": prompt.id})
+    return resultados
+
+
+def explicar_jerga_lote(textos: list[str], area_oficio: str | None = None) -> list[dict | Exception]:
+    """
+    Explica muchos textos cortos empaquetándolos en pocos prompts.
+
+    Los textos se agrupan en paquetes acotados en tokens; cada paquete es una sola
+    llamada que devuelve un array JSON, y los paquetes se procesan en paralelo.
+    Devuelve, en el orden de entrada, el resultado de cada texto o la excepción
+    que impidió obtenerlo, para que el llamador informe los fallos por elemento.
+    """
+    area = area_oficio or "general"
+    resultados: list[dict | Exception] = [None] * len(textos)
+
+    paquetes = _empaquetar(textos)
+    with span(
+        "explicar_jerga_lote",
+        **{"tts.area": area, "tts.textos": len(textos), "tts.paquetes": len(paquetes)},
+    ):
+        _resolver_paquetes(textos, area, paquetes, resultados)
+    return resultados
+
+
+def _resolver_paquetes(
+    textos: list[str], area: str, paquetes: list[list[int]], resultados: list
+) -> None:
+    futuras = [
+        # Cada paquete con su copia del contexto (deadline, prioridad)
+        _executor_lote.submit(
+            contextvars.copy_context().run,
+            _explicar_paquete,
+            [textos[i] for i in indices],
+            area,
+        )
+        for indices in paquetes
+    ]
+
+    for indices, futura in zip(paquetes, futuras):
+        try:
+            resultados_paquete = futura.result()
+        except Exception as e:
+            resultados_paquete = [e] * len(indices)
+        for i, resultado in zip(indices, resultados_paquete):
+            resultados[i] = resultado
 
 
 # ==========================
 # 3) ARCHIVO → TEXTO → EXPLICACIÓN
 # ==========================
+# Cada archivo va por la vía más barata según su formato real, no según su extensión:
+# - local: el texto se extrae aquí (texto plano, Office, OpenDocument y, con pypdf, PDF
+#   con capa de texto) y el modelo solo lo explica, sin leer el archivo
+# - en_linea: el archivo viaja dentro de la petición (PDF escaneado, RTF), sin subirlo
+#   a la Files API ni borrarlo después
+# - files_api: archivos grandes y formatos que Gemini solo acepta subidos; también el
+#   texto extraído que no cabe en una petición, como text/plain
+ARCHIVO_EXTRACCION_LOCAL = os.getenv("ARCHIVO_EXTRACCION_LOCAL", "1") == "1"
+# Gemini admite hasta 20 MB por petición y los bytes en línea viajan en base64
+ARCHIVO_MAX_BYTES_EN_LINEA = int(os.getenv("ARCHIVO_MAX_BYTES_EN_LINEA", str(10 * 1024 * 1024)))
+
+
 def analizar_archivo(archivo_bytes: bytes, nombre_archivo: str, area_oficio: str | None = None) -> dict:
     """
     Recibe un archivo (PDF, imagen, Word, etc.) y devuelve:
@@ -152,27 +595,103 @@ def analizar_archivo(archivo_bytes: bytes, nombre_archivo: str, area_oficio: str
     - nivel_urgencia: baja / media / alta
     """
     
-    model = genai.GenerativeModel(MODEL_NAME)
     area = area_oficio or "general"
-    
-    # Determinar MIME type
-    mime_type, _ = mimetypes.guess_type(nombre_archivo)
-    if not mime_type:
-        mime_type = "application/octet-stream"
-    
+    mime_type = tipo_archivo(archivo_bytes, nombre_archivo)
+
+    with span(
+        "analizar_archivo",
+        **{"tts.area": area, "tts.mime_type": mime_type, "tts.tamano_bytes": len(archivo_bytes)},
+    ) as traza:
+        texto = None
+        if ARCHIVO_EXTRACCION_LOCAL:
+            with span("extraer_texto_local"):
+                texto = extraer_texto(archivo_bytes, mime_type)
+        tipo_en_linea = _tipo_en_linea(mime_type)
+        if texto and texto.strip() and len(texto.encode("utf-8")) > ARCHIVO_MAX_BYTES_EN_LINEA:
+            # Demasiado texto para una petición: se sube a la Files API, pero ya extraído
+            # (Gemini no lee DOCX ni XLSX subidos)
+            archivo_bytes, mime_type = texto.encode("utf-8"), "text/plain"
+            texto = None
+        if texto and texto.strip():
+            via = "local"
+        elif tipo_en_linea and len(archivo_bytes) <= ARCHIVO_MAX_BYTES_EN_LINEA:
+            via = "en_linea"
+        else:
+            via = "files_api"
+        traza.set_attribute("tts.via", via)
+        vias_archivo.incrementar(via=via)
+
+        if via == "local":
+            return _explicar_texto_archivo(texto, nombre_archivo, area)
+        if via == "en_linea":
+            return _analizar_archivo_en_linea(archivo_bytes, area, tipo_en_linea)
+        return _analizar_archivo(archivo_bytes, nombre_archivo, area, mime_type)
+
+
+def _tipo_en_linea(mime_type: str) -> str | None:
+    """Tipo con el que Gemini acepta el archivo dentro de la petición, o None si no lo admite."""
+    if mime_type == "application/pdf" or mime_type.startswith("text/"):
+        return mime_type
+    if mime_type == "application/rtf":
+        return "text/rtf"
+    if mime_type in ("application/json", "application/xml"):
+        return "text/plain"
+    return None
+
+
+def _explicar_texto_archivo(texto: str, nombre_archivo: str, area: str) -> dict:
+    # El texto ya está extraído: el modelo solo lo explica (mismas instrucciones que
+    # explicar_jerga, y por tanto la misma caché de contexto)
+    prompt = prompts.obtener("explicar_archivo", area)
+    response = _generar(
+        prompt.renderizar(
+            texto=texto,
+            nombre_archivo=nombre_archivo,
+            area=area,
+            glosario=_anotar_glosario(texto, area),
+        ),
+        "archivo",
+        prompt=prompt,
+        etapa="explicar_archivo",
+        area=area,
+    )
+    data = _resultado_archivo(response, prompt)
+    data["texto_extraido"] = texto
+    return data
+
+
+def _analizar_archivo_en_linea(archivo_bytes: bytes, area: str, mime_type: str) -> dict:
+    from google.genai import types
+
+    prompt = prompts.obtener("archivo", area)
+    response = _generar(
+        [prompt.renderizar(area=area), types.Part.from_bytes(data=archivo_bytes, mime_type=mime_type)],
+        "archivo",
+        prompt=prompt,
+        area=area,
+    )
+    return _resultado_archivo(response, prompt)
+
+
+def _analizar_archivo(archivo_bytes: bytes, nombre_archivo: str, area: str, mime_type: str) -> dict:
     # Guardar el archivo en una ubicación temporal
     temp_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(nombre_archivo)[1]) as temp_file:
+        with span("escribir_temporal"), tempfile.NamedTemporaryFile(
+            delete=False, suffix=os.path.splitext(nombre_archivo)[1]
+        ) as temp_file:
             temp_path = temp_file.name
             temp_file.write(archivo_bytes)
         
-        # Subir archivo a Gemini usando el path temporal
-        archivo_temp = genai.upload_file(
-            path=temp_path,
-            mime_type=mime_type,
-            display_name=nombre_archivo
+        # Subir archivo a Gemini usando el path temporal. El archivo solo existe
+        # en el proyecto de la clave que lo sube: generación y borrado usan la misma.
+        clave, archivo_temp = circuitos["archivo"].ejecutar(
+            lambda: ejecutar_con_reintentos(
+                lambda _timeout: _subir_archivo(temp_path, mime_type, nombre_archivo)
+            )
         )
+    except (DeadlineExcedidoError, CircuitoAbiertoError):
+        raise
     except Exception as e:
         raise RuntimeError(f"Error al subir archivo a Gemini: {e}")
     finally:
@@ -184,38 +703,38 @@ def analizar_archivo(archivo_bytes: bytes, nombre_archivo: str, area_oficio: str
                 print(f"⚠️ Error al limpiar archivo temporal: {e}")
     
     # Prompt para extraer y explicar
-    system_prompt = f"""
-Eres un analizador profesional de documentos técnicos.
-Tu tarea es:
-1. Extraer el contenido/texto del archivo
-2. Convertir las explicaciones complejas en lenguaje común
-3. Identificar acciones sugeridas
-4. Determinar el nivel de urgencia
-
-Instrucciones IMPORTANTES:
-1. Responde SIEMPRE en español.
-2. Mantén un tono tranquilo, empático y profesional.
-3. Devuelve SOLO un JSON válido, sin texto extra, sin bloques ```json.
-4. El JSON debe tener exactamente estas claves:
-   - "texto_extraido": string (contenido del archivo)
-   - "explicacion_clara": string
-   - "acciones_sugeridas": lista de strings (entre 2 y 5 elementos)
-   - "nivel_urgencia": string ("baja", "media" o "alta")
-
-ÁREA DEL OFICIO: {area}
-
-Analiza el archivo adjunto y extrae la información según las instrucciones anteriores.
-"""
-
-    response = model.generate_content(
-        [system_prompt, archivo_temp]
-    )
-    
-    raw = response.text.strip()
-    data = _intentar_parsear_json(raw)
+    prompt = prompts.obtener("archivo", area)
+
+    try:
+        response = _generar(
+            [prompt.renderizar(area=area), archivo_temp],
+            "archivo",
+            clave,
+            prompt=prompt,
+            area=area,
+        )
+    finally:
+        # Limpiar archivo temporal de Gemini aunque la generación falle
+        inicio = time.perf_counter()
+        try:
+            with span("gemini.files.delete"):
+                clave.client.files.delete(name=archivo_temp.name)
+        except Exception as e:
+            print(f"⚠️ Error al limpiar archivo de Gemini: {e}")
+        finally:
+            latencia_modelo.observar(time.perf_counter() - inicio, etapa="delete")
+
+    return _resultado_archivo(response, prompt)
+
+
+def _resultado_archivo(response, prompt) -> dict:
+    raw = (response.text or "").strip()
+    with span("parsear_json"):
+        data = _intentar_parsear_json(raw)
 
     if not data:
         # Fallback si Gemini no respeta el formato
+        respuestas_no_json.incrementar(operacion="archivo")
         data = {
             "texto_extraido": raw,
             "explicacion_clara": raw,
@@ -223,12 +742,7 @@ Analiza el archivo adjunto y extrae la información según las instrucciones ant
             "nivel_urgencia": "media",
         }
 
-    # Limpiar archivo temporal de Gemini
-    try:
-        genai.delete_file(archivo_temp.name)
-    except Exception as e:
-        print(f"⚠️ Error al limpiar archivo de Gemini: {e}")
-
+    data["prompt"] = prompt.id
     return data
 
 
@@ -244,67 +758,54 @@ def analizar_imagen(imagen_bytes: bytes, nombre_imagen: str, area_oficio: str |
     - nivel_urgencia: baja / media / alta
     """
     
-    model = genai.GenerativeModel(MODEL_NAME)
     area = area_oficio or "general"
     
-    # Determinar MIME type para imagen
-    mime_type, _ = mimetypes.guess_type(nombre_imagen)
-    if not mime_type or not mime_type.startswith("image/"):
+    # MIME type por los magic bytes, como en analizar_archivo: la extensión puede mentir
+    mime_type = tipo_archivo(imagen_bytes, nombre_imagen)
+    if not mime_type.startswith("image/"):
         # Fallback a JPEG si no se detecta
         mime_type = "image/jpeg"
-    
+
+    with span(
+        "analizar_imagen",
+        **{"tts.area": area, "tts.mime_type": mime_type, "tts.tamano_bytes": len(imagen_bytes)},
+    ):
+        return _analizar_imagen(imagen_bytes, area, mime_type)
+
+
+def _analizar_imagen(imagen_bytes: bytes, area: str, mime_type: str) -> dict:
+    from google.genai import types
+
     # Primer paso: Extraer texto de la imagen
-    prompt_extraccion = """
-Extrae TODO el texto visible en esta imagen. 
-Responde SOLO con el texto extraído, sin explicaciones ni comentarios adicionales.
-Si no hay texto, responde con "No hay texto visible".
-"""
-    
-    response_extraccion = model.generate_content(
-        [
-            prompt_extraccion,
-            {
-                "mime_type": mime_type,
-                "data": imagen_bytes,
-            },
-        ]
+    response_extraccion = _generar(
+        [types.Part.from_bytes(data=imagen_bytes, mime_type=mime_type)],
+        "imagen",
+        prompt=prompts.obtener("ocr"),
+        etapa="ocr",
+        area=area,
     )
     
-    texto_extraido = response_extraccion.text.strip()
+    texto_extraido = (response_extraccion.text or "").strip()
     
-    # Segundo paso: Explicar el texto extraído
-    system_prompt = f"""
-Eres un traductor profesional de lenguaje técnico a lenguaje común.
-Tu tarea es convertir explicaciones complejas en un mensaje sencillo,
-amable y profesional, listo para que yo se lo lea o envíe a un usuario promedio.
-
-Instrucciones IMPORTANTES:
-1. Responde SIEMPRE en español.
-2. Mantén un tono tranquilo, empático y profesional.
-3. Devuelve SOLO un JSON válido, sin texto extra, sin bloques ```json.
-4. El JSON debe tener exactamente estas claves:
-   - "explicacion_clara": string
-   - "acciones_sugeridas": lista de strings (entre 2 y 5 elementos)
-   - "nivel_urgencia": string ("baja", "media" o "alta")
-
-La clave "explicacion_clara" debe ser un texto que yo pueda leerle directamente al usuario,
-explicándole qué está pasando de forma simple.
-
-La clave "acciones_sugeridas" debe contener cosas concretas que el usuario puede hacer o preguntar.
-
-TEXTO EXTRAÍDO DE LA IMAGEN:
-\"\"\"{texto_extraido}\"\"\"
-
-ÁREA DEL OFICIO: {area}
-"""
-
-    response_explicacion = model.generate_content(system_prompt)
-    raw = response_explicacion.text.strip()
+    # Segundo paso: Explicar el texto extraído (mismas instrucciones que explicar_jerga)
+    prompt = prompts.obtener("explicar_imagen", area)
+    response_explicacion = _generar(
+        prompt.renderizar(
+            texto=texto_extraido, area=area, glosario=_anotar_glosario(texto_extraido, area)
+        ),
+        "imagen",
+        prompt=prompt,
+        etapa="explicar_imagen",
+        area=area,
+    )
+    raw = (response_explicacion.text or "").strip()
     
-    data = _intentar_parsear_json(raw)
+    with span("parsear_json"):
+        data = _intentar_parsear_json(raw)
 
     if not data:
         # Fallback si Gemini no respeta el formato
+        respuestas_no_json.incrementar(operacion="imagen")
         data = {
             "explicacion_clara": raw,
             "acciones_sugeridas": [],
@@ -313,5 +814,6 @@ TEXTO EXTRAÍDO DE LA IMAGEN:
     
     # Agregar el texto extraído a la respuesta
     data["texto_extraido"] = texto_extraido
+    data["prompt"] = prompt.id
 
     return data
\ No newline at end of file
@@ -0,0 +1,296 @@
+import json
+import os
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Generic, Iterator, TypeVar
+
+V = TypeVar("V")
+
+# ==========================
+# CONFIGURACIÓN DEL GLOSARIO
+# ==========================
+GLOSARIO_DIR = os.getenv(
+    "GLOSARIO_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "glosario")
+)
+# Añade al prompt el significado de los términos conocidos que aparecen en el texto
+GLOSARIO_ANOTAR = os.getenv("GLOSARIO_ANOTAR", "1") == "1"
+# Respuesta local sin llamar al modelo: solo para textos cortos casi cubiertos por el glosario
+GLOSARIO_RESPUESTA_LOCAL = os.getenv("GLOSARIO_RESPUESTA_LOCAL", "1") == "1"
+GLOSARIO_COBERTURA_MINIMA = float(os.getenv("GLOSARIO_COBERTURA_MINIMA", "0.8"))
+GLOSARIO_MAX_PALABRAS = int(os.getenv("GLOSARIO_MAX_PALABRAS", "12"))
+# Con el circuito del modelo abierto se acepta una explicación local menos completa
+# antes que devolver un 503
+GLOSARIO_COBERTURA_DEGRADADA = float(os.getenv("GLOSARIO_COBERTURA_DEGRADADA", "0.5"))
+GLOSARIO_MAX_PALABRAS_DEGRADADA = int(os.getenv("GLOSARIO_MAX_PALABRAS_DEGRADADA", "40"))
+# Área cuyos términos se buscan siempre, además de los del área de la petición
+AREA_COMUN = "general"
+
+
+def normalizar(texto: str) -> str:
+    """
+    Minúsculas y sin tildes, carácter a carácter: el resultado tiene la misma
+    longitud que el original, así que las posiciones de las coincidencias sirven
+    para recortar el texto original.
+    """
+    return "".join(
+        (unicodedata.normalize("NFD", c.lower()) or c)[0] for c in texto
+    )
+
+
+@dataclass(frozen=True)
+class EntradaGlosario:
+    termino: str
+    explicacion: str
+    acciones: tuple[str, ...] = ()
+    urgencia: str = "baja"
+
+
+@dataclass(frozen=True)
+class Coincidencia:
+    inicio: int
+    fin: int
+    texto: str
+    entrada: EntradaGlosario
+
+
+# ==========================
+# AUTÓMATA AHO-CORASICK
+# ==========================
+class AutomataAhoCorasick(Generic[V]):
+    """
+    Encuentra todas las apariciones de un conjunto de patrones en una sola
+    pasada lineal sobre el texto, sin importar cuántos patrones haya.
+    """
+
+    def __init__(self):
+        self._transiciones: list[dict[str, int]] = [{}]
+        self._fallo: list[int] = [0]
+        # Por estado: (longitud del patrón, valor) de cada patrón que termina ahí
+        self._salidas: list[list[tuple[int, V]]] = [[]]
+        self._construido = False
+
+    def agregar(self, patron: str, valor: V) -> None:
+        if not patron:
+            return
+        estado = 0
+        for c in patron:
+            siguiente = self._transiciones[estado].get(c)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones.append({})
+                self._fallo.append(0)
+                self._salidas.append([])
+                self._transiciones[estado][c] = siguiente
+            estado = siguiente
+        self._salidas[estado].append((len(patron), valor))
+        self._construido = False
+
+    def construir(self) -> None:
+        """Calcula los enlaces de fallo recorriendo el trie por niveles."""
+        cola = deque()
+        for siguiente in self._transiciones[0].values():
+            self._fallo[siguiente] = 0
+            cola.append(siguiente)
+        while cola:
+            estado = cola.popleft()
+            for c, siguiente in self._transiciones[estado].items():
+                cola.append(siguiente)
+                fallo = self._fallo[estado]
+                while fallo and c not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(c, 0)
+                self._fallo[siguiente] = destino if destino != siguiente else 0
+                self._salidas[siguiente] = self._salidas[siguiente] + self._salidas[self._fallo[siguiente]]
+        self._construido = True
+
+    def buscar(self, texto: str) -> Iterator[tuple[int, int, V]]:
+        """Genera (inicio, fin, valor) de cada aparición, incluidas las solapadas."""
+        if not self._construido:
+            self.construir()
+        estado = 0
+        for i, c in enumerate(texto):
+            while estado and c not in self._transiciones[estado]:
+                estado = self._fallo[estado]
+            estado = self._transiciones[estado].get(c, 0)
+            for longitud, valor in self._salidas[estado]:
+                yield i + 1 - longitud, i + 1, valor
+
+
+# ==========================
+# GLOSARIO POR ÁREA
+# ==========================
+class Glosario:
+    """Un autómata por área de oficio con los términos (y sinónimos) de su diccionario."""
+
+    def __init__(self):
+        self._automatas: dict[str, AutomataAhoCorasick[EntradaGlosario]] = {}
+        self._terminos: dict[str, int] = {}
+
+    def agregar(self, area: str, entrada: EntradaGlosario, sinonimos: list[str] | None = None) -> None:
+        area = normalizar(area)
+        automata = self._automatas.setdefault(area, AutomataAhoCorasick())
+        for forma in (entrada.termino, *(sinonimos or [])):
+            automata.agregar(normalizar(forma), entrada)
+        self._terminos[area] = self._terminos.get(area, 0) + 1
+
+    def construir(self) -> None:
+        for automata in self._automatas.values():
+            automata.construir()
+
+    @classmethod
+    def cargar(cls, directorio: str = GLOSARIO_DIR) -> "Glosario":
+        """
+        Carga un JSON por área (`<area>.json`, lista de objetos con termino, explicacion,
+        acciones, urgencia y sinonimos opcionales). `general.json` aplica a todas las áreas.
+        """
+        glosario = cls()
+        if os.path.isdir(directorio):
+            for nombre in sorted(os.listdir(directorio)):
+                if not nombre.endswith(".json"):
+                    continue
+                area = nombre[: -len(".json")]
+                with open(os.path.join(directorio, nombre), encoding="utf-8") as f:
+                    for item in json.load(f):
+                        glosario.agregar(
+                            area,
+                            EntradaGlosario(
+                                termino=item["termino"],
+                                explicacion=item["explicacion"],
+                                acciones=tuple(item.get("acciones", [])),
+                                urgencia=item.get("urgencia", "baja"),
+                            ),
+                            item.get("sinonimos", []),
+                        )
+        glosario.construir()
+        return glosario
+
+    def buscar(self, texto: str, area: str | None = None) -> list[Coincidencia]:
+        """
+        Términos del área (y del glosario común) presentes en `texto` como palabras
+        completas. Si se solapan, gana la coincidencia más larga que empieza antes.
+        """
+        normalizado = normalizar(texto)
+        areas = {AREA_COMUN}
+        if area:
+            areas.add(normalizar(area))
+
+        candidatas = []
+        for nombre_area in areas:
+            automata = self._automatas.get(nombre_area)
+            if automata is None:
+                continue
+            for inicio, fin, entrada in automata.buscar(normalizado):
+                if _es_palabra_completa(normalizado, inicio, fin):
+                    candidatas.append((inicio, -(fin - inicio), fin, entrada))
+
+        coincidencias = []
+        ultimo_fin = 0
+        for inicio, _, fin, entrada in sorted(candidatas, key=lambda c: (c[0], c[1])):
+            if inicio < ultimo_fin:
+                continue
+            coincidencias.append(Coincidencia(inicio, fin, texto[inicio:fin], entrada))
+            ultimo_fin = fin
+        return coincidencias
+
+    def estadisticas(self) -> dict[str, int]:
+        return dict(self._terminos)
+
+
+def _es_palabra_completa(texto: str, inicio: int, fin: int) -> bool:
+    antes = texto[inicio - 1] if inicio > 0 else " "
+    despues = texto[fin] if fin < len(texto) else " "
+    return not antes.isalnum() and not despues.isalnum()
+
+
+def anotar(coincidencias: list[Coincidencia]) -> str:
+    """
+    Bloque para el prompt con el significado de los términos conocidos encontrados,
+    para que el modelo no tenga que deducirlos.
+    """
+    if not coincidencias:
+        return ""
+    vistas = []
+    for coincidencia in coincidencias:
+        if coincidencia.entrada not in vistas:
+            vistas.append(coincidencia.entrada)
+    lineas = [f"- {entrada.termino}: {entrada.explicacion}" for entrada in vistas]
+    return "\nTÉRMINOS CONOCIDOS (glosario interno):\n" + "\n".join(lineas) + "\n"
+
+
+glosario = Glosario.cargar()
+
+
+# ==========================
+# RESPUESTA LOCAL A PARTIR DEL GLOSARIO
+# ==========================
+# Palabras que no aportan significado y no cuentan para la cobertura
+PALABRAS_VACIAS = frozenset(
+    "a al con de del el en es hay la las lo los mi o para por que se su sus un una uno y".split()
+)
+NIVELES_URGENCIA = ("baja", "media", "alta")
+ACCION_GENERICA = "Si algo no queda claro, pida que se lo expliquen con un ejemplo"
+
+_PALABRA = re.compile(r"\w+")
+
+
+def cobertura(texto: str, coincidencias: list[Coincidencia]) -> tuple[float, int]:
+    """
+    Fracción de las palabras con significado del texto que forman parte de algún
+    término del glosario, y número de esas palabras.
+    """
+    palabras = [
+        m for m in _PALABRA.finditer(normalizar(texto)) if m.group() not in PALABRAS_VACIAS
+    ]
+    if not palabras:
+        return 0.0, 0
+    cubiertas = sum(
+        1 for m in palabras
+        if any(c.inicio <= m.start() and m.end() <= c.fin for c in coincidencias)
+    )
+    return cubiertas / len(palabras), len(palabras)
+
+
+def explicar_localmente(
+    texto: str,
+    coincidencias: list[Coincidencia],
+    cobertura_minima: float = GLOSARIO_COBERTURA_MINIMA,
+    max_palabras: int = GLOSARIO_MAX_PALABRAS,
+) -> dict | None:
+    """
+    Explicación determinista construida solo con el glosario, con el mismo formato que
+    la del modelo. Devuelve None si el texto es largo o tiene partes que el glosario
+    no cubre, para que lo resuelva el modelo.
+    """
+    if not coincidencias:
+        return None
+    fraccion, palabras = cobertura(texto, coincidencias)
+    if palabras > max_palabras or fraccion < cobertura_minima:
+        return None
+
+    entradas = []
+    for coincidencia in coincidencias:
+        if coincidencia.entrada not in entradas:
+            entradas.append(coincidencia.entrada)
+
+    explicacion = " ".join(
+        f"«{entrada.termino}» significa {entrada.explicacion}" for entrada in entradas
+    )
+    acciones = []
+    for entrada in entradas:
+        for accion in entrada.acciones:
+            if accion not in acciones:
+                acciones.append(accion)
+    if len(acciones) < 2:
+        acciones.append(ACCION_GENERICA)
+    # La urgencia del conjunto es la del término más urgente
+    urgencia = max(
+        (entrada.urgencia for entrada in entradas),
+        key=lambda nivel: NIVELES_URGENCIA.index(nivel) if nivel in NIVELES_URGENCIA else 1,
+    )
+    return {
+        "explicacion_clara": f"En palabras sencillas: {explicacion}",
+        "acciones_sugeridas": acciones[:5],
+        "nivel_urgencia": urgencia,
+    }
@@ -0,0 +1,152 @@
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# ==========================
+# CONFIGURACIÓN DE HEDGING
+# ==========================
+HEDGING_ACTIVO = os.getenv("HEDGING_ACTIVO", "0") == "1"
+# Fracción máxima de llamadas que pueden lanzar un duplicado (acota el coste extra)
+HEDGING_TASA_MAXIMA = float(os.getenv("HEDGING_TASA_MAXIMA", "0.05"))
+HEDGING_PERCENTIL = float(os.getenv("HEDGING_PERCENTIL", "0.95"))
+# Muestras necesarias antes de confiar en el percentil estimado
+HEDGING_MIN_MUESTRAS = int(os.getenv("HEDGING_MIN_MUESTRAS", "20"))
+HEDGING_MAX_HILOS = int(os.getenv("HEDGING_MAX_HILOS", "32"))
+
+
+def _percentil(valores: list[float], p: float) -> float | None:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, math.ceil(p * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Hedger:
+    """
+    Lanza una copia de la llamada si la primera no ha terminado al alcanzar el
+    percentil `percentil` de latencia observado, y se queda con la que acabe antes.
+
+    Las llamadas al modelo son bloqueantes y no se pueden interrumpir: la copia
+    perdedora se cancela si aún no empezó y, si ya está en curso, su resultado se descarta.
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        tasa_maxima: float = HEDGING_TASA_MAXIMA,
+        percentil: float = HEDGING_PERCENTIL,
+        min_muestras: int = HEDGING_MIN_MUESTRAS,
+        ventana: int = 1000,
+    ):
+        self.nombre = nombre
+        self.tasa_maxima = tasa_maxima
+        self.percentil = percentil
+        self.min_muestras = min_muestras
+        self._lock = threading.Lock()
+        # Latencia de la llamada original (sin hedging): base para el umbral
+        self._latencias_originales: deque[float] = deque(maxlen=ventana)
+        # Latencia que vio el cliente (con hedging)
+        self._latencias_observadas: deque[float] = deque(maxlen=ventana)
+        self._llamadas = 0
+        self._coberturas = 0
+        self._coberturas_ganadas = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=HEDGING_MAX_HILOS, thread_name_prefix=f"hedge-{nombre}"
+        )
+
+    def umbral(self) -> float | None:
+        """Latencia a partir de la cual se lanza la copia, o None si aún no hay datos."""
+        with self._lock:
+            if len(self._latencias_originales) < self.min_muestras:
+                return None
+            return _percentil(list(self._latencias_originales), self.percentil)
+
+    def _reservar_cobertura(self) -> bool:
+        with self._lock:
+            if self._coberturas + 1 > self.tasa_maxima * self._llamadas:
+                return False
+            self._coberturas += 1
+            return True
+
+    def _lanzar(self, llamada: Callable[[], T]) -> Future:
+        # Cada copia necesita su propio contexto (deadline, etc.): un mismo
+        # Context no puede ejecutarse en dos hilos a la vez.
+        return self._executor.submit(contextvars.copy_context().run, llamada)
+
+    def ejecutar(self, llamada: Callable[[], T]) -> T:
+        inicio = time.monotonic()
+        with self._lock:
+            self._llamadas += 1
+
+        umbral = self.umbral()
+        original = self._lanzar(llamada)
+        original.add_done_callback(
+            lambda f: self._registrar_original(time.monotonic() - inicio, f)
+        )
+
+        try:
+            if umbral is None:
+                return original.result()
+
+            hechas, _ = wait([original], timeout=umbral)
+            if hechas or not self._reservar_cobertura():
+                return original.result()
+
+            copia = self._lanzar(llamada)
+            pendientes = {original, copia}
+            while True:
+                hechas, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                ganadora = next(iter(hechas))
+                # Si la primera en terminar falló, esperamos a la otra antes de rendirnos
+                if ganadora.exception() is not None and pendientes:
+                    continue
+                for futura in pendientes:
+                    futura.cancel()
+                if ganadora is copia and ganadora.exception() is None:
+                    with self._lock:
+                        self._coberturas_ganadas += 1
+                return ganadora.result()
+        finally:
+            with self._lock:
+                self._latencias_observadas.append(time.monotonic() - inicio)
+
+    def _registrar_original(self, duracion: float, futura: Future) -> None:
+        if futura.cancelled() or futura.exception() is not None:
+            return
+        with self._lock:
+            self._latencias_originales.append(duracion)
+
+    def estadisticas(self) -> dict:
+        """Tasa de hedging y p99 con y sin hedging sobre la ventana reciente."""
+        with self._lock:
+            originales = list(self._latencias_originales)
+            observadas = list(self._latencias_observadas)
+            llamadas = self._llamadas
+            coberturas = self._coberturas
+            ganadas = self._coberturas_ganadas
+
+        p99_original = _percentil(originales, 0.99)
+        p99_observada = _percentil(observadas, 0.99)
+        mejora = None
+        if p99_original is not None and p99_observada is not None:
+            mejora = p99_original - p99_observada
+
+        return {
+            "operacion": self.nombre,
+            "llamadas": llamadas,
+            "coberturas": coberturas,
+            "coberturas_ganadas": ganadas,
+            "tasa_cobertura": coberturas / llamadas if llamadas else 0.0,
+            "umbral_segundos": self.umbral(),
+            "p99_sin_cobertura_segundos": p99_original,
+            "p99_observada_segundos": p99_observada,
+            "mejora_p99_segundos": mejora,
+        }
@@ -0,0 +1,282 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import Context
+from typing import Callable
+
+from services.scheduler import prioridad_actual
+from services.serialization import a_json
+from services.usage import cliente_actual
+
+# ==========================
+# CONFIGURACIÓN DE JOBS
+# ==========================
+JOBS_DIR = os.getenv("JOBS_DIR", ".jobs")
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", "4"))
+# Un job "en_proceso" sin actualizar en este tiempo se da por huérfano (worker caído)
+JOBS_LEASE_SEGUNDOS = float(os.getenv("JOBS_LEASE_SEGUNDOS", "120"))
+# Cada cuánto renueva cada proceso el lease de sus jobs en curso y retoma los huérfanos
+JOBS_LATIDO_SEGUNDOS = float(os.getenv("JOBS_LATIDO_SEGUNDOS", str(JOBS_LEASE_SEGUNDOS / 4)))
+# Los jobs terminados se borran pasado este tiempo
+JOBS_RETENCION_SEGUNDOS = float(os.getenv("JOBS_RETENCION_SEGUNDOS", str(24 * 3600)))
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_PROCESO = "en_proceso"
+ESTADO_COMPLETADO = "completado"
+ESTADO_ERROR = "error"
+ESTADOS_FINALES = {ESTADO_COMPLETADO, ESTADO_ERROR}
+
+# Procesa un job: recibe el contenido subido y sus parámetros, devuelve el resultado
+Manejador = Callable[[bytes, dict], dict]
+
+
+class JobStore:
+    """
+    Persistencia local de jobs: metadatos y resultados en SQLite, contenido subido
+    en archivos aparte. Sobrevive a reinicios del worker y se puede compartir
+    entre procesos de la misma máquina.
+    """
+
+    def __init__(self, directorio: str = JOBS_DIR):
+        self.directorio = directorio
+        self.directorio_payloads = os.path.join(directorio, "payloads")
+        os.makedirs(self.directorio_payloads, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directorio, "jobs.sqlite3"), check_same_thread=False, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    parametros TEXT NOT NULL,
+                    resultado TEXT,
+                    error TEXT,
+                    creado REAL NOT NULL,
+                    actualizado REAL NOT NULL,
+                    cliente TEXT
+                )
+                """
+            )
+            columnas = {fila["name"] for fila in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "cliente" not in columnas:
+                # Bases creadas antes de guardar el cliente de cada job
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN cliente TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_estado ON jobs (estado)")
+
+    def _ruta_payload(self, job_id: str) -> str:
+        return os.path.join(self.directorio_payloads, job_id)
+
+    def crear(self, tipo: str, contenido: bytes, parametros: dict, cliente: str | None = None) -> str:
+        job_id = uuid.uuid4().hex
+        # Primero el contenido: un job en la tabla siempre tiene su payload en disco
+        with open(self._ruta_payload(job_id), "wb") as f:
+            f.write(contenido)
+        ahora = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, tipo, estado, parametros, creado, actualizado, cliente) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, tipo, ESTADO_PENDIENTE, a_json(parametros).decode(), ahora, ahora, cliente),
+            )
+        return job_id
+
+    def obtener(self, job_id: str) -> dict | None:
+        with self._lock:
+            fila = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if fila is None:
+            return None
+        job = dict(fila)
+        job["parametros"] = json.loads(job["parametros"])
+        job["resultado"] = json.loads(job["resultado"]) if job["resultado"] else None
+        return job
+
+    def leer_payload(self, job_id: str) -> bytes:
+        with open(self._ruta_payload(job_id), "rb") as f:
+            return f.read()
+
+    def reclamar(self, job_id: str) -> bool:
+        """Pasa el job a en_proceso solo si seguía pendiente (evita que dos workers lo tomen)."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET estado = ?, actualizado = ? WHERE id = ? AND estado = ?",
+                (ESTADO_EN_PROCESO, time.time(), job_id, ESTADO_PENDIENTE),
+            )
+        return cursor.rowcount == 1
+
+    def renovar(self, job_ids: list[str]) -> None:
+        """Renueva el lease de los jobs que este proceso sigue ejecutando."""
+        if not job_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET actualizado = ? WHERE estado = ? "
+                f"AND id IN ({','.join('?' * len(job_ids))})",
+                (time.time(), ESTADO_EN_PROCESO, *job_ids),
+            )
+
+    def finalizar(self, job_id: str, resultado: dict | None = None, error: str | None = None) -> None:
+        estado = ESTADO_ERROR if error is not None else ESTADO_COMPLETADO
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET estado = ?, resultado = ?, error = ?, actualizado = ? WHERE id = ?",
+                (
+                    estado,
+                    a_json(resultado).decode() if resultado is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+        self._borrar_payload(job_id)
+
+    def _borrar_payload(self, job_id: str) -> None:
+        try:
+            os.remove(self._ruta_payload(job_id))
+        except FileNotFoundError:
+            pass
+
+    def recuperar_pendientes(self) -> list[str]:
+        """
+        Devuelve los jobs por procesar: los pendientes y los que quedaron en proceso
+        sin renovar su lease (su proceso se cayó), que vuelven a pendientes.
+        """
+        limite = time.time() - JOBS_LEASE_SEGUNDOS
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET estado = ? WHERE estado = ? AND actualizado < ?",
+                (ESTADO_PENDIENTE, ESTADO_EN_PROCESO, limite),
+            )
+            filas = self._conn.execute(
+                "SELECT id FROM jobs WHERE estado = ? ORDER BY creado", (ESTADO_PENDIENTE,)
+            ).fetchall()
+        return [fila["id"] for fila in filas]
+
+    def purgar(self) -> None:
+        """Borra los jobs terminados más antiguos que la retención."""
+        limite = time.time() - JOBS_RETENCION_SEGUNDOS
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE estado IN ({','.join('?' * len(ESTADOS_FINALES))}) "
+                "AND actualizado < ?",
+                (*ESTADOS_FINALES, limite),
+            )
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class GestorJobs:
+    """
+    Ejecuta los jobs en un pool de hilos y guarda su resultado en el JobStore.
+
+    Un hilo vigilante renueva cada JOBS_LATIDO_SEGUNDOS el lease de los jobs en curso de
+    este proceso (un job largo no se da por huérfano mientras se ejecuta) y retoma los
+    huérfanos de otros procesos caídos sin esperar a un reinicio.
+    """
+
+    def __init__(self, manejadores: dict[str, Manejador], max_workers: int = JOBS_MAX_WORKERS):
+        self.manejadores = manejadores
+        self.max_workers = max_workers
+        self.store: JobStore | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # Jobs enviados al pool de este proceso que aún no han terminado, y los que se ejecutan
+        self._programados: set[str] = set()
+        self._en_curso: set[str] = set()
+        self._parar = threading.Event()
+        self._vigilante: threading.Thread | None = None
+
+    def iniciar(self) -> None:
+        self.store = JobStore()
+        self.store.purgar()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="job"
+        )
+        self._retomar()
+        self._parar.clear()
+        self._vigilante = threading.Thread(target=self._vigilar, name="jobs-vigilante", daemon=True)
+        self._vigilante.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._vigilante:
+            self._vigilante.join()
+        # Los jobs en curso terminan; los que quedan pendientes se retoman al reiniciar
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.store:
+            self.store.cerrar()
+
+    def encolar(self, tipo: str, contenido: bytes, parametros: dict) -> str:
+        if tipo not in self.manejadores:
+            raise ValueError(f"Tipo de job desconocido: {tipo}")
+        # El cliente se guarda con el job: su consumo se le atribuye aunque se retome
+        # tras un reinicio
+        job_id = self.store.crear(tipo, contenido, parametros, cliente_actual.get())
+        self._programar(job_id)
+        return job_id
+
+    def obtener(self, job_id: str) -> dict | None:
+        return self.store.obtener(job_id)
+
+    def _vigilar(self) -> None:
+        while not self._parar.wait(JOBS_LATIDO_SEGUNDOS):
+            try:
+                with self._lock:
+                    en_curso = list(self._en_curso)
+                self.store.renovar(en_curso)
+                self._retomar()
+                self.store.purgar()
+            except Exception as e:
+                print(f"⚠️ Error al renovar o retomar jobs: {e}")
+
+    def _retomar(self) -> None:
+        for job_id in self.store.recuperar_pendientes():
+            self._programar(job_id)
+
+    def _programar(self, job_id: str) -> None:
+        with self._lock:
+            if job_id in self._programados:
+                return
+            self._programados.add(job_id)
+        # Contexto vacío: el job no hereda el deadline de la petición que lo creó. El
+        # cliente y la prioridad se fijan en _procesar
+        self._executor.submit(Context().run, self._ejecutar, job_id)
+
+    def _ejecutar(self, job_id: str) -> None:
+        try:
+            # Otro proceso puede haberlo reclamado antes
+            if not self.store.reclamar(job_id):
+                return
+            with self._lock:
+                self._en_curso.add(job_id)
+            self._procesar(job_id)
+        finally:
+            with self._lock:
+                self._en_curso.discard(job_id)
+                self._programados.discard(job_id)
+
+    def _procesar(self, job_id: str) -> None:
+        job = self.store.obtener(job_id)
+        # Los jobs no tienen a nadie esperando: ceden el paso a las peticiones interactivas
+        prioridad_actual.set("baja")
+        if job["cliente"]:
+            cliente_actual.set(job["cliente"])
+        try:
+            contenido = self.store.leer_payload(job_id)
+            resultado = self.manejadores[job["tipo"]](contenido, job["parametros"])
+        except Exception as e:
+            self.store.finalizar(job_id, error=str(e))
+            return
+        self.store.finalizar(job_id, resultado=resultado)
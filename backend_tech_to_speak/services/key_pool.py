@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, TypeVar
+
+from services.deadline import DeadlineExcedidoError, tiempo_restante
+from services.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    from google import genai
+
+T = TypeVar("T")
+
+# ==========================
+# CONFIGURACIÓN DEL POOL DE CLAVES
+# ==========================
+# Peticiones por minuto permitidas a cada clave (cuota del proyecto de Gemini)
+GEMINI_RPM_POR_CLAVE = float(os.getenv("GEMINI_RPM_POR_CLAVE", "60"))
+# Procesos que usan las mismas claves a la vez, cada uno con su propio pool (server.py lo
+# fija a su número de workers): cada proceso se queda con su parte de la cuota, para no
+# superarla entre todos
+GEMINI_PROCESOS_POR_CLAVE = max(1, int(os.getenv("GEMINI_PROCESOS_POR_CLAVE", "1")))
+# Tiempo que una clave queda fuera del reparto tras agotar su cuota (429)
+GEMINI_CUARENTENA_SEGUNDOS = float(os.getenv("GEMINI_CUARENTENA_SEGUNDOS", "30"))
+# Tiempo fuera del reparto si la clave es rechazada (inválida, sin permisos)
+GEMINI_CUARENTENA_CLAVE_INVALIDA_SEGUNDOS = float(
+    os.getenv("GEMINI_CUARENTENA_CLAVE_INVALIDA_SEGUNDOS", "600")
+)
+# Espera máxima por una clave libre cuando la petición no tiene deadline
+GEMINI_ESPERA_MAXIMA_CLAVE_SEGUNDOS = float(os.getenv("GEMINI_ESPERA_MAXIMA_CLAVE_SEGUNDOS", "30"))
+
+CODIGOS_CUOTA = {429}
+CODIGOS_CLAVE_INVALIDA = {401, 403}
+
+
+@dataclass
+class ClaveGemini:
+    """Una API key con su propio cliente, cuota y estado de salud."""
+
+    indice: int
+    client: "genai.Client"
+    bucket: TokenBucket
+    fuera_hasta: float = 0.0
+    llamadas: int = 0
+    errores: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def nombre(self) -> str:
+        # Nunca exponemos la clave en sí (logs, métricas)
+        return f"clave-{self.indice}"
+
+    def sana(self, ahora: float) -> bool:
+        return ahora >= self.fuera_hasta
+
+
+class PoolClaves:
+    """
+    Reparte las llamadas entre varias API keys de Gemini.
+
+    Cada llamada va a la clave sana con más cuota restante en su token bucket,
+    de modo que el throughput total crece con el número de claves. Las claves que
+    devuelven 429 o son rechazadas quedan en cuarentena un tiempo.
+    """
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        rpm_por_clave: float = GEMINI_RPM_POR_CLAVE,
+        procesos: int = GEMINI_PROCESOS_POR_CLAVE,
+    ):
+        if not api_keys:
+            raise ValueError("El pool necesita al menos una API key")
+        # Import diferido: el SDK (y su árbol de dependencias) solo se carga al crear el pool
+        from google import genai
+
+        # Cada proceso recarga su parte de la cuota. La ráfaga es de al menos una llamada:
+        # con menos RPM que procesos, una capacidad por debajo de 1 no dejaría llamar nunca
+        rpm_proceso = rpm_por_clave / max(1, procesos)
+        self.claves = [
+            ClaveGemini(
+                indice=i,
+                client=genai.Client(api_key=api_key),
+                bucket=TokenBucket(
+                    capacidad=max(1.0, rpm_proceso), tokens_por_segundo=rpm_proceso / 60
+                ),
+            )
+            for i, api_key in enumerate(api_keys)
+        ]
+        self._lock = threading.Lock()
+
+    def _intentar_adquirir(self) -> tuple[ClaveGemini | None, float]:
+        """Devuelve la clave reservada o, si no hay ninguna, cuánto esperar."""
+        ahora = time.monotonic()
+        with self._lock:
+            sanas = [clave for clave in self.claves if clave.sana(ahora)]
+            for clave in sorted(sanas, key=lambda c: c.bucket.disponibles(), reverse=True):
+                if clave.bucket.consumir():
+                    return clave, 0.0
+
+            esperas = [clave.bucket.segundos_hasta() for clave in sanas]
+            esperas += [clave.fuera_hasta - ahora for clave in self.claves if not clave.sana(ahora)]
+            return None, max(0.01, min(esperas))
+
+    def adquirir(self) -> ClaveGemini:
+        """
+        Reserva una llamada en la clave con más cuota restante, esperando si todas
+        están agotadas pero sin pasar del deadline de la petición.
+        """
+        limite = time.monotonic() + GEMINI_ESPERA_MAXIMA_CLAVE_SEGUNDOS
+        while True:
+            clave, espera = self._intentar_adquirir()
+            if clave:
+                return clave
+
+            restante = tiempo_restante()
+            if restante is None:
+                restante = limite - time.monotonic()
+            if espera >= restante:
+                raise DeadlineExcedidoError("Todas las API keys de Gemini están sin cuota")
+            time.sleep(espera)
+
+    def registrar_resultado(self, clave: ClaveGemini, error: Exception | None = None) -> None:
+        with clave.lock:
+            clave.llamadas += 1
+            if error is None:
+                return
+            clave.errores += 1
+            codigo = getattr(error, "code", None)
+            if codigo in CODIGOS_CUOTA:
+                clave.fuera_hasta = time.monotonic() + GEMINI_CUARENTENA_SEGUNDOS
+            elif codigo in CODIGOS_CLAVE_INVALIDA:
+                clave.fuera_hasta = time.monotonic() + GEMINI_CUARENTENA_CLAVE_INVALIDA_SEGUNDOS
+
+    def ejecutar(self, llamada: Callable[[ClaveGemini], T], clave: ClaveGemini | None = None) -> T:
+        """
+        Ejecuta `llamada(clave)` en la clave indicada o en la mejor disponible.
+        Se fija la clave cuando la llamada depende de recursos de ese proyecto
+        (p. ej. un archivo subido con la Files API).
+        """
+        if clave is None:
+            clave = self.adquirir()
+        else:
+            clave.bucket.consumir()
+        try:
+            resultado = llamada(clave)
+        except Exception as e:
+            self.registrar_resultado(clave, e)
+            raise
+        self.registrar_resultado(clave, None)
+        return resultado
+
+    def estadisticas(self) -> list[dict]:
+        ahora = time.monotonic()
+        return [
+            {
+                "clave": clave.nombre,
+                "sana": clave.sana(ahora),
+                "cuota_disponible": round(clave.bucket.disponibles(), 2),
+                "llamadas": clave.llamadas,
+                "errores": clave.errores,
+            }
+            for clave in self.claves
+        ]
+
+
+def cargar_api_keys() -> list[str]:
+    """
+    Lee las claves de GEMINI_API_KEYS (separadas por comas) o, si no existe,
+    de la variable clásica GEMINI_API_KEY.
+    """
+    valor = os.getenv("GEMINI_API_KEYS") or os.getenv("GEMINI_API_KEY") or ""
+    return [clave.strip() for clave in valor.split(",") if clave.strip()]
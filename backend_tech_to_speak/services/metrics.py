@@ -0,0 +1,241 @@
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable
+
+# ==========================
+# BUCKETS
+# ==========================
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas_texto(nombres: tuple[str, ...], valores: tuple, extra: str = "") -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def plantilla_ruta(scope: dict) -> str:
+    """
+    Plantilla de la ruta (/api/v1/jobs/{job_id}) y no la URL concreta, para no crear
+    una serie por job. Se reconstruye desde la URL porque la ruta de FastAPI no
+    incluye el prefijo del router.
+    """
+    if scope.get("route") is None:
+        # Sin ruta asociada (404): una sola serie para todas las URLs desconocidas
+        return "desconocida"
+    ruta = scope["path"]
+    for nombre, valor in scope.get("path_params", {}).items():
+        ruta = ruta.replace(f"/{valor}", f"/{{{nombre}}}", 1)
+    return ruta
+
+
+class _Metrica(ABC):
+    """
+    Base de las métricas. Cada hilo escribe en su propio fragmento (un dict que solo
+    él modifica), así que registrar una observación no toma ningún lock ni compite con
+    otros hilos; los fragmentos se suman solo al exportar.
+    """
+
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._local = threading.local()
+        self._fragmentos: list[dict] = []
+        self._lock_fragmentos = threading.Lock()
+
+    def _fragmento(self) -> dict:
+        fragmento = getattr(self._local, "fragmento", None)
+        if fragmento is None:
+            fragmento = {}
+            self._local.fragmento = fragmento
+            # Solo la primera observación de cada hilo toma el lock
+            with self._lock_fragmentos:
+                self._fragmentos.append(fragmento)
+        return fragmento
+
+    def _valores_etiquetas(self, etiquetas: dict) -> tuple:
+        return tuple(etiquetas.get(nombre, "") for nombre in self.etiquetas)
+
+    def _fragmentos_actuales(self) -> list[dict]:
+        with self._lock_fragmentos:
+            return list(self._fragmentos)
+
+    @abstractmethod
+    def exportar(self) -> list[str]:
+        ...
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, valor: float = 1, **etiquetas) -> None:
+        fragmento = self._fragmento()
+        clave = self._valores_etiquetas(etiquetas)
+        fragmento[clave] = fragmento.get(clave, 0) + valor
+
+    def total(self, **etiquetas) -> float:
+        clave = self._valores_etiquetas(etiquetas)
+        return sum(dict(f).get(clave, 0) for f in self._fragmentos_actuales())
+
+    def exportar(self) -> list[str]:
+        totales: dict[tuple, float] = {}
+        for fragmento in self._fragmentos_actuales():
+            for clave, valor in list(fragmento.items()):
+                totales[clave] = totales.get(clave, 0) + valor
+        return [
+            f"{self.nombre}_total{_etiquetas_texto(self.etiquetas, clave)} {_numero(valor)}"
+            for clave, valor in sorted(totales.items())
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS_LATENCIA,
+    ):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        fragmento = self._fragmento()
+        clave = self._valores_etiquetas(etiquetas)
+        serie = fragmento.get(clave)
+        if serie is None:
+            # Un contador por bucket (el último es +Inf), la suma y el número de observaciones
+            serie = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            fragmento[clave] = serie
+        serie[bisect.bisect_left(self.buckets, valor)] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def exportar(self) -> list[str]:
+        totales: dict[tuple, list] = {}
+        for fragmento in self._fragmentos_actuales():
+            for clave, serie in list(fragmento.items()):
+                acumulada = totales.setdefault(clave, [0] * len(serie))
+                for i, valor in enumerate(list(serie)):
+                    acumulada[i] += valor
+
+        lineas = []
+        for clave, serie in sorted(totales.items()):
+            acumulado = 0
+            for limite, cuenta in zip((*self.buckets, float("inf")), serie):
+                acumulado += cuenta
+                le = "+Inf" if limite == float("inf") else _numero(limite)
+                etiquetas = _etiquetas_texto(self.etiquetas, clave, f'le="{le}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _etiquetas_texto(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_numero(serie[-2])}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {serie[-1]}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Métricas del proceso en formato de exposición de texto de Prometheus."""
+
+    def __init__(self):
+        self._metricas: list[_Metrica] = []
+        # Funciones que devuelven (nombre, ayuda, [(etiquetas, valor)]) de gauges
+        # calculados al exportar a partir del estado de otros componentes
+        self._recolectores: list[Callable[[], Iterable[tuple[str, str, list[tuple[dict, float]]]]]] = []
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...] = ()) -> Contador:
+        metrica = Contador(nombre, ayuda, etiquetas)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS_LATENCIA,
+    ) -> Histograma:
+        metrica = Histograma(nombre, ayuda, etiquetas, buckets)
+        self._metricas.append(metrica)
+        return metrica
+
+    def registrar_recolector(self, recolector: Callable) -> None:
+        self._recolectores.append(recolector)
+
+    def exportar(self) -> str:
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.exportar())
+        for recolector in self._recolectores:
+            for nombre, ayuda, muestras in recolector():
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} gauge")
+                for etiquetas, valor in muestras:
+                    texto = _etiquetas_texto(tuple(etiquetas), tuple(etiquetas.values()))
+                    lineas.append(f"{nombre}{texto} {_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+# ==========================
+# MÉTRICAS DE LA APLICACIÓN
+# ==========================
+metricas = RegistroMetricas()
+
+latencia_peticiones = metricas.histograma(
+    "tts_http_request_duration_seconds",
+    "Duración de las peticiones HTTP por ruta",
+    ("ruta", "metodo", "estado"),
+)
+tamano_peticiones = metricas.histograma(
+    "tts_http_request_size_bytes",
+    "Tamaño del cuerpo de las peticiones (Content-Length) por ruta",
+    ("ruta",),
+    BUCKETS_BYTES,
+)
+latencia_modelo = metricas.histograma(
+    "tts_upstream_duration_seconds",
+    "Duración de cada llamada a Gemini por etapa (stt, explicar, ocr, upload, delete...) y prompt",
+    ("etapa", "prompt"),
+)
+espera_cola = metricas.histograma(
+    "tts_queue_wait_seconds",
+    "Espera en el planificador antes de cada llamada al modelo",
+    ("clase",),
+)
+consultas_cache = metricas.contador(
+    "tts_cache_lookups",
+    "Consultas a cada caché por resultado (acierto / fallo)",
+    ("cache", "resultado"),
+)
+respuestas_no_json = metricas.contador(
+    "tts_parse_fallbacks",
+    "Respuestas del modelo que no eran JSON válido y se devolvieron como texto",
+    ("operacion",),
+)
+subidas_rechazadas = metricas.contador(
+    "tts_uploads_rejected",
+    "Peticiones rechazadas antes de leer todo el cuerpo, por tamaño o por formato",
+    ("ruta", "motivo"),
+)
+vias_archivo = metricas.contador(
+    "tts_file_routes",
+    "Archivos analizados por vía: extracción local, en línea en la petición o Files API",
+    ("via",),
+)
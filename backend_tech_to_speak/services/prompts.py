@@ -0,0 +1,264 @@
+import hashlib
+import os
+import random
+import string
+from dataclasses import dataclass, field
+
+# ==========================
+# PLANTILLAS COMPILADAS
+# ==========================
+@dataclass(frozen=True)
+class PlantillaPrompt:
+    """
+    Un prompt dividido en instrucciones fijas (cacheables) y una plantilla para la parte
+    variable. La plantilla se analiza una sola vez al registrarla y la versión es un hash
+    del contenido, así que cualquier cambio en el texto produce una versión nueva.
+    """
+
+    nombre: str
+    variante: str
+    area: str | None
+    instrucciones: str
+    plantilla: str
+    version: str = field(init=False)
+    _piezas: tuple[tuple[str, str | None], ...] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        huella = hashlib.sha256(f"{self.instrucciones}\0{self.plantilla}".encode()).hexdigest()
+        object.__setattr__(self, "version", huella[:12])
+        piezas = tuple(
+            (literal, campo) for literal, campo, _, _ in string.Formatter().parse(self.plantilla)
+        )
+        object.__setattr__(self, "_piezas", piezas)
+
+    @property
+    def id(self) -> str:
+        """Identificador para claves de caché y métricas: nombre/variante@version."""
+        return f"{self.nombre}/{self.variante}@{self.version}"
+
+    def renderizar(self, **campos) -> str:
+        return "".join(
+            literal + (str(campos[campo]) if campo is not None else "")
+            for literal, campo in self._piezas
+        )
+
+
+class RegistroPrompts:
+    """
+    Registro de plantillas por nombre, con variantes por área de oficio y variantes
+    experimentales (A/B) que se eligen al azar según un reparto configurable.
+    """
+
+    def __init__(self):
+        self._plantillas: dict[tuple[str, str | None, str], PlantillaPrompt] = {}
+        self._experimentos: dict[str, list[tuple[str, float]]] = {}
+
+    def registrar(
+        self,
+        nombre: str,
+        instrucciones: str,
+        plantilla: str = "",
+        area: str | None = None,
+        variante: str = "base",
+    ) -> PlantillaPrompt:
+        prompt = PlantillaPrompt(
+            nombre=nombre,
+            variante=variante,
+            area=area.lower() if area else None,
+            instrucciones=instrucciones,
+            plantilla=plantilla,
+        )
+        self._plantillas[(nombre, prompt.area, variante)] = prompt
+        return prompt
+
+    def configurar_experimentos(self, definicion: str) -> None:
+        """
+        Lee experimentos con el formato "nombre:variante=fraccion,...",
+        p. ej. "explicar:corta=0.2" envía el 20 % de las explicaciones a la variante "corta".
+        Una definición mal formada se ignora entera (avisando) en lugar de impedir el arranque.
+        """
+        experimentos: dict[str, list[tuple[str, float]]] = {}
+        try:
+            for parte in filter(None, (p.strip() for p in definicion.split(","))):
+                destino, fraccion = parte.split("=")
+                nombre, variante = (t.strip() for t in destino.split(":"))
+                valor = float(fraccion)
+                if not nombre or not variante or not 0 <= valor <= 1:
+                    raise ValueError(parte)
+                experimentos.setdefault(nombre, []).append((variante, valor))
+        except ValueError:
+            print(f"⚠️ PROMPT_EXPERIMENTOS mal formado ({definicion!r}); se ignoran los experimentos")
+            experimentos = {}
+        self._experimentos = experimentos
+
+    def _elegir_variante(self, nombre: str) -> str:
+        tirada = random.random()
+        acumulado = 0.0
+        for variante, fraccion in self._experimentos.get(nombre, []):
+            acumulado += fraccion
+            if tirada < acumulado:
+                return variante
+        return "base"
+
+    def obtener(self, nombre: str, area: str | None = None) -> PlantillaPrompt:
+        """
+        Plantilla para `nombre`: la del área si existe, si no la general.
+        Si la variante experimental elegida no existe para esa área, se usa la base.
+        """
+        area = area.lower() if area else None
+        variante = self._elegir_variante(nombre)
+        for candidata in ((nombre, area, variante), (nombre, None, variante),
+                          (nombre, area, "base"), (nombre, None, "base")):
+            prompt = self._plantillas.get(candidata)
+            if prompt:
+                return prompt
+        raise KeyError(f"No hay ningún prompt registrado con el nombre '{nombre}'")
+
+    def todas(self) -> list[PlantillaPrompt]:
+        return list(self._plantillas.values())
+
+
+# ==========================
+# INSTRUCCIONES
+# ==========================
+INSTRUCCIONES_STT = (
+    "Transcribe el siguiente audio EXACTAMENTE al español. "
+    "No agregues explicaciones, ni resúmenes, ni comentarios. "
+    "Devuelve SOLO el texto transcrito."
+)
+
+INSTRUCCIONES_EXPLICAR = """
+Eres un traductor profesional de lenguaje técnico a lenguaje común.
+Tu tarea es convertir explicaciones complejas en un mensaje sencillo,
+amable y profesional, listo para que yo se lo lea o envíe a un usuario promedio.
+
+Instrucciones IMPORTANTES:
+1. Responde SIEMPRE en español.
+2. Mantén un tono tranquilo, empático y profesional.
+3. Devuelve SOLO un JSON válido, sin texto extra, sin bloques ```json.
+4. El JSON debe tener exactamente estas claves:
+   - "explicacion_clara": string
+   - "acciones_sugeridas": lista de strings (entre 2 y 5 elementos)
+   - "nivel_urgencia": string ("baja", "media" o "alta")
+
+La clave "explicacion_clara" debe ser un texto que yo pueda leerle directamente al usuario,
+explicándole qué está pasando de forma simple.
+
+La clave "acciones_sugeridas" debe contener cosas concretas que el usuario puede hacer o preguntar.
+"""
+
+# Variante corta para medir si un prompt más breve reduce la latencia sin perder calidad
+INSTRUCCIONES_EXPLICAR_CORTA = """
+Traduce el texto técnico a un mensaje sencillo, amable y profesional en español.
+Devuelve SOLO un JSON válido con las claves "explicacion_clara" (string),
+"acciones_sugeridas" (2 a 5 strings concretos) y "nivel_urgencia" ("baja", "media" o "alta").
+"""
+
+INSTRUCCIONES_EXPLICAR_MEDICINA = INSTRUCCIONES_EXPLICAR + """
+Como el texto es del ámbito médico, no des diagnósticos nuevos ni cambies tratamientos:
+explica lo que dice el texto y sugiere consultar las dudas con el profesional de salud.
+"""
+
+INSTRUCCIONES_LOTE = """
+Eres un traductor profesional de lenguaje técnico a lenguaje común.
+Tu tarea es convertir explicaciones complejas en un mensaje sencillo,
+amable y profesional, listo para que yo se lo lea o envíe a un usuario promedio.
+
+Vas a recibir VARIOS textos técnicos independientes, cada uno precedido por su [ID n].
+
+Instrucciones IMPORTANTES:
+1. Responde SIEMPRE en español.
+2. Mantén un tono tranquilo, empático y profesional.
+3. Devuelve SOLO un array JSON válido, sin texto extra, sin bloques ```json.
+4. El array debe tener un objeto por cada texto, con exactamente estas claves:
+   - "id": número entero (el ID del texto)
+   - "explicacion_clara": string
+   - "acciones_sugeridas": lista de strings (entre 2 y 5 elementos)
+   - "nivel_urgencia": string ("baja", "media" o "alta")
+
+La clave "explicacion_clara" debe ser un texto que yo pueda leerle directamente al usuario,
+explicándole qué está pasando de forma simple.
+
+La clave "acciones_sugeridas" debe contener cosas concretas que el usuario puede hacer o preguntar.
+"""
+
+INSTRUCCIONES_ARCHIVO = """
+Eres un analizador profesional de documentos técnicos.
+Tu tarea es:
+1. Extraer el contenido/texto del archivo
+2. Convertir las explicaciones complejas en lenguaje común
+3. Identificar acciones sugeridas
+4. Determinar el nivel de urgencia
+
+Instrucciones IMPORTANTES:
+1. Responde SIEMPRE en español.
+2. Mantén un tono tranquilo, empático y profesional.
+3. Devuelve SOLO un JSON válido, sin texto extra, sin bloques ```json.
+4. El JSON debe tener exactamente estas claves:
+   - "texto_extraido": string (contenido del archivo)
+   - "explicacion_clara": string
+   - "acciones_sugeridas": lista de strings (entre 2 y 5 elementos)
+   - "nivel_urgencia": string ("baja", "media" o "alta")
+"""
+
+INSTRUCCIONES_OCR = """
+Extrae TODO el texto visible en esta imagen.
+Responde SOLO con el texto extraído, sin explicaciones ni comentarios adicionales.
+Si no hay texto, responde con "No hay texto visible".
+"""
+
+# ==========================
+# PLANTILLAS DE LA PARTE VARIABLE
+# ==========================
+PLANTILLA_EXPLICAR = '''
+TEXTO TÉCNICO ORIGINAL:
+"""{texto}"""
+
+ÁREA DEL OFICIO: {area}
+{glosario}'''
+
+PLANTILLA_EXPLICAR_IMAGEN = '''
+TEXTO EXTRAÍDO DE LA IMAGEN:
+"""{texto}"""
+
+ÁREA DEL OFICIO: {area}
+{glosario}'''
+
+PLANTILLA_EXPLICAR_ARCHIVO = '''
+CONTENIDO DEL ARCHIVO {nombre_archivo}:
+"""{texto}"""
+
+ÁREA DEL OFICIO: {area}
+{glosario}'''
+
+PLANTILLA_LOTE = """
+TEXTOS TÉCNICOS ORIGINALES:
+{bloques}
+
+ÁREA DEL OFICIO: {area}
+"""
+
+PLANTILLA_ARCHIVO = """
+ÁREA DEL OFICIO: {area}
+
+Analiza el archivo adjunto y extrae la información según las instrucciones anteriores.
+"""
+
+# ==========================
+# REGISTRO
+# ==========================
+registro = RegistroPrompts()
+registro.registrar("stt", INSTRUCCIONES_STT)
+registro.registrar("explicar", INSTRUCCIONES_EXPLICAR, PLANTILLA_EXPLICAR)
+registro.registrar("explicar", INSTRUCCIONES_EXPLICAR_CORTA, PLANTILLA_EXPLICAR, variante="corta")
+registro.registrar("explicar", INSTRUCCIONES_EXPLICAR_MEDICINA, PLANTILLA_EXPLICAR, area="medicina")
+# La explicación del texto de una imagen usa las mismas instrucciones (y la misma caché de contexto)
+registro.registrar("explicar_imagen", INSTRUCCIONES_EXPLICAR, PLANTILLA_EXPLICAR_IMAGEN)
+registro.registrar("explicar_imagen", INSTRUCCIONES_EXPLICAR_MEDICINA, PLANTILLA_EXPLICAR_IMAGEN, area="medicina")
+# Igual para el texto de un archivo extraído en local, sin que el modelo lo lea
+registro.registrar("explicar_archivo", INSTRUCCIONES_EXPLICAR, PLANTILLA_EXPLICAR_ARCHIVO)
+registro.registrar("explicar_archivo", INSTRUCCIONES_EXPLICAR_MEDICINA, PLANTILLA_EXPLICAR_ARCHIVO, area="medicina")
+registro.registrar("lote", INSTRUCCIONES_LOTE, PLANTILLA_LOTE)
+registro.registrar("archivo", INSTRUCCIONES_ARCHIVO, PLANTILLA_ARCHIVO)
+registro.registrar("ocr", INSTRUCCIONES_OCR)
+registro.configurar_experimentos(os.getenv("PROMPT_EXPERIMENTOS", ""))
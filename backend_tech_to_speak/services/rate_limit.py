@@ -0,0 +1,232 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from services.token_bucket import TokenBucket
+
+# ==========================
+# CONFIGURACIÓN DEL RATE LIMITING
+# ==========================
+RATE_LIMIT_ACTIVO = os.getenv("RATE_LIMIT_ACTIVO", "1") == "1"
+# Token bucket por cliente (API key o IP): ráfaga máxima y recarga por minuto
+RATE_LIMIT_CLIENTE_CAPACIDAD = float(os.getenv("RATE_LIMIT_CLIENTE_CAPACIDAD", "60"))
+RATE_LIMIT_CLIENTE_POR_MINUTO = float(os.getenv("RATE_LIMIT_CLIENTE_POR_MINUTO", "60"))
+# Token bucket por area_oficio, compartido por todos los clientes de esa área
+RATE_LIMIT_AREA_CAPACIDAD = float(os.getenv("RATE_LIMIT_AREA_CAPACIDAD", "300"))
+RATE_LIMIT_AREA_POR_MINUTO = float(os.getenv("RATE_LIMIT_AREA_POR_MINUTO", "300"))
+# Backend compartido opcional para varios workers (p. ej. redis://localhost:6379/0)
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Máximo de buckets en memoria (los menos usados se descartan)
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "10000"))
+# API keys de los clientes conocidos, separadas por comas. Una X-API-Key que no está
+# aquí no identifica a nadie (cualquiera puede inventarse una por petición): cuenta la IP
+CLIENTES_API_KEYS = [k.strip() for k in os.getenv("CLIENTES_API_KEYS", "").split(",") if k.strip()]
+# Áreas con bucket propio; cualquier otra (o ninguna) comparte el bucket "otras"
+RATE_LIMIT_AREAS = frozenset(
+    a.strip().lower()
+    for a in os.getenv("RATE_LIMIT_AREAS", "general,mecanica,medicina,derecho,banca,ti").split(",")
+    if a.strip()
+)
+AREA_OTRAS = "otras"
+
+# Coste en tokens de cada endpoint: los que suben archivos cuestan más que el texto
+COSTOS_POR_RUTA = {
+    "/api/v1/jargon/traducir": 1,
+    "/api/v1/jargon/traducir/batch": 10,
+    "/api/v1/image/traducir": 3,
+    "/api/v1/audio/stt": 5,
+    "/api/v1/audio/explicar": 6,
+    "/api/v1/file/traducir": 10,
+    "/api/v1/jobs/audio": 6,
+    "/api/v1/jobs/archivo": 10,
+}
+COSTO_POR_DEFECTO = 1
+
+
+@dataclass
+class ResultadoLimite:
+    permitido: bool
+    limite: float
+    restantes: float
+    segundos_reintento: float
+
+
+@dataclass(frozen=True)
+class Bucket:
+    clave: str
+    capacidad: float
+    por_minuto: float
+
+
+class BackendMemoria:
+    """Buckets en el propio proceso: cada worker lleva su propia cuenta."""
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, bucket: Bucket) -> TokenBucket:
+        token_bucket = self._buckets.get(bucket.clave)
+        if token_bucket is None:
+            token_bucket = TokenBucket(bucket.capacidad, bucket.por_minuto / 60)
+            self._buckets[bucket.clave] = token_bucket
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket.clave)
+        return token_bucket
+
+    async def consumir(self, buckets: list[Bucket], costo: float) -> list[ResultadoLimite]:
+        """Consume `costo` de todos los buckets si todos lo tienen; si no, de ninguno."""
+        with self._lock:
+            token_buckets = [self._bucket(bucket) for bucket in buckets]
+            esperas = [tb.segundos_hasta(costo) for tb in token_buckets]
+            permitido = all(espera == 0 for espera in esperas)
+            if permitido:
+                for tb in token_buckets:
+                    tb.consumir(costo)
+            return [
+                ResultadoLimite(
+                    permitido=permitido,
+                    limite=bucket.capacidad,
+                    restantes=tb.disponibles(),
+                    segundos_reintento=espera,
+                )
+                for bucket, tb, espera in zip(buckets, token_buckets, esperas)
+            ]
+
+
+# Token buckets atómicos en Redis: recarga todos, consume de todos solo si todos tienen
+# tokens suficientes y devuelve el estado de cada uno en un solo paso
+_SCRIPT_REDIS = """
+local costo = tonumber(ARGV[1])
+local ahora = tonumber(ARGV[2])
+local tokens, esperas, permitido = {}, {}, true
+for i, clave in ipairs(KEYS) do
+    local capacidad = tonumber(ARGV[1 + 2 * i])
+    local tasa = tonumber(ARGV[2 + 2 * i])
+    local datos = redis.call('HMGET', clave, 'tokens', 'ts')
+    local disponibles = tonumber(datos[1]) or capacidad
+    local ts = tonumber(datos[2]) or ahora
+    tokens[i] = math.min(capacidad, disponibles + math.max(0, ahora - ts) * tasa)
+    esperas[i] = 0
+    if tokens[i] < costo then
+        esperas[i] = (costo - tokens[i]) / tasa
+        permitido = false
+    end
+end
+local resultado = {}
+for i, clave in ipairs(KEYS) do
+    if permitido then
+        tokens[i] = tokens[i] - costo
+    end
+    local capacidad = tonumber(ARGV[1 + 2 * i])
+    local tasa = tonumber(ARGV[2 + 2 * i])
+    redis.call('HSET', clave, 'tokens', tokens[i], 'ts', ahora)
+    redis.call('EXPIRE', clave, math.ceil(capacidad / tasa) + 1)
+    table.insert(resultado, tostring(tokens[i]))
+    table.insert(resultado, tostring(esperas[i]))
+end
+return resultado
+"""
+
+
+class BackendRedis:
+    """Buckets compartidos en Redis para que todos los workers apliquen el mismo límite."""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "❌ RATE_LIMIT_REDIS_URL requiere el paquete 'redis' (uv add redis)"
+            ) from e
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_SCRIPT_REDIS)
+
+    async def consumir(self, buckets: list[Bucket], costo: float) -> list[ResultadoLimite]:
+        args = [costo, time.time()]
+        for bucket in buckets:
+            args += [bucket.capacidad, bucket.por_minuto / 60]
+        respuesta = await self._script(
+            keys=[f"rate_limit:{bucket.clave}" for bucket in buckets], args=args
+        )
+        esperas = [float(espera) for espera in respuesta[1::2]]
+        permitido = all(espera == 0 for espera in esperas)
+        return [
+            ResultadoLimite(
+                permitido=permitido,
+                limite=bucket.capacidad,
+                restantes=float(tokens),
+                segundos_reintento=espera,
+            )
+            for bucket, tokens, espera in zip(buckets, respuesta[0::2], esperas)
+        ]
+
+
+class RateLimiter:
+    """
+    Aplica un token bucket por cliente y otro por area_oficio.
+    La petición solo pasa si ambos tienen tokens suficientes para el coste de la ruta, y
+    solo entonces se descuentan de los dos.
+    """
+
+    def __init__(self, backend: BackendMemoria | BackendRedis):
+        self.backend = backend
+
+    async def consumir(self, cliente: str, area: str, ruta: str) -> ResultadoLimite:
+        costo = COSTOS_POR_RUTA.get(ruta, COSTO_POR_DEFECTO)
+        resultado_cliente, resultado_area = await self.backend.consumir(
+            [
+                Bucket(f"cliente:{cliente}", RATE_LIMIT_CLIENTE_CAPACIDAD, RATE_LIMIT_CLIENTE_POR_MINUTO),
+                Bucket(f"area:{area}", RATE_LIMIT_AREA_CAPACIDAD, RATE_LIMIT_AREA_POR_MINUTO),
+            ],
+            costo,
+        )
+        if resultado_cliente.permitido:
+            # Las cabeceras informan del límite del cliente, que es el que este controla
+            return resultado_cliente
+        if resultado_area.segundos_reintento > resultado_cliente.segundos_reintento:
+            return resultado_area
+        return resultado_cliente
+
+
+def _hash_clave(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+_CLIENTES_CONOCIDOS = frozenset(_hash_clave(k) for k in CLIENTES_API_KEYS)
+
+
+def identificar_cliente(api_key: str | None, ip: str | None) -> str:
+    """
+    Clave del bucket del cliente: hash de su API key si es de un cliente conocido
+    (CLIENTES_API_KEYS) o, si no, su IP.
+    """
+    if api_key and _hash_clave(api_key) in _CLIENTES_CONOCIDOS:
+        return "key:" + _hash_clave(api_key)
+    return f"ip:{ip or 'desconocida'}"
+
+
+def area_limitada(area) -> str:
+    """
+    Bucket de area_oficio: el área si es una de RATE_LIMIT_AREAS y, si no (otra
+    inventada, ninguna o un valor que no es texto), el bucket común "otras".
+    """
+    if not isinstance(area, str):
+        return AREA_OTRAS
+    normalizada = "".join(
+        c for c in unicodedata.normalize("NFD", area.strip().lower()) if not unicodedata.combining(c)
+    )
+    return normalizada if normalizada in RATE_LIMIT_AREAS else AREA_OTRAS
+
+
+def crear_rate_limiter() -> RateLimiter:
+    if RATE_LIMIT_REDIS_URL:
+        return RateLimiter(BackendRedis(RATE_LIMIT_REDIS_URL))
+    return RateLimiter(BackendMemoria())
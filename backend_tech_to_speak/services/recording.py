@@ -0,0 +1,314 @@
+import glob
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Iterator
+
+from services.metrics import plantilla_ruta
+
+# ==========================
+# CONFIGURACIÓN DE LA GRABACIÓN DE TRÁFICO
+# ==========================
+GRABACION_ACTIVA = os.getenv("GRABACION_ACTIVA", "0") == "1"
+# Fracción de peticiones /api/ que se graban
+GRABACION_MUESTREO = float(os.getenv("GRABACION_MUESTREO", "0.1"))
+GRABACION_DIR = os.getenv("GRABACION_DIR", ".grabaciones")
+# Guarda también los textos que se envían al modelo (jerga y lotes) y los que devuelve
+# (transcripción, texto extraído), no solo su huella y tamaño.
+# Los archivos, audios e imágenes nunca se guardan
+GRABACION_TEXTOS = os.getenv("GRABACION_TEXTOS", "0") == "1"
+GRABACION_FLUSH_SEGUNDOS = float(os.getenv("GRABACION_FLUSH_SEGUNDOS", "5"))
+# Al superar este tamaño (comprimido) se empieza un archivo nuevo
+GRABACION_MAX_BYTES_ARCHIVO = int(os.getenv("GRABACION_MAX_BYTES_ARCHIVO", str(50 * 1024 * 1024)))
+
+VERSION_FORMATO = 1
+
+# Petición que se está grabando (None si no se muestreó). Es un dict mutable: las
+# llamadas al modelo hechas en otros hilos añaden su área sobre el mismo
+peticion_grabada: ContextVar[dict | None] = ContextVar("peticion_grabada", default=None)
+
+
+def huella(dato) -> str:
+    """Huella corta (blake2b de 128 bits) de bytes, texto o lista de textos."""
+    if not isinstance(dato, bytes):
+        dato = _texto(dato).encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(dato, digest_size=16).hexdigest()
+
+
+def _texto(entrada) -> str:
+    return "\x00".join(entrada) if isinstance(entrada, (list, tuple)) else str(entrada)
+
+
+# Campos de la respuesta que copian el contenido del usuario. La transcripción de STT
+# es la respuesta entera (un str)
+_CAMPOS_TEXTO = ("texto_extraido",)
+
+
+def _serializable(resultado):
+    """Resultado del backend listo para JSON: las excepciones del lote se guardan como texto."""
+    if isinstance(resultado, Exception):
+        return {"error": str(resultado)}
+    if isinstance(resultado, list):
+        return [_serializable(r) for r in resultado]
+    return resultado
+
+
+def _redactar(resultado):
+    """
+    Sin GRABACION_TEXTOS, sustituye los textos del usuario que trae la respuesta (la
+    transcripción o el texto extraído de un archivo) por su huella y su tamaño.
+    """
+    if isinstance(resultado, str):
+        return {"redactado": True, "huella": huella(resultado), "bytes": len(resultado.encode())}
+    if isinstance(resultado, list):
+        return [_redactar(r) if isinstance(r, dict) else r for r in resultado]
+    if isinstance(resultado, dict):
+        return {
+            clave: _redactar(valor) if clave in _CAMPOS_TEXTO and isinstance(valor, str) else valor
+            for clave, valor in resultado.items()
+        }
+    return resultado
+
+
+def _es_redactado(valor) -> bool:
+    return isinstance(valor, dict) and valor.get("redactado") is True
+
+
+def restaurar_textos(resultado):
+    """
+    Resultado grabado listo para devolverlo: los textos redactados se reemplazan por
+    uno de relleno del mismo tamaño, para conservar el volumen de la respuesta.
+    """
+    if _es_redactado(resultado):
+        return ("texto " * (resultado["bytes"] // 6 + 1))[: resultado["bytes"]]
+    if isinstance(resultado, list):
+        return [restaurar_textos(r) for r in resultado]
+    if isinstance(resultado, dict):
+        return {clave: restaurar_textos(valor) for clave, valor in resultado.items()}
+    return resultado
+
+
+class Grabador:
+    """
+    Graba una muestra del tráfico en archivos JSON lines comprimidos con gzip: por cada
+    petición, su ruta, tamaño, huella del cuerpo, área, estado y duración; por cada
+    llamada al backend de modelo, la huella y tamaño de la entrada, la respuesta y su
+    duración. Los tiempos son relativos al inicio de la grabación para poder
+    reproducir el mismo perfil de llegadas.
+    """
+
+    def __init__(
+        self,
+        directorio: str = GRABACION_DIR,
+        muestreo: float = GRABACION_MUESTREO,
+        intervalo: float = GRABACION_FLUSH_SEGUNDOS,
+    ):
+        self.directorio = directorio
+        self.muestreo = muestreo
+        self.intervalo = intervalo
+        self._inicio = time.monotonic()
+        self._inicio_reloj = time.time()
+        self._ids = itertools.count(1)
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._lock_archivo = threading.Lock()
+        self._archivo: str | None = None
+        self._parar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    def segundos(self) -> float:
+        return round(time.monotonic() - self._inicio, 4)
+
+    def muestrear(self) -> dict | None:
+        """Decide si se graba la petición que empieza; devuelve su registro o None."""
+        if random.random() >= self.muestreo:
+            return None
+        return {"tipo": "peticion", "id": next(self._ids), "t": self.segundos()}
+
+    def registrar(self, evento: dict) -> None:
+        with self._lock:
+            self._buffer.append(evento)
+
+    def registrar_llamada(
+        self,
+        operacion: str,
+        entrada,
+        area: str | None,
+        resultado=None,
+        error: Exception | None = None,
+        duracion: float = 0.0,
+        **detalles,
+    ) -> None:
+        """Llamada al backend de modelo dentro de una petición grabada."""
+        peticion = peticion_grabada.get()
+        if peticion is None:
+            return
+        if area and not peticion.get("area"):
+            peticion["area"] = area
+        evento = {
+            "tipo": "modelo",
+            "peticion": peticion["id"],
+            "t": round(self.segundos() - duracion, 4),
+            "operacion": operacion,
+            "huella": huella(entrada),
+            "bytes": len(entrada) if isinstance(entrada, bytes) else len(_texto(entrada).encode()),
+            "area": area,
+            "duracion": round(duracion, 4),
+            **detalles,
+        }
+        if isinstance(entrada, list):
+            evento["elementos"] = len(entrada)
+        if GRABACION_TEXTOS and not isinstance(entrada, bytes):
+            evento["entrada"] = entrada
+        if error is not None:
+            evento["error"] = str(error)
+            evento["error_tipo"] = type(error).__name__
+        else:
+            evento["resultado"] = _serializable(resultado)
+            if not GRABACION_TEXTOS:
+                evento["resultado"] = _redactar(evento["resultado"])
+        self.registrar(evento)
+
+    def _nuevo_archivo(self) -> str:
+        os.makedirs(self.directorio, exist_ok=True)
+        nombre = time.strftime("trafico-%Y%m%d-%H%M%S", time.localtime()) + f"-{os.getpid()}.jsonl.gz"
+        return os.path.join(self.directorio, nombre)
+
+    def volcar(self) -> None:
+        with self._lock:
+            eventos, self._buffer = self._buffer, []
+        if not eventos:
+            return
+        with self._lock_archivo:
+            if self._archivo is None or (
+                os.path.exists(self._archivo)
+                and os.path.getsize(self._archivo) > GRABACION_MAX_BYTES_ARCHIVO
+            ):
+                self._archivo = self._nuevo_archivo()
+                cabecera = {
+                    "tipo": "cabecera",
+                    "version": VERSION_FORMATO,
+                    "inicio": round(self._inicio_reloj, 3),
+                    "muestreo": self.muestreo,
+                }
+                eventos.insert(0, cabecera)
+            # Cada volcado añade un miembro gzip nuevo; gzip los lee como un solo flujo
+            with gzip.open(self._archivo, "at", encoding="utf-8") as f:
+                for evento in eventos:
+                    f.write(json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def _bucle_volcado(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.volcar()
+            except OSError as e:
+                print(f"⚠️ No se pudo volcar la grabación de tráfico: {e}")
+
+    def iniciar(self) -> None:
+        if self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle_volcado, name="grabacion-flush", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+        self.volcar()
+
+
+grabador: Grabador | None = Grabador() if GRABACION_ACTIVA else None
+
+
+class MiddlewareGrabacion:
+    """
+    Middleware ASGI que graba una muestra de las peticiones /api/. El cuerpo se cuenta
+    y se resume con su huella a medida que llega, sin acumularlo en memoria.
+    """
+
+    def __init__(self, app, grabador: Grabador):
+        self.app = app
+        self.grabador = grabador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+        registro = self.grabador.muestrear()
+        if registro is None:
+            await self.app(scope, receive, send)
+            return
+
+        cabeceras = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        resumen = hashlib.blake2b(digest_size=16)
+        recibidos = 0
+        estado = 500
+
+        async def recibir():
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                cuerpo = mensaje.get("body", b"")
+                recibidos += len(cuerpo)
+                resumen.update(cuerpo)
+            return mensaje
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        registro.update(
+            metodo=scope["method"],
+            tipo_contenido=cabeceras.get("content-type", "").split(";")[0].strip() or None,
+            area=cabeceras.get("x-area-oficio"),
+            prioridad=cabeceras.get("x-priority"),
+            timeout=cabeceras.get("x-request-timeout"),
+        )
+        token = peticion_grabada.set(registro)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, recibir, enviar)
+        finally:
+            peticion_grabada.reset(token)
+            registro.update(
+                ruta=plantilla_ruta(scope),
+                bytes=recibidos,
+                huella=resumen.hexdigest(),
+                estado=estado,
+                duracion=round(time.perf_counter() - inicio, 4),
+            )
+            self.grabador.registrar(registro)
+
+
+def leer_grabacion(ruta: str) -> Iterator[dict]:
+    """
+    Eventos de un archivo de grabación o de todos los de un directorio, en orden. Los
+    tiempos de cada archivo se desplazan según su hora de inicio para que varios
+    archivos (o procesos) formen una sola línea de tiempo.
+    """
+    archivos = sorted(glob.glob(os.path.join(ruta, "*.jsonl.gz"))) if os.path.isdir(ruta) else [ruta]
+    origen = None
+    for archivo in archivos:
+        desplazamiento = 0.0
+        with gzip.open(archivo, "rt", encoding="utf-8") as f:
+            for linea in f:
+                if not linea.strip():
+                    continue
+                evento = json.loads(linea)
+                if evento["tipo"] == "cabecera":
+                    if origen is None:
+                        origen = evento["inicio"]
+                    desplazamiento = evento["inicio"] - origen
+                    continue
+                evento["t"] = round(evento["t"] + desplazamiento, 4)
+                yield evento
@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+import time
+from typing import Callable, TypeVar
+
+from services.deadline import DeadlineExcedidoError, tiempo_restante, verificar_deadline
+
+T = TypeVar("T")
+
+# ==========================
+# CONFIGURACIÓN DE REINTENTOS
+# ==========================
+MAX_REINTENTOS = int(os.getenv("GEMINI_MAX_REINTENTOS", "3"))
+BACKOFF_BASE_SEGUNDOS = float(os.getenv("GEMINI_BACKOFF_BASE_SEGUNDOS", "0.5"))
+BACKOFF_MAX_SEGUNDOS = float(os.getenv("GEMINI_BACKOFF_MAX_SEGUNDOS", "8"))
+
+# Códigos HTTP que indican un fallo pasajero del servicio (cuota, sobrecarga, timeouts)
+CODIGOS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+
+def es_error_transitorio(error: Exception) -> bool:
+    """
+    Indica si vale la pena reintentar la llamada que produjo `error`.
+    Los errores de la API (google.genai.errors.APIError) exponen el código HTTP en `code`;
+    los fallos de red del cliente HTTP (timeouts, conexiones caídas) también son transitorios.
+    """
+    if isinstance(error, DeadlineExcedidoError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # httpx no se importa aquí para no cargarlo al arrancar: si el error es suyo, ya está cargado
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    codigo = getattr(error, "code", None)
+    if isinstance(codigo, int):
+        return codigo in CODIGOS_TRANSITORIOS
+    return False
+
+
+def calcular_espera(intento: int) -> float:
+    """Backoff exponencial con "full jitter": uniforme entre 0 y base * 2^intento."""
+    techo = min(BACKOFF_MAX_SEGUNDOS, BACKOFF_BASE_SEGUNDOS * (2 ** intento))
+    return random.uniform(0, techo)
+
+
+def ejecutar_con_reintentos(llamada: Callable[[float | None], T]) -> T:
+    """
+    Ejecuta `llamada(timeout)` reintentando los errores transitorios.
+
+    `timeout` es el tiempo que le queda a la petición (o None si no hay deadline) y
+    debe usarse como límite de la llamada al modelo. Nunca se espera ni se reintenta
+    más allá del deadline del cliente: en ese caso se lanza DeadlineExcedidoError.
+    """
+    intento = 0
+    while True:
+        verificar_deadline()
+        try:
+            return llamada(tiempo_restante())
+        except Exception as e:
+            if not es_error_transitorio(e) or intento >= MAX_REINTENTOS:
+                raise
+
+            espera = calcular_espera(intento)
+            restante = tiempo_restante()
+            if restante is not None and espera >= restante:
+                raise DeadlineExcedidoError(
+                    f"No queda tiempo para reintentar tras error transitorio: {e}"
+                ) from e
+
+            intento += 1
+            time.sleep(espera)
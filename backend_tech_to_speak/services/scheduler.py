@@ -0,0 +1,139 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from services.deadline import DeadlineExcedidoError, tiempo_restante
+from services.metrics import espera_cola
+
+# ==========================
+# CONFIGURACIÓN DEL PLANIFICADOR
+# ==========================
+# Llamadas simultáneas al modelo; el resto espera turno en la cola
+UPSTREAM_MAX_CONCURRENCIA = int(os.getenv("UPSTREAM_MAX_CONCURRENCIA", "16"))
+
+# Clase de cada operación del servicio
+CLASE_POR_OPERACION = {
+    "explicar": "jargon",
+    "lote": "batch",
+    "stt": "audio",
+    "imagen": "image",
+    "archivo": "file",
+}
+
+# Coste estimado de una llamada de cada clase (más o menos proporcional a su duración)
+COSTOS_POR_CLASE = {"jargon": 1.0, "audio": 3.0, "image": 3.0, "file": 10.0, "batch": 10.0}
+
+# Peso de cada clase en el reparto: las interactivas reciben más turnos
+PESOS_POR_CLASE = {"jargon": 4.0, "audio": 2.0, "image": 2.0, "file": 1.0, "batch": 1.0}
+
+# Multiplicador del peso según la prioridad que pide el cliente (cabecera X-Priority)
+FACTORES_PRIORIDAD = {"alta": 4.0, "normal": 1.0, "baja": 0.25}
+
+prioridad_actual: ContextVar[str] = ContextVar("prioridad", default="normal")
+
+
+@dataclass(order=True)
+class _Turno:
+    fin_virtual: float
+    orden: int
+    clase: str = field(compare=False)
+    concedido: bool = field(default=False, compare=False)
+    abandonado: bool = field(default=False, compare=False)
+
+
+class PlanificadorWFQ:
+    """
+    Weighted fair queuing delante del pool de claves.
+
+    Cada llamada recibe un tiempo de fin virtual = max(reloj virtual, último fin de su clase)
+    + coste / peso, y los huecos libres se conceden por orden de fin virtual. Así una ráfaga
+    de PDFs (coste alto, peso bajo) no retrasa las explicaciones de texto, que siguen
+    entrando casi de inmediato, pero tampoco se queda sin turno.
+    """
+
+    def __init__(
+        self,
+        concurrencia: int = UPSTREAM_MAX_CONCURRENCIA,
+        costos: dict[str, float] = COSTOS_POR_CLASE,
+        pesos: dict[str, float] = PESOS_POR_CLASE,
+    ):
+        self.concurrencia = concurrencia
+        self.costos = costos
+        self.pesos = pesos
+        self._cond = threading.Condition()
+        self._cola: list[_Turno] = []
+        self._en_curso = 0
+        self._reloj_virtual = 0.0
+        self._ultimo_fin: dict[str, float] = {}
+        self._contador = itertools.count()
+        self._espera_total: dict[str, float] = {}
+        self._concedidos: dict[str, int] = {}
+
+    def _encolar(self, clase: str, prioridad: str) -> _Turno:
+        peso = self.pesos.get(clase, 1.0) * FACTORES_PRIORIDAD.get(prioridad, 1.0)
+        inicio = max(self._reloj_virtual, self._ultimo_fin.get(clase, 0.0))
+        fin = inicio + self.costos.get(clase, 1.0) / peso
+        self._ultimo_fin[clase] = fin
+        turno = _Turno(fin_virtual=fin, orden=next(self._contador), clase=clase)
+        heapq.heappush(self._cola, turno)
+        return turno
+
+    def _despachar(self) -> None:
+        while self._cola and self._en_curso < self.concurrencia:
+            turno = heapq.heappop(self._cola)
+            if turno.abandonado:
+                continue
+            turno.concedido = True
+            self._en_curso += 1
+            self._reloj_virtual = max(self._reloj_virtual, turno.fin_virtual)
+        self._cond.notify_all()
+
+    @contextmanager
+    def turno(self, clase: str, prioridad: str | None = None):
+        """
+        Espera un hueco para una llamada de `clase` y lo libera al salir.
+        La espera nunca pasa del deadline de la petición.
+        """
+        inicio = time.monotonic()
+        with self._cond:
+            turno = self._encolar(clase, prioridad or prioridad_actual.get())
+            self._despachar()
+            while not turno.concedido:
+                restante = tiempo_restante()
+                if restante is not None and restante <= 0:
+                    turno.abandonado = True
+                    raise DeadlineExcedidoError("Se agotó el tiempo esperando turno para el modelo")
+                self._cond.wait(timeout=restante)
+
+            espera = time.monotonic() - inicio
+            espera_cola.observar(espera, clase=clase)
+            self._espera_total[clase] = self._espera_total.get(clase, 0.0) + espera
+            self._concedidos[clase] = self._concedidos.get(clase, 0) + 1
+
+        try:
+            yield espera
+        finally:
+            with self._cond:
+                self._en_curso -= 1
+                self._despachar()
+
+    def estadisticas(self) -> dict:
+        with self._cond:
+            en_cola: dict[str, int] = {}
+            for turno in self._cola:
+                if not turno.abandonado:
+                    en_cola[turno.clase] = en_cola.get(turno.clase, 0) + 1
+            return {
+                "en_curso": self._en_curso,
+                "concurrencia": self.concurrencia,
+                "en_cola": en_cola,
+                "espera_media_segundos": {
+                    clase: self._espera_total[clase] / n
+                    for clase, n in self._concedidos.items()
+                },
+            }
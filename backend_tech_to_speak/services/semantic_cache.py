@@ -0,0 +1,190 @@
+import os
+import random
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, TypeVar
+
+from services.glossary import PALABRAS_VACIAS, normalizar
+
+V = TypeVar("V")
+
+# ==========================
+# CONFIGURACIÓN DE LA CACHÉ SEMÁNTICA
+# ==========================
+# Desactivada por defecto: reutiliza explicaciones de textos que solo se parecen
+CACHE_SEMANTICA_ACTIVA = os.getenv("CACHE_SEMANTICA_ACTIVA", "0") == "1"
+CACHE_SEMANTICA_CAPACIDAD = int(os.getenv("CACHE_SEMANTICA_CAPACIDAD", "5000"))
+# Similitud mínima (Jaccard sobre trigramas de caracteres y sobre raíces de palabras)
+# para reutilizar una explicación
+CACHE_SEMANTICA_UMBRAL = float(os.getenv("CACHE_SEMANTICA_UMBRAL", "0.85"))
+
+# 16 bandas de 4 filas: dos textos con Jaccard 0.7 caen en el mismo cubo de alguna
+# banda con ~98 % de probabilidad; con Jaccard 0.3, solo ~12 %
+PERMUTACIONES = 64
+BANDAS = 16
+_PRIMO = (1 << 61) - 1
+LONGITUD_RAIZ = 5
+
+_PALABRA = re.compile(r"\w+")
+_NUMERO = re.compile(r"\d+(?:[.,]\d+)?")
+# Palabras que invierten el sentido de la frase (ya normalizadas, sin tildes)
+PALABRAS_NEGACION = frozenset(
+    "no sin nunca jamas ni tampoco nada nadie ningun ninguno ninguna ningunos ningunas".split()
+)
+
+
+@dataclass
+class _Entrada(Generic[V]):
+    particion: Hashable
+    rasgos: frozenset[str]
+    raices: frozenset[str]
+    numeros: frozenset[str]
+    negaciones: frozenset[str]
+    firma: tuple[int, ...]
+    valor: V
+
+
+def rasgos(texto: str) -> tuple[frozenset[str], frozenset[str], frozenset[str], frozenset[str]]:
+    """
+    - Trigramas de caracteres de cada palabra con significado, para que "reinicia"
+      y "reiniciar" se parezcan.
+    - Raíces de esas palabras (primeras letras): en textos cortos un trigrama distinto
+      pesa poco, pero "benigna" y "maligna" son palabras distintas.
+    - Los números, que tienen que coincidir exactamente: "error 404" y "error 500"
+      no son el mismo problema.
+    - Las negaciones, que también tienen que coincidir: "el paciente tiene cáncer" y
+      "el paciente no tiene cáncer" solo se diferencian en una palabra.
+    """
+    normalizado = normalizar(texto)
+    palabras = _PALABRA.findall(normalizado)
+    trigramas, raices = set(), set()
+    for palabra in palabras:
+        if palabra in PALABRAS_VACIAS or palabra.isdigit():
+            continue
+        raices.add(palabra[:LONGITUD_RAIZ])
+        relleno = f" {palabra} "
+        trigramas.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return (
+        frozenset(trigramas),
+        frozenset(raices),
+        frozenset(_NUMERO.findall(normalizado)),
+        frozenset(p for p in palabras if p in PALABRAS_NEGACION),
+    )
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class CacheSemantica(Generic[V]):
+    """
+    Caché de casi-duplicados: encuentra un texto guardado parecido al buscado aunque no
+    sea idéntico (otro orden, otra conjugación, una palabra de más).
+
+    Cada texto se resume en una firma MinHash y se indexa con LSH por bandas, así que una
+    búsqueda solo compara contra los pocos candidatos que comparten algún cubo, no contra
+    toda la caché. Los candidatos se confirman con la similitud exacta antes de devolverse.
+    Las entradas se agrupan por partición (área y versión de prompt) y nunca se cruzan.
+    """
+
+    def __init__(
+        self,
+        capacidad: int = CACHE_SEMANTICA_CAPACIDAD,
+        umbral: float = CACHE_SEMANTICA_UMBRAL,
+        semilla: int = 0,
+    ):
+        self.capacidad = capacidad
+        self.umbral = umbral
+        generador = random.Random(semilla)
+        self._permutaciones = [
+            (generador.randrange(1, _PRIMO), generador.randrange(0, _PRIMO))
+            for _ in range(PERMUTACIONES)
+        ]
+        self._filas = PERMUTACIONES // BANDAS
+        self._entradas: OrderedDict[int, _Entrada[V]] = OrderedDict()
+        self._cubos: dict[tuple, set[int]] = {}
+        self._siguiente_id = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _firma(self, rasgos_texto: frozenset[str]) -> tuple[int, ...]:
+        if not rasgos_texto:
+            return ()
+        hashes = [zlib.crc32(rasgo.encode()) for rasgo in rasgos_texto]
+        return tuple(
+            min((a * h + b) % _PRIMO for h in hashes) for a, b in self._permutaciones
+        )
+
+    def _claves_cubos(self, particion: Hashable, firma: tuple[int, ...]) -> list[tuple]:
+        return [
+            (particion, banda, firma[banda * self._filas:(banda + 1) * self._filas])
+            for banda in range(BANDAS)
+        ]
+
+    def buscar(self, texto: str, particion: Hashable) -> tuple[V, float] | None:
+        """Valor guardado para el texto más parecido de la partición y su similitud, si supera el umbral."""
+        rasgos_texto, raices, numeros, negaciones = rasgos(texto)
+        firma = self._firma(rasgos_texto)
+        if not firma:
+            return None
+
+        with self._lock:
+            candidatos = set()
+            for clave in self._claves_cubos(particion, firma):
+                candidatos |= self._cubos.get(clave, set())
+
+            mejor_id, mejor_similitud = None, 0.0
+            for id_entrada in candidatos:
+                entrada = self._entradas[id_entrada]
+                if entrada.numeros != numeros or entrada.negaciones != negaciones:
+                    continue
+                similitud = min(
+                    jaccard(rasgos_texto, entrada.rasgos), jaccard(raices, entrada.raices)
+                )
+                if similitud > mejor_similitud:
+                    mejor_id, mejor_similitud = id_entrada, similitud
+
+            if mejor_id is None or mejor_similitud < self.umbral:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(mejor_id)
+            self.aciertos += 1
+            return self._entradas[mejor_id].valor, mejor_similitud
+
+    def guardar(self, texto: str, particion: Hashable, valor: V) -> None:
+        rasgos_texto, raices, numeros, negaciones = rasgos(texto)
+        firma = self._firma(rasgos_texto)
+        if not firma:
+            return
+
+        with self._lock:
+            id_entrada = self._siguiente_id
+            self._siguiente_id += 1
+            self._entradas[id_entrada] = _Entrada(
+                particion, rasgos_texto, raices, numeros, negaciones, firma, valor
+            )
+            for clave in self._claves_cubos(particion, firma):
+                self._cubos.setdefault(clave, set()).add(id_entrada)
+
+            while len(self._entradas) > self.capacidad:
+                id_viejo, viejo = self._entradas.popitem(last=False)
+                for clave in self._claves_cubos(viejo.particion, viejo.firma):
+                    cubo = self._cubos.get(clave)
+                    if cubo is not None:
+                        cubo.discard(id_viejo)
+                        if not cubo:
+                            del self._cubos[clave]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
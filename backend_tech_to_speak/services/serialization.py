@@ -0,0 +1,30 @@
+import json
+import os
+from typing import Any
+
+# ==========================
+# CONFIGURACIÓN DE LA SERIALIZACIÓN JSON
+# ==========================
+# orjson (opcional) codifica los textos largos con acentos varias veces más rápido que
+# json.dumps; sin instalar, o con JSON_ORJSON=0, se usa la librería estándar. Para leer
+# se sigue usando json.loads: con textos largos no ASCII es más rápido que orjson.loads
+JSON_ORJSON = os.getenv("JSON_ORJSON", "1") == "1"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_orjson = orjson if JSON_ORJSON else None
+
+
+def a_json(contenido: Any) -> bytes:
+    """JSON compacto en UTF-8 (sin escapar acentos), con orjson si está disponible."""
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(contenido, option=_orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Lo que orjson rechaza (surrogates sueltos en el texto, enteros de más de
+            # 64 bits) lo resuelve la librería estándar, escapando lo que no es ASCII
+            return json.dumps(contenido, separators=(",", ":")).encode("ascii")
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
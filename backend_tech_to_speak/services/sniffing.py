@@ -0,0 +1,249 @@
+"""
+Detección del formato real de un archivo por sus primeros bytes (magic bytes), sin
+fiarse de la extensión ni del Content-Type que declara el cliente, y de si un PDF
+tiene capa de texto o es solo imágenes escaneadas.
+"""
+import io
+import mimetypes
+import zipfile
+import zlib
+
+# Bytes de control que no aparecen en texto plano (se admiten \t \n \f \r y ESC)
+_CONTROL = set(range(0x00, 0x09)) | {0x0B} | set(range(0x0E, 0x1B)) | set(range(0x1C, 0x20))
+
+# Marcas de ftyp (MP4/ISO BMFF) que identifican imágenes o audio en vez de vídeo
+_MARCAS_FTYP = {
+    b"heic": "image/heic", b"heix": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif",
+    b"avif": "image/avif", b"M4A ": "audio/mp4", b"M4B ": "audio/mp4", b"M4P ": "audio/mp4",
+}
+
+# Bytes del principio del archivo con los que se reconocen todos los formatos
+TAMANO_MUESTRA = 8192
+
+# Tipos de documento que se pueden analizar
+_PREFIJOS_DOCUMENTO = (
+    "application/pdf",
+    "application/rtf",
+    "application/msword",
+    "application/vnd.ms-",
+    "application/vnd.openxmlformats-officedocument.",
+    "application/vnd.oasis.opendocument.",
+)
+# Contenedores de los documentos Office y OpenDocument. Un ZIP u OLE2 solo es un
+# documento si su índice (o su directorio) lo identifica como tal
+_CONTENEDORES = ("application/zip", "application/x-ole-storage")
+# Streams del directorio OLE2 (en UTF-16) que identifican los Office antiguos
+_STREAMS_OLE = (
+    ("WordDocument", "application/msword"),
+    ("Workbook", "application/vnd.ms-excel"),
+    ("Book", "application/vnd.ms-excel"),
+    ("PowerPoint Document", "application/vnd.ms-powerpoint"),
+)
+
+
+def detectar_tipo(muestra: bytes) -> str | None:
+    """
+    Tipo MIME que indican los primeros bytes del archivo, o None si no se reconoce.
+    Con unos pocos KB basta para todos los formatos que acepta la API.
+    """
+    if muestra.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if muestra.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if muestra[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if muestra[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    if muestra.startswith(b"RIFF") and len(muestra) >= 12:
+        formato = muestra[8:12]
+        if formato == b"WEBP":
+            return "image/webp"
+        if formato == b"WAVE":
+            return "audio/wav"
+        if formato == b"AVI ":
+            return "video/x-msvideo"
+    if muestra.startswith(b"FORM") and muestra[8:12] in (b"AIFF", b"AIFC"):
+        return "audio/aiff"
+    if muestra[4:8] == b"ftyp":
+        marca = muestra[8:12]
+        if marca in _MARCAS_FTYP:
+            return _MARCAS_FTYP[marca]
+        return "video/3gpp" if marca.startswith(b"3gp") else "video/mp4"
+    if muestra.startswith(b"OggS"):
+        return "audio/ogg"
+    if muestra.startswith(b"fLaC"):
+        return "audio/flac"
+    if muestra.startswith(b"#!AMR"):
+        return "audio/amr"
+    if muestra.startswith(b"\x1a\x45\xdf\xa3"):
+        # EBML: WebM/Matroska, lo que graban los navegadores con MediaRecorder
+        return "audio/webm"
+    if muestra.startswith(b"ID3"):
+        return "audio/mpeg"
+    if muestra.startswith(b"%PDF-") or b"%PDF-" in muestra[:1024]:
+        # Algunos generadores dejan basura antes de la cabecera; los lectores la toleran
+        return "application/pdf"
+    if muestra.startswith(b"PK\x03\x04"):
+        return _tipo_zip(muestra)
+    if muestra.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        # OLE2: .doc, .xls y .ppt antiguos
+        return "application/x-ole-storage"
+    if muestra.startswith(b"{\\rtf"):
+        return "application/rtf"
+    if muestra.startswith(b"BM") and len(muestra) >= 14 and muestra[6:10] == b"\x00\x00\x00\x00":
+        return "image/bmp"
+    if muestra.startswith((b"\xff\xfe", b"\xfe\xff")):
+        # BOM de UTF-16
+        return "text/plain"
+    if len(muestra) >= 2 and muestra[0] == 0xFF and muestra[1] & 0xE0 == 0xE0:
+        # Sincronía de trama MPEG: capa 0 es AAC en ADTS, el resto MP3
+        return "audio/aac" if muestra[1] & 0x06 == 0 else "audio/mpeg"
+    return _tipo_texto(muestra)
+
+
+def detectar_tipo_completo(contenido: bytes) -> str | None:
+    """
+    Como detectar_tipo, pero con el archivo entero: distingue los documentos ZIP por su
+    índice y los OLE2 (.doc, .xls, .ppt) por los streams de su directorio.
+    """
+    tipo = detectar_tipo(contenido[:TAMANO_MUESTRA])
+    if tipo == "application/x-ole-storage":
+        return _tipo_ole(contenido)
+    if tipo != "application/zip":
+        return tipo
+    try:
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+            nombres = archivo.namelist()
+            if "mimetype" in nombres:
+                return archivo.read("mimetype").decode("ascii", "ignore").strip() or tipo
+    except (zipfile.BadZipFile, KeyError):
+        return tipo
+    return _tipo_zip("\n".join(nombres).encode())
+
+
+def tipo_archivo(archivo_bytes: bytes, nombre_archivo: str) -> str:
+    """Tipo MIME por los magic bytes; la extensión solo precisa lo que estos no distinguen."""
+    tipo = detectar_tipo_completo(archivo_bytes)
+    adivinado, _ = mimetypes.guess_type(nombre_archivo)
+    if tipo is None:
+        return adivinado or "application/octet-stream"
+    if tipo == "text/plain" and familia(adivinado) == "texto":
+        # CSV, Markdown...: el contenido no los distingue del texto plano
+        return adivinado
+    return tipo
+
+
+def _tipo_zip(muestra: bytes) -> str:
+    # Los documentos OpenDocument guardan su tipo sin comprimir como primera entrada
+    if muestra[30:38] == b"mimetype":
+        fin = muestra.find(b"PK", 38)
+        tipo = muestra[38:fin if fin != -1 else 38 + 80].decode("ascii", "ignore").strip()
+        if tipo.startswith("application/vnd.oasis.opendocument."):
+            return tipo
+    # Office Open XML: los nombres de las entradas indican el tipo de documento
+    for carpeta, tipo in (
+        (b"word/", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        (b"xl/", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+        (b"ppt/", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+    ):
+        if carpeta in muestra:
+            return tipo
+    return "application/zip"
+
+
+def _tipo_ole(contenido: bytes) -> str:
+    # Los nombres de las entradas del directorio van en UTF-16LE terminados en nulo
+    for stream, tipo in _STREAMS_OLE:
+        if (stream + "\0").encode("utf-16-le") in contenido:
+            return tipo
+    return "application/x-ole-storage"
+
+
+def _tipo_texto(muestra: bytes) -> str | None:
+    """Texto plano (UTF-8 o Latin-1) si casi no hay bytes de control; refina XML, HTML y JSON."""
+    if not muestra or b"\x00" in muestra:
+        return None
+    if sum(1 for b in muestra if b in _CONTROL) > len(muestra) // 100:
+        return None
+    inicio = muestra.lstrip(b"\xef\xbb\xbf \t\r\n")[:64].lower()
+    if inicio.startswith(b"<?xml"):
+        return "application/xml"
+    if inicio.startswith((b"<!doctype html", b"<html")):
+        return "text/html"
+    if inicio.startswith((b"{", b"[")):
+        return "application/json"
+    return "text/plain"
+
+
+def familia(tipo: str | None) -> str | None:
+    """Agrupa el tipo MIME en imagen / audio / documento / texto (None si no se conoce)."""
+    if tipo is None:
+        return None
+    principal = tipo.split("/")[0]
+    if principal == "image":
+        return "imagen"
+    if principal in ("audio", "video"):
+        # Gemini transcribe también la pista de audio de un vídeo
+        return "audio"
+    if principal == "text" or tipo in ("application/json", "application/xml"):
+        return "texto"
+    if tipo.startswith(_PREFIJOS_DOCUMENTO):
+        return "documento"
+    return None
+
+
+def familia_muestra(tipo: str | None) -> str | None:
+    """
+    Como familia, pero para el tipo reconocido en los primeros bytes: un ZIP u OLE2
+    puede ser un documento que solo se identifica con el archivo entero.
+    """
+    return "documento" if tipo in _CONTENEDORES else familia(tipo)
+
+
+# ==========================
+# CAPA DE TEXTO DE LOS PDF
+# ==========================
+# Object streams (PDF 1.5+): los diccionarios de fuentes pueden ir comprimidos dentro
+_OBJECT_STREAM = b"/ObjStm"
+# Distancia máxima entre /ObjStm y el inicio de los datos del stream (el diccionario)
+_MAX_BYTES_DICCIONARIO = 4096
+# Streams que se revisan como máximo al buscar fuentes
+_MAX_OBJECT_STREAMS = 64
+# Bytes descomprimidos en total entre todos los streams: un stream de pocos KB puede
+# inflarse a cientos de MB
+_MAX_BYTES_INFLADOS = 16 * 1024 * 1024
+
+
+def pdf_tiene_texto(contenido: bytes) -> bool:
+    """
+    Si el PDF tiene capa de texto (alguna página usa fuentes) o es solo imágenes,
+    como un escaneo sin OCR. Un PDF escaneado con OCR tiene capa de texto (invisible).
+    """
+    if b"/Font" in contenido:
+        return True
+    presupuesto = _MAX_BYTES_INFLADOS
+    posicion = 0
+    for _ in range(_MAX_OBJECT_STREAMS):
+        encontrado = contenido.find(_OBJECT_STREAM, posicion)
+        if encontrado == -1 or presupuesto <= 0:
+            break
+        posicion = encontrado + len(_OBJECT_STREAM)
+        inicio = contenido.find(b"stream", posicion, posicion + _MAX_BYTES_DICCIONARIO)
+        if inicio == -1:
+            continue
+        inicio += len(b"stream")
+        if contenido.startswith(b"\r", inicio):
+            inicio += 1
+        if contenido.startswith(b"\n", inicio):
+            inicio += 1
+        try:
+            # Ni la entrada ni la salida pasan del presupuesto que queda
+            datos = zlib.decompressobj().decompress(
+                contenido[inicio:inicio + presupuesto], presupuesto
+            )
+        except zlib.error:
+            continue
+        presupuesto -= len(datos)
+        if b"/Font" in datos:
+            return True
+    return False
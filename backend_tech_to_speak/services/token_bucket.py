@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket en memoria y seguro entre hilos: admite ráfagas de hasta
+    `capacidad` tokens y se rellena a `tokens_por_segundo`.
+    """
+
+    def __init__(self, capacidad: float, tokens_por_segundo: float):
+        self.capacidad = capacidad
+        self.tokens_por_segundo = tokens_por_segundo
+        self._tokens = capacidad
+        self._ultima_recarga = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _recargar(self) -> None:
+        ahora = time.monotonic()
+        transcurrido = ahora - self._ultima_recarga
+        self._tokens = min(self.capacidad, self._tokens + transcurrido * self.tokens_por_segundo)
+        self._ultima_recarga = ahora
+
+    def disponibles(self) -> float:
+        with self._lock:
+            self._recargar()
+            return self._tokens
+
+    def consumir(self, tokens: float = 1) -> bool:
+        """Consume `tokens` si los hay; devuelve False sin consumir nada si no."""
+        with self._lock:
+            self._recargar()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def consumir_o_esperar(self, tokens: float = 1) -> float:
+        """
+        Consume `tokens` si los hay y devuelve 0; si no, no consume nada y
+        devuelve cuántos segundos faltan para tenerlos.
+        """
+        with self._lock:
+            self._recargar()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            if self.tokens_por_segundo <= 0:
+                return float("inf")
+            return (tokens - self._tokens) / self.tokens_por_segundo
+
+    def segundos_hasta(self, tokens: float = 1) -> float:
+        """Tiempo de espera hasta que haya `tokens` disponibles."""
+        with self._lock:
+            self._recargar()
+            faltan = tokens - self._tokens
+            if faltan <= 0:
+                return 0.0
+            if self.tokens_por_segundo <= 0:
+                return float("inf")
+            return faltan / self.tokens_por_segundo
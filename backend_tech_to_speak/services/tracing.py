@@ -0,0 +1,105 @@
+import os
+from contextlib import contextmanager
+
+# ==========================
+# CONFIGURACIÓN DE TRAZAS (OpenTelemetry, opcional)
+# ==========================
+TRACING_ACTIVO = os.getenv("TRACING_ACTIVO", "0") == "1"
+# "otlp": colector OTLP/HTTP (OTEL_EXPORTER_OTLP_ENDPOINT, por defecto http://localhost:4318)
+# "archivo": un span JSON por línea en TRACING_ARCHIVO, para revisar trazas sin colector
+TRACING_EXPORTADOR = os.getenv("TRACING_EXPORTADOR", "otlp")
+TRACING_ARCHIVO = os.getenv("TRACING_ARCHIVO", "trazas.jsonl")
+TRACING_SERVICIO = os.getenv("TRACING_SERVICIO", "tech-to-speak")
+
+_tracer = None
+_proveedor = None
+
+
+class _SpanNulo:
+    """Sustituto de un span cuando el tracing está desactivado: no hace nada."""
+
+    def set_attribute(self, clave, valor):
+        pass
+
+    def set_attributes(self, atributos):
+        pass
+
+    def update_name(self, nombre):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+def configurar_tracing() -> bool:
+    """
+    Crea el proveedor de trazas y su exportador. Los paquetes de OpenTelemetry solo se
+    importan aquí, así que sin TRACING_ACTIVO=1 no hace falta tenerlos instalados.
+    """
+    global _tracer, _proveedor
+    if not TRACING_ACTIVO or _tracer is not None:
+        return _tracer is not None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        print("⚠️ TRACING_ACTIVO=1 pero opentelemetry-sdk no está instalado; trazas desactivadas")
+        return False
+
+    if TRACING_EXPORTADOR == "archivo":
+        salida = open(TRACING_ARCHIVO, "a", encoding="utf-8")
+        exportador = ConsoleSpanExporter(
+            out=salida, formatter=lambda s: s.to_json(indent=None) + "\n"
+        )
+    else:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("⚠️ Falta opentelemetry-exporter-otlp-proto-http; trazas desactivadas")
+            return False
+        exportador = OTLPSpanExporter()
+
+    _proveedor = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICIO}))
+    _proveedor.add_span_processor(BatchSpanProcessor(exportador))
+    trace.set_tracer_provider(_proveedor)
+    _tracer = trace.get_tracer("tech_to_speak")
+    return True
+
+
+def cerrar_tracing() -> None:
+    """Envía los spans pendientes antes de apagar el proceso."""
+    global _tracer, _proveedor
+    if _proveedor is not None:
+        _proveedor.shutdown()
+    _tracer = None
+    _proveedor = None
+
+
+@contextmanager
+def span(nombre: str, **atributos):
+    """
+    Span hijo del actual (el contexto viaja a los hilos con contextvars). Los atributos
+    None se omiten. Si el bloque lanza una excepción, el span la registra y queda en error.
+    """
+    if _tracer is None:
+        yield _SPAN_NULO
+        return
+    with _tracer.start_as_current_span(
+        nombre, attributes={k: v for k, v in atributos.items() if v is not None}
+    ) as actual:
+        yield actual
+
+
+def atributos_uso(response) -> dict:
+    """Tokens de la respuesta de generate_content como atributos de span."""
+    uso = getattr(response, "usage_metadata", None)
+    if uso is None:
+        return {}
+    atributos = {
+        "gen_ai.usage.input_tokens": uso.prompt_token_count,
+        "gen_ai.usage.output_tokens": uso.candidates_token_count,
+        "gen_ai.usage.cached_tokens": uso.cached_content_token_count,
+    }
+    return {k: v for k, v in atributos.items() if v is not None}
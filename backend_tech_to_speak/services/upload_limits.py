@@ -0,0 +1,219 @@
+import os
+import re
+from dataclasses import dataclass
+
+from services.metrics import subidas_rechazadas
+from services.serialization import a_json
+from services.sniffing import detectar_tipo, familia_muestra
+
+# ==========================
+# CONFIGURACIÓN DE LOS LÍMITES DE SUBIDA
+# ==========================
+SUBIDA_LIMITES_ACTIVOS = os.getenv("SUBIDA_LIMITES_ACTIVOS", "1") == "1"
+# Imágenes y audio van en línea en la petición a Gemini, que admite hasta 20 MB
+SUBIDA_MAX_BYTES_IMAGEN = int(os.getenv("SUBIDA_MAX_BYTES_IMAGEN", str(20 * 1024 * 1024)))
+SUBIDA_MAX_BYTES_AUDIO = int(os.getenv("SUBIDA_MAX_BYTES_AUDIO", str(20 * 1024 * 1024)))
+# Los archivos se extraen en local o van a Gemini en línea o por la Files API
+SUBIDA_MAX_BYTES_ARCHIVO = int(os.getenv("SUBIDA_MAX_BYTES_ARCHIVO", str(50 * 1024 * 1024)))
+# Resto de rutas /api/ (JSON: jerga y lotes)
+SUBIDA_MAX_BYTES_JSON = int(os.getenv("SUBIDA_MAX_BYTES_JSON", str(2 * 1024 * 1024)))
+# Bytes del archivo que se acumulan para reconocer su formato
+SUBIDA_BYTES_SNIFFING = int(os.getenv("SUBIDA_BYTES_SNIFFING", "4096"))
+# Si el archivo no empieza en estos primeros bytes del cuerpo (campos de formulario
+# delante), se deja pasar sin comprobar su formato
+SUBIDA_MAX_BYTES_CABECERA = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ReglaSubida:
+    max_bytes: int
+    # Familias de sniffing.familia que acepta la ruta (vacío: no se comprueba el formato)
+    familias: tuple[str, ...] = ()
+    # Estricta: un formato que no se reconoce también se rechaza
+    estricta: bool = False
+
+
+REGLAS_POR_RUTA = {
+    "/api/v1/image/traducir": ReglaSubida(SUBIDA_MAX_BYTES_IMAGEN, ("imagen",), estricta=True),
+    "/api/v1/audio/stt": ReglaSubida(SUBIDA_MAX_BYTES_AUDIO, ("audio",)),
+    "/api/v1/audio/explicar": ReglaSubida(SUBIDA_MAX_BYTES_AUDIO, ("audio",)),
+    "/api/v1/jobs/audio": ReglaSubida(SUBIDA_MAX_BYTES_AUDIO, ("audio",)),
+    "/api/v1/file/traducir": ReglaSubida(SUBIDA_MAX_BYTES_ARCHIVO, ("documento", "texto"), estricta=True),
+    "/api/v1/jobs/archivo": ReglaSubida(SUBIDA_MAX_BYTES_ARCHIVO, ("documento", "texto"), estricta=True),
+}
+REGLA_POR_DEFECTO = ReglaSubida(SUBIDA_MAX_BYTES_JSON)
+
+_NOMBRES_FAMILIA = {
+    "imagen": "una imagen",
+    "audio": "un audio",
+    "documento": "un documento",
+    "texto": "un texto",
+}
+_BOUNDARY = re.compile(rb'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+class SubidaRechazada(Exception):
+    def __init__(self, estado: int, motivo: str, detalle: str):
+        super().__init__(detalle)
+        self.estado = estado
+        self.motivo = motivo
+        self.detalle = detalle
+
+
+def _megas(n: int) -> str:
+    return f"{n / (1024 * 1024):.3g} MB"
+
+
+class _InspectorMultipart:
+    """
+    Acumula el principio de un cuerpo multipart hasta tener los primeros bytes del
+    primer archivo (la parte con filename) para reconocer su formato.
+    """
+
+    def __init__(self, boundary: bytes):
+        self.delimitador = b"--" + boundary
+        self.prefijo = bytearray()
+
+    def alimentar(self, fragmento: bytes, fin: bool) -> tuple[bool, bytes | None]:
+        """(decidido, muestra del archivo); muestra None si no se encontró el archivo."""
+        self.prefijo += fragmento
+        posicion = 0
+        while True:
+            parte = self.prefijo.find(self.delimitador, posicion)
+            if parte == -1:
+                break
+            fin_cabeceras = self.prefijo.find(b"\r\n\r\n", parte)
+            if fin_cabeceras == -1:
+                break
+            cabeceras = bytes(self.prefijo[parte:fin_cabeceras]).lower()
+            posicion = fin_cabeceras + 4
+            if b"filename=" not in cabeceras:
+                continue
+            datos = bytes(self.prefijo[posicion:posicion + SUBIDA_BYTES_SNIFFING])
+            # El delimitador de la parte siguiente marca el final de un archivo corto
+            final = datos.find(b"\r\n" + self.delimitador)
+            if final != -1:
+                return True, datos[:final]
+            if len(datos) >= SUBIDA_BYTES_SNIFFING or fin:
+                return True, datos
+            return False, None
+        if fin or len(self.prefijo) > SUBIDA_MAX_BYTES_CABECERA:
+            return True, None
+        return False, None
+
+
+class MiddlewareLimiteSubida:
+    """
+    Middleware ASGI que rechaza las subidas demasiado grandes o de otro formato antes
+    de que la app lea el cuerpo entero: primero por Content-Length, sin leer nada;
+    después contando los bytes a medida que llegan (para cuerpos chunked o con
+    Content-Length falso), y con el formato real del archivo, reconocido por sus
+    primeros bytes en cuanto llegan.
+
+    Al rechazar una petición a medias deja de leer el cuerpo, descarta la respuesta
+    de error que genere la app y responde 413 (demasiado grande) o 415 (formato no
+    aceptado) cerrando la conexión.
+    """
+
+    def __init__(self, app, reglas: dict[str, ReglaSubida] = REGLAS_POR_RUTA):
+        self.app = app
+        self.reglas = reglas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+        ruta = scope["path"]
+        regla = self.reglas.get(ruta, REGLA_POR_DEFECTO)
+        cabeceras = dict(scope["headers"])
+
+        longitud = cabeceras.get(b"content-length", b"")
+        if longitud.isdigit() and int(longitud) > regla.max_bytes:
+            await self._rechazar(send, ruta, self._demasiado_grande(regla))
+            return
+
+        inspector = None
+        if regla.familias:
+            boundary = _BOUNDARY.search(cabeceras.get(b"content-type", b""))
+            if boundary:
+                inspector = _InspectorMultipart(boundary.group(1))
+
+        recibidos = 0
+        rechazo: SubidaRechazada | None = None
+        respondido = False
+
+        async def recibir():
+            nonlocal recibidos, rechazo, inspector
+            if rechazo is not None:
+                raise rechazo
+            mensaje = await receive()
+            if mensaje["type"] != "http.request":
+                return mensaje
+            cuerpo = mensaje.get("body", b"")
+            recibidos += len(cuerpo)
+            if recibidos > regla.max_bytes:
+                rechazo = self._demasiado_grande(regla)
+            elif inspector is not None:
+                decidido, muestra = inspector.alimentar(cuerpo, not mensaje.get("more_body", False))
+                if decidido:
+                    inspector = None
+                    rechazo = self._comprobar_formato(regla, muestra)
+            if rechazo is not None:
+                raise rechazo
+            return mensaje
+
+        async def enviar(mensaje):
+            nonlocal respondido
+            # La app responde a su manera (400, 500) al fallar la lectura: se descarta
+            if rechazo is not None:
+                return
+            respondido = True
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir, enviar)
+        except Exception:
+            if rechazo is None or respondido:
+                raise
+        if rechazo is not None and not respondido:
+            await self._rechazar(send, ruta, rechazo)
+
+    @staticmethod
+    def _demasiado_grande(regla: ReglaSubida) -> SubidaRechazada:
+        return SubidaRechazada(
+            413,
+            "tamano",
+            f"El cuerpo supera el máximo de {_megas(regla.max_bytes)} para esta ruta",
+        )
+
+    @staticmethod
+    def _comprobar_formato(regla: ReglaSubida, muestra: bytes | None) -> SubidaRechazada | None:
+        # Sin archivo en el principio del cuerpo o archivo vacío: lo valida el controlador
+        if not muestra:
+            return None
+        tipo = detectar_tipo(muestra)
+        grupo = familia_muestra(tipo)
+        if grupo in regla.familias or (grupo is None and not regla.estricta):
+            return None
+        esperado = " o ".join(_NOMBRES_FAMILIA[f] for f in regla.familias)
+        return SubidaRechazada(
+            415,
+            "formato",
+            f"El contenido del archivo no es {esperado} (detectado: {tipo or 'desconocido'})",
+        )
+
+    @staticmethod
+    async def _rechazar(send, ruta: str, rechazo: SubidaRechazada) -> None:
+        subidas_rechazadas.incrementar(ruta=ruta, motivo=rechazo.motivo)
+        cuerpo = a_json({"detail": rechazo.detalle})
+        await send({
+            "type": "http.response.start",
+            "status": rechazo.estado,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                # El resto del cuerpo no se va a leer: la conexión no se puede reutilizar
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
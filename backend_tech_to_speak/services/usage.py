@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from services.metrics import metricas
+from services.rate_limit import area_limitada
+
+# ==========================
+# CONFIGURACIÓN DE CONTABILIDAD DE USO
+# ==========================
+# Precios en USD por millón de tokens (por defecto, los de gemini-2.5-flash-lite)
+PRECIO_ENTRADA_POR_MILLON = float(os.getenv("PRECIO_ENTRADA_POR_MILLON", "0.10"))
+PRECIO_SALIDA_POR_MILLON = float(os.getenv("PRECIO_SALIDA_POR_MILLON", "0.40"))
+PRECIO_CACHEADO_POR_MILLON = float(os.getenv("PRECIO_CACHEADO_POR_MILLON", "0.025"))
+# Cada cuánto se vuelcan a disco los acumulados del periodo (0 desactiva el volcado)
+USO_FLUSH_SEGUNDOS = float(os.getenv("USO_FLUSH_SEGUNDOS", "60"))
+USO_ARCHIVO = os.getenv("USO_ARCHIVO", os.path.join(".uso", "uso.jsonl"))
+# Añade a cada respuesta los tokens y el costo que consumió
+USO_CABECERAS = os.getenv("USO_CABECERAS", "0") == "1"
+
+# Cliente que originó la petición (lo fija el middleware)
+cliente_actual: ContextVar[str] = ContextVar("cliente_actual", default="desconocido")
+# Acumulado de la petición en curso, para las cabeceras de respuesta. Es un objeto
+# mutable: los hilos que heredan el contexto suman sobre el mismo
+uso_peticion: ContextVar["Uso | None"] = ContextVar("uso_peticion", default=None)
+
+
+@dataclass
+class Uso:
+    llamadas: int = 0
+    tokens_entrada: int = 0
+    tokens_salida: int = 0
+    tokens_cacheados: int = 0
+    costo_usd: float = 0.0
+
+    def sumar(self, otro: "Uso") -> None:
+        self.llamadas += otro.llamadas
+        self.tokens_entrada += otro.tokens_entrada
+        self.tokens_salida += otro.tokens_salida
+        self.tokens_cacheados += otro.tokens_cacheados
+        self.costo_usd += otro.costo_usd
+
+
+def uso_de_respuesta(response) -> Uso:
+    """
+    Tokens y costo de una respuesta de generate_content según su usage_metadata.
+    Los tokens servidos desde la caché de contexto están incluidos en los de entrada
+    pero se cobran a precio reducido.
+    """
+    metadata = getattr(response, "usage_metadata", None)
+
+    def tokens(campo: str) -> int:
+        return getattr(metadata, campo, None) or 0
+
+    entrada = tokens("prompt_token_count")
+    # Los tokens de razonamiento se facturan como salida
+    salida = tokens("candidates_token_count") + tokens("thoughts_token_count")
+    cacheados = tokens("cached_content_token_count")
+    costo = (
+        (entrada - cacheados) * PRECIO_ENTRADA_POR_MILLON
+        + cacheados * PRECIO_CACHEADO_POR_MILLON
+        + salida * PRECIO_SALIDA_POR_MILLON
+    ) / 1_000_000
+    return Uso(1, entrada, salida, cacheados, costo)
+
+
+_tokens = metricas.contador(
+    "tts_model_tokens",
+    "Tokens consumidos en Gemini por operación, área, prompt y tipo (entrada / salida / cacheados)",
+    ("operacion", "area", "prompt", "tipo"),
+)
+_costo = metricas.contador(
+    "tts_model_cost_usd",
+    "Costo estimado en USD de las llamadas a Gemini por operación, área y prompt",
+    ("operacion", "area", "prompt"),
+)
+
+
+class ContabilidadUso:
+    """
+    Acumula el consumo de tokens por (operación, área, cliente): un total desde el
+    arranque y el del periodo actual, que se vuelca a USO_ARCHIVO como JSON lines
+    cada USO_FLUSH_SEGUNDOS para poder analizarlo después.
+    """
+
+    def __init__(self, archivo: str = USO_ARCHIVO, intervalo: float = USO_FLUSH_SEGUNDOS):
+        self.archivo = archivo
+        self.intervalo = intervalo
+        self._totales: dict[tuple[str, str, str], Uso] = {}
+        self._periodo: dict[tuple[str, str, str], Uso] = {}
+        self._inicio_periodo = time.time()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    def registrar(self, response, operacion: str, area: str | None, prompt: str = "") -> Uso:
+        """
+        Suma el consumo de `response`. `prompt` (nombre/variante@version) solo etiqueta
+        las métricas: los acumulados por cliente no se parten por variante.
+        """
+        uso = uso_de_respuesta(response)
+        # area_oficio lo elige el cliente: solo las áreas conocidas tienen serie y
+        # acumulado propios, el resto va a "otras"
+        area = area_limitada(area or "general")
+        clave = (operacion, area, cliente_actual.get())
+        with self._lock:
+            self._totales.setdefault(clave, Uso()).sumar(uso)
+            self._periodo.setdefault(clave, Uso()).sumar(uso)
+
+        etiquetas = {"operacion": operacion, "area": area, "prompt": prompt}
+        _tokens.incrementar(uso.tokens_entrada, **etiquetas, tipo="entrada")
+        _tokens.incrementar(uso.tokens_salida, **etiquetas, tipo="salida")
+        _tokens.incrementar(uso.tokens_cacheados, **etiquetas, tipo="cacheados")
+        _costo.incrementar(uso.costo_usd, **etiquetas)
+
+        acumulado = uso_peticion.get()
+        if acumulado is not None:
+            acumulado.sumar(uso)
+        return uso
+
+    def resumen(self, agrupar_por: tuple[str, ...] = ("operacion", "area", "cliente")) -> list[dict]:
+        """Totales desde el arranque agrupados por las dimensiones pedidas."""
+        dimensiones = ("operacion", "area", "cliente")
+        with self._lock:
+            totales = [(clave, Uso(**asdict(uso))) for clave, uso in self._totales.items()]
+
+        grupos: dict[tuple, Uso] = {}
+        for clave, uso in totales:
+            etiquetas = dict(zip(dimensiones, clave))
+            grupo = tuple(etiquetas[d] for d in agrupar_por)
+            grupos.setdefault(grupo, Uso()).sumar(uso)
+        return [
+            {**dict(zip(agrupar_por, grupo)), **asdict(uso), "costo_usd": round(uso.costo_usd, 6)}
+            for grupo, uso in sorted(grupos.items(), key=lambda g: -g[1].costo_usd)
+        ]
+
+    def volcar(self) -> None:
+        """Escribe el periodo actual (una línea por grupo) y empieza uno nuevo."""
+        with self._lock:
+            periodo, self._periodo = self._periodo, {}
+            inicio, self._inicio_periodo = self._inicio_periodo, time.time()
+        if not periodo:
+            return
+        os.makedirs(os.path.dirname(self.archivo) or ".", exist_ok=True)
+        fin = time.time()
+        with open(self.archivo, "a", encoding="utf-8") as f:
+            for (operacion, area, cliente), uso in periodo.items():
+                registro = {
+                    "desde": round(inicio, 3),
+                    "hasta": round(fin, 3),
+                    "operacion": operacion,
+                    "area": area,
+                    "cliente": cliente,
+                    **asdict(uso),
+                }
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def _bucle_volcado(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.volcar()
+            except OSError as e:
+                print(f"⚠️ No se pudo volcar el uso de tokens: {e}")
+
+    def iniciar(self) -> None:
+        if self.intervalo <= 0 or self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle_volcado, name="uso-flush", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+        if self.intervalo > 0:
+            self.volcar()
+
+
+contabilidad = ContabilidadUso()
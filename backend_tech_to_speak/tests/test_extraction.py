@@ -0,0 +1,73 @@
+import io
+import zipfile
+
+import pytest
+
+from services.extraction import extraer_texto
+
+
+def _zip(entradas: dict[str, str]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archivo:
+        for nombre, contenido in entradas.items():
+            archivo.writestr(nombre, contenido)
+    return buffer.getvalue()
+
+
+def test_html_sin_etiquetas_scripts_ni_comentarios():
+    documento = (
+        "<html><head><style>p { color: red }</style><title>Informe</title></head><body>"
+        "<!-- borrador --><p>Presión &amp; temperatura</p>\n\n\n\n<p>si x < 3 <b>revisar</b></p>"
+        "<SCRIPT type='module'>if (a<b) {}</SCRIPT >fin</body></html>"
+    )
+    texto = extraer_texto(documento.encode(), "text/html")
+    assert "Presión & temperatura" in texto
+    assert "x < 3" in texto and "revisar" in texto and "fin" in texto
+    assert "color" not in texto and "borrador" not in texto and "a<b" not in texto
+    assert "\n\n\n" not in texto
+
+
+@pytest.mark.parametrize("patron", ["<script ", "<!--", "<style>", "<", "</", "<a "])
+def test_html_con_bloques_sin_cerrar_es_lineal(patron):
+    # Con una expresión regular .*? estos 2 MB tardaban minutos
+    contenido = ("texto visible " + patron * (2 * 1024 * 1024 // len(patron))).encode()
+    assert extraer_texto(contenido, "text/html").startswith("texto visible")
+
+
+def test_docx_por_parrafos():
+    w = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+    docx = _zip({"word/document.xml": (
+        f"<w:document {w}><w:body><w:p><w:r><w:t>La ECU reporta </w:t></w:r><w:r><w:t>P0300.</w:t></w:r></w:p>"
+        "<w:p/><w:p><w:r><w:t>Revisar bujías.</w:t></w:r></w:p></w:body></w:document>"
+    )})
+    tipo = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    assert extraer_texto(docx, tipo) == "La ECU reporta P0300.\nRevisar bujías."
+
+
+def test_xlsx_con_cadenas_compartidas():
+    s = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    xlsx = _zip({
+        "xl/sharedStrings.xml": f"<sst {s}><si><t>Código</t></si><si><t>P0300</t></si></sst>",
+        "xl/worksheets/sheet1.xml": (
+            f'<worksheet {s}><sheetData><row><c t="s"><v>0</v></c><c t="s"><v>1</v></c>'
+            "<c><v>42</v></c></row></sheetData></worksheet>"
+        ),
+    })
+    tipo = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    assert extraer_texto(xlsx, tipo) == "Código\tP0300\t42"
+
+
+def test_diapositivas_en_orden_numerico():
+    a = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+    pptx = _zip({
+        f"ppt/slides/slide{i}.xml": f"<p:sld xmlns:p='p' {a}><a:p><a:r><a:t>Diapositiva {i}</a:t></a:r></a:p></p:sld>"
+        for i in (10, 2, 1)
+    })
+    tipo = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+    assert extraer_texto(pptx, tipo) == "Diapositiva 1\nDiapositiva 2\nDiapositiva 10"
+
+
+def test_texto_en_cp1252_y_zip_danado():
+    assert extraer_texto("Presión".encode("cp1252"), "text/plain") == "Presión"
+    tipo = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    assert extraer_texto(b"PK\x03\x04roto", tipo) is None
@@ -0,0 +1,54 @@
+import io
+import zipfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from controllers import file_controller
+
+
+def _zip(*entradas: tuple[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archivo:
+        for nombre, datos in entradas:
+            archivo.writestr(nombre, datos)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    analizados = []
+
+    def analizar_archivo(archivo_bytes, nombre_archivo, area_oficio):
+        analizados.append(nombre_archivo)
+        return {"texto_extraido": "hola", "explicacion_clara": "ok", "acciones_sugeridas": []}
+
+    monkeypatch.setattr(file_controller, "analizar_archivo", analizar_archivo)
+    app = FastAPI()
+    app.include_router(file_controller.router, prefix="/api/v1/file")
+    with TestClient(app) as cliente:
+        cliente.analizados = analizados
+        yield cliente
+
+
+@pytest.mark.parametrize("nombre", ["datos.zip", "informe.docx"])
+def test_zip_cualquiera_se_rechaza(cliente, nombre):
+    contenido = _zip(("datos.csv", b"a,b\n1,2\n"))
+    respuesta = cliente.post("/api/v1/file/traducir", files={"file": (nombre, contenido)})
+    assert respuesta.status_code == 415
+    assert cliente.analizados == []
+
+
+def test_ole_sin_documento_office_se_rechaza(cliente):
+    contenido = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\0" * 1024
+    respuesta = cliente.post("/api/v1/file/traducir", files={"file": ("viejo.doc", contenido)})
+    assert respuesta.status_code == 415
+
+
+def test_docx_se_acepta(cliente):
+    contenido = _zip(("[Content_Types].xml", b"<Types/>"), ("word/document.xml", b"<w:document/>"))
+    respuesta = cliente.post("/api/v1/file/traducir", files={"file": ("informe.docx", contenido)})
+    assert respuesta.status_code == 200
+    assert respuesta.json()["mime_type"].endswith("wordprocessingml.document")
+    assert cliente.analizados == ["informe.docx"]
@@ -0,0 +1,30 @@
+import pytest
+
+from services import gemini_service
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 32
+WEBP = b"RIFF\x24\0\0\0WEBPVP8 " + b"\0" * 32
+
+
+@pytest.fixture
+def tipo_enviado(monkeypatch):
+    """Captura el MIME type con el que la imagen llegaría al modelo."""
+    enviado = {}
+
+    def analizar(imagen_bytes, area, mime_type):
+        enviado["mime_type"] = mime_type
+        return {}
+
+    monkeypatch.setattr(gemini_service, "_analizar_imagen", analizar)
+    return enviado
+
+
+@pytest.mark.parametrize("contenido, nombre, tipo", [
+    (PNG, "foto.jpg", "image/png"),
+    (WEBP, "captura", "image/webp"),
+    (b"\0" * 40, "foto.png", "image/png"),
+    (b"\0" * 40, "sin_extension", "image/jpeg"),
+])
+def test_imagen_se_envia_con_el_tipo_de_sus_bytes(tipo_enviado, contenido, nombre, tipo):
+    gemini_service.analizar_imagen(contenido, nombre)
+    assert tipo_enviado["mime_type"] == tipo
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from services.glossary import (
+    ACCION_GENERICA,
+    AutomataAhoCorasick,
+    EntradaGlosario,
+    Glosario,
+    anotar,
+    cobertura,
+    explicar_localmente,
+    normalizar,
+)
+
+ECU = EntradaGlosario("ECU", "la computadora del motor.", ("Lea los códigos",), "media")
+OBD = EntradaGlosario("OBD", "el conector de diagnóstico.", ("Pida el escáner",), "baja")
+FRENOS = EntradaGlosario("pastillas de freno", "las piezas que frenan la rueda.", (), "alta")
+TAC = EntradaGlosario("TAC", "una tomografía.", ("Pregunte por el contraste",), "media")
+
+
+@pytest.fixture
+def glosario():
+    g = Glosario()
+    g.agregar("mecánica", ECU, ["computadora del motor", "centralita"])
+    g.agregar("mecánica", OBD)
+    g.agregar("general", FRENOS, ["frenos"])
+    g.agregar("medicina", TAC, ["tomografía"])
+    g.construir()
+    return g
+
+
+def test_normalizar_conserva_la_longitud():
+    texto = "Pastillas de FRENO gastadas, año 2019, ñandú"
+    normalizado = normalizar(texto)
+    assert len(normalizado) == len(texto)
+    assert normalizado == "pastillas de freno gastadas, ano 2019, nandu"
+
+
+def test_automata_encuentra_patrones_solapados():
+    automata = AutomataAhoCorasick()
+    for patron in ("he", "she", "his", "hers"):
+        automata.agregar(patron, patron)
+    encontrados = sorted(automata.buscar("ushers"))
+    assert encontrados == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_busca_terminos_del_area_y_del_glosario_comun(glosario):
+    texto = "La Centralita y los frenos fallan"
+    coincidencias = glosario.buscar(texto, "mecanica")
+    assert [(c.texto, c.entrada) for c in coincidencias] == [
+        ("Centralita", ECU),
+        ("frenos", FRENOS),
+    ]
+    # Las posiciones son las del texto original
+    assert all(texto[c.inicio:c.fin] == c.texto for c in coincidencias)
+
+
+def test_no_mezcla_areas(glosario):
+    assert glosario.buscar("me pidieron una tomografía", "mecanica") == []
+    assert [c.entrada for c in glosario.buscar("me pidieron una tomografía", "medicina")] == [TAC]
+
+
+def test_solo_palabras_completas(glosario):
+    assert glosario.buscar("la SECUENCIA de arranque", "mecanica") == []
+    assert [c.entrada for c in glosario.buscar("la ECU, el OBD.", "mecanica")] == [ECU, OBD]
+
+
+def test_gana_la_coincidencia_mas_larga(glosario):
+    coincidencias = glosario.buscar("cambiar las pastillas de freno", "mecanica")
+    assert [c.texto for c in coincidencias] == ["pastillas de freno"]
+
+
+def test_cargar_desde_directorio(tmp_path):
+    (tmp_path / "ti.json").write_text(json.dumps([
+        {"termino": "DNS", "explicacion": "la guía de direcciones.", "sinonimos": ["servidor de nombres"]},
+    ]), encoding="utf-8")
+    (tmp_path / "notas.txt").write_text("no es un glosario", encoding="utf-8")
+    g = Glosario.cargar(str(tmp_path))
+    assert g.estadisticas() == {"ti": 1}
+    [coincidencia] = g.buscar("falla el servidor de nombres", "ti")
+    assert coincidencia.entrada.termino == "DNS"
+    assert coincidencia.entrada.urgencia == "baja"
+
+
+def test_anotar_lista_cada_termino_una_vez(glosario):
+    coincidencias = glosario.buscar("la ECU o centralita", "mecanica")
+    bloque = anotar(coincidencias)
+    assert bloque.count("- ECU: la computadora del motor.") == 1
+    assert anotar([]) == ""
+
+
+def test_cobertura_ignora_palabras_vacias(glosario):
+    texto = "la ECU y el OBD"
+    fraccion, palabras = cobertura(texto, glosario.buscar(texto, "mecanica"))
+    assert (fraccion, palabras) == (1.0, 2)
+    texto = "la ECU hace ruido"
+    assert cobertura(texto, glosario.buscar(texto, "mecanica")) == (1 / 3, 3)
+
+
+def test_explicar_localmente_textos_cubiertos(glosario):
+    texto = "ECU y pastillas de freno"
+    resultado = explicar_localmente(texto, glosario.buscar(texto, "mecanica"))
+    assert resultado["explicacion_clara"].startswith("En palabras sencillas: «ECU» significa")
+    # La urgencia es la del término más urgente
+    assert resultado["nivel_urgencia"] == "alta"
+    assert resultado["acciones_sugeridas"] == ["Lea los códigos", ACCION_GENERICA]
+
+
+@pytest.mark.parametrize("texto, argumentos", [
+    ("la ECU hace un ruido muy raro", {}),
+    ("ECU OBD ECU OBD", {"max_palabras": 3}),
+    ("nada conocido aquí", {}),
+])
+def test_explicar_localmente_deja_el_resto_al_modelo(glosario, texto, argumentos):
+    assert explicar_localmente(texto, glosario.buscar(texto, "mecanica"), **argumentos) is None
+
+
+def test_umbral_degradado_acepta_cobertura_parcial(glosario):
+    texto = "la ECU hace ruido"
+    coincidencias = glosario.buscar(texto, "mecanica")
+    assert explicar_localmente(texto, coincidencias) is None
+    assert explicar_localmente(texto, coincidencias, cobertura_minima=0.3) is not None
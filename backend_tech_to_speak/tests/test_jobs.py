@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from services import jobs
+from services.jobs import ESTADO_COMPLETADO, ESTADO_EN_PROCESO, GestorJobs, JobStore
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_LEASE_SEGUNDOS", 0.4)
+    monkeypatch.setattr(jobs, "JOBS_LATIDO_SEGUNDOS", 0.05)
+    monkeypatch.setattr(jobs, "JobStore", lambda: JobStore(str(tmp_path)))
+    return str(tmp_path)
+
+
+def _esperar_estado(store: JobStore, job_id: str, estado: str, segundos: float = 5) -> dict:
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        job = store.obtener(job_id)
+        if job["estado"] == estado:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"El job no llegó a {estado}: {store.obtener(job_id)['estado']}")
+
+
+def test_retoma_huerfanos_sin_reiniciar(directorio):
+    # Otro proceso reclamó el job y se cayó después de arrancar este
+    otro = JobStore(directorio)
+    job_id = otro.crear("eco", b"hola", {})
+    assert otro.reclamar(job_id)
+
+    gestor = GestorJobs({"eco": lambda contenido, parametros: {"texto": contenido.decode()}})
+    gestor.iniciar()
+    try:
+        job = _esperar_estado(otro, job_id, ESTADO_COMPLETADO)
+        assert job["resultado"] == {"texto": "hola"}
+    finally:
+        gestor.detener()
+        otro.cerrar()
+
+
+def test_job_largo_renueva_su_lease(directorio):
+    ejecuciones = []
+    empezado = threading.Event()
+
+    def lento(contenido, parametros):
+        ejecuciones.append(threading.get_ident())
+        empezado.set()
+        time.sleep(1.2)
+        return {}
+
+    gestor = GestorJobs({"lento": lento})
+    # Otro proceso que comparte el directorio y revisa los huérfanos
+    vecino = GestorJobs({"lento": lento})
+    gestor.iniciar()
+    job_id = gestor.encolar("lento", b"", {})
+    assert empezado.wait(2)
+    vecino.iniciar()
+    try:
+        assert gestor.store.obtener(job_id)["estado"] == ESTADO_EN_PROCESO
+        _esperar_estado(gestor.store, job_id, ESTADO_COMPLETADO)
+        # Dura tres leases, pero nadie lo dio por huérfano
+        assert len(ejecuciones) == 1
+    finally:
+        vecino.detener()
+        gestor.detener()
+
+
+def test_job_conserva_cliente_sin_deadline(directorio):
+    from services.deadline import establecer_deadline, restablecer_deadline, tiempo_restante
+    from services.scheduler import prioridad_actual
+    from services.usage import cliente_actual
+
+    vistos = {}
+
+    def registrar(contenido, parametros):
+        vistos.update(
+            cliente=cliente_actual.get(), prioridad=prioridad_actual.get(), deadline=tiempo_restante()
+        )
+        return {}
+
+    gestor = GestorJobs({"registrar": registrar})
+    gestor.iniciar()
+    token_cliente = cliente_actual.set("key:abc")
+    token_deadline = establecer_deadline(0.01)
+    try:
+        job_id = gestor.encolar("registrar", b"", {})
+        _esperar_estado(gestor.store, job_id, ESTADO_COMPLETADO)
+    finally:
+        restablecer_deadline(token_deadline)
+        cliente_actual.reset(token_cliente)
+        gestor.detener()
+    assert vistos == {"cliente": "key:abc", "prioridad": "baja", "deadline": None}
@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+from services.key_pool import PoolClaves
+
+
+def test_reparte_la_recarga_entre_procesos():
+    pool = PoolClaves(["clave"], rpm_por_clave=60, procesos=4)
+    bucket = pool.claves[0].bucket
+    assert bucket.capacidad == 15
+    assert bucket.tokens_por_segundo == pytest.approx(0.25)
+
+
+def test_menos_rpm_que_procesos_deja_llamar():
+    # 15 RPM entre 16 workers: la ráfaga no puede quedar por debajo de una llamada
+    pool = PoolClaves(["clave"], rpm_por_clave=15, procesos=16)
+    bucket = pool.claves[0].bucket
+    assert bucket.capacidad == 1
+    assert bucket.tokens_por_segundo == pytest.approx(15 / 16 / 60)
+
+    inicio = time.monotonic()
+    assert pool.adquirir() is pool.claves[0]
+    assert time.monotonic() - inicio < 0.5
+    # La siguiente llega cuando el worker recupera su parte de la cuota (64 s)
+    assert bucket.segundos_hasta() == pytest.approx(64, rel=0.01)
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from services import rate_limit
+from services.rate_limit import BackendMemoria, RateLimiter, area_limitada, identificar_cliente
+from services.token_bucket import TokenBucket
+
+
+@pytest.fixture
+def limitador(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_CLIENTE_CAPACIDAD", 10)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_CLIENTE_POR_MINUTO", 0.001)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_AREA_CAPACIDAD", 15)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_AREA_POR_MINUTO", 0.001)
+    return RateLimiter(BackendMemoria())
+
+
+def _consumir(limitador, cliente, area, ruta="/api/v1/file/traducir"):
+    return asyncio.run(limitador.consumir(cliente, area, ruta))
+
+
+def test_token_bucket_no_consume_si_no_alcanza():
+    bucket = TokenBucket(capacidad=5, tokens_por_segundo=0.001)
+    assert bucket.consumir(3)
+    assert not bucket.consumir(3)
+    assert bucket.disponibles() == pytest.approx(2, abs=0.01)
+    assert bucket.consumir_o_esperar(3) == pytest.approx(1000, rel=0.01)
+
+
+def test_cliente_sin_tokens_no_gasta_los_del_area(limitador):
+    assert _consumir(limitador, "ip:1", "mecanica").permitido
+    rechazado = _consumir(limitador, "ip:1", "mecanica")
+    assert not rechazado.permitido
+    # El área conserva sus 5 tokens: otro cliente puede gastarlos
+    assert _consumir(limitador, "ip:2", "mecanica", "/api/v1/jargon/traducir").restantes == pytest.approx(9, abs=0.01)
+    resultado = _consumir(limitador, "ip:3", "mecanica", "/api/v1/image/traducir")
+    assert resultado.permitido
+
+
+def test_area_sin_tokens_no_gasta_los_del_cliente(limitador):
+    assert _consumir(limitador, "ip:1", "ti").permitido
+    rechazado = _consumir(limitador, "ip:2", "ti")
+    assert not rechazado.permitido
+    assert rechazado.limite == 15
+    # ip:2 sigue con sus 10 tokens para otra área
+    assert _consumir(limitador, "ip:2", "medicina").permitido
+
+
+def test_api_key_desconocida_cuenta_como_la_ip(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_CLIENTES_CONOCIDOS", frozenset({rate_limit._hash_clave("secreta")}))
+    assert identificar_cliente("inventada-1", "10.0.0.1") == "ip:10.0.0.1"
+    assert identificar_cliente("inventada-2", "10.0.0.1") == "ip:10.0.0.1"
+    assert identificar_cliente("secreta", "10.0.0.1").startswith("key:")
+    assert identificar_cliente(None, None) == "ip:desconocida"
+
+
+@pytest.mark.parametrize("area, bucket", [
+    ("Mecánica", "mecanica"),
+    (" TI ", "ti"),
+    ("area-inventada-123", "otras"),
+    (None, "otras"),
+    (123, "otras"),
+    (["ti"], "otras"),
+])
+def test_area_limitada(area, bucket):
+    assert area_limitada(area) == bucket
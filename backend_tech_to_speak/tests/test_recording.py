@@ -0,0 +1,60 @@
+import pytest
+
+from services import recording
+from services.backends.replay import BackendReplay
+from services.recording import Grabador, huella, leer_grabacion, peticion_grabada
+
+TRANSCRIPCION = "el paciente refiere dolor torácico desde anoche"
+ARCHIVO = {
+    "texto_extraido": "Contrato de arrendamiento entre Ana Pérez y ...",
+    "explicacion_clara": "Es un contrato de alquiler.",
+    "acciones_sugeridas": ["Leer la cláusula 3"],
+    "nivel_urgencia": "baja",
+}
+
+
+def _grabar(tmp_path, operacion, entrada, resultado) -> dict:
+    grabador = Grabador(directorio=str(tmp_path), muestreo=1.0)
+    token = peticion_grabada.set(grabador.muestrear())
+    try:
+        grabador.registrar_llamada(operacion, entrada, "general", resultado, duracion=0.0)
+    finally:
+        peticion_grabada.reset(token)
+    grabador.volcar()
+    [evento] = [e for e in leer_grabacion(str(tmp_path)) if e["tipo"] == "modelo"]
+    return evento
+
+
+def test_no_guarda_la_transcripcion_ni_el_texto_extraido(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording, "GRABACION_TEXTOS", False)
+    stt = _grabar(tmp_path / "stt", "stt", b"audio", TRANSCRIPCION)
+    assert stt["resultado"] == {
+        "redactado": True,
+        "huella": huella(TRANSCRIPCION),
+        "bytes": len(TRANSCRIPCION.encode()),
+    }
+    archivo = _grabar(tmp_path / "archivo", "archivo", b"%PDF-1.4", ARCHIVO)
+    assert archivo["resultado"]["texto_extraido"]["redactado"] is True
+    assert archivo["resultado"]["explicacion_clara"] == ARCHIVO["explicacion_clara"]
+    for evento in (stt, archivo):
+        assert "Ana Pérez" not in str(evento) and "torácico" not in str(evento)
+
+
+def test_con_grabacion_textos_guarda_la_respuesta_entera(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording, "GRABACION_TEXTOS", True)
+    assert _grabar(tmp_path, "archivo", b"%PDF-1.4", ARCHIVO)["resultado"] == ARCHIVO
+
+
+@pytest.mark.parametrize("operacion, resultado", [("stt", TRANSCRIPCION), ("archivo", ARCHIVO)])
+def test_replay_devuelve_relleno_del_mismo_tamano(tmp_path, monkeypatch, operacion, resultado):
+    monkeypatch.setattr(recording, "GRABACION_TEXTOS", False)
+    _grabar(tmp_path, operacion, b"entrada", resultado)
+    backend = BackendReplay(str(tmp_path), velocidad=0)
+    if operacion == "stt":
+        texto = backend.transcribir_audio(b"entrada")
+    else:
+        respuesta = backend.analizar_archivo(b"entrada", "contrato.pdf")
+        assert respuesta["explicacion_clara"] == ARCHIVO["explicacion_clara"]
+        texto, resultado = respuesta["texto_extraido"], ARCHIVO["texto_extraido"]
+    assert isinstance(texto, str)
+    assert len(texto) == len(resultado.encode())
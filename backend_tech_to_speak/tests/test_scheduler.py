@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from services.deadline import DeadlineExcedidoError, establecer_deadline, restablecer_deadline
+from services.scheduler import PlanificadorWFQ, prioridad_actual
+
+
+def _esperar(condicion, timeout: float = 5.0) -> None:
+    limite = time.monotonic() + timeout
+    while not condicion():
+        assert time.monotonic() < limite, "la condición no se cumplió a tiempo"
+        time.sleep(0.001)
+
+
+def _orden_de_concesion(planificador: PlanificadorWFQ, peticiones: list[tuple[str, str]]) -> list[str]:
+    """
+    Ocupa el único hueco, encola las peticiones (clase, prioridad) en ese orden y lo
+    libera: devuelve el orden en que el planificador les concede turno.
+    """
+    concedidos = []
+    hilos = []
+
+    def llamar(clase: str, prioridad: str, etiqueta: str):
+        # Como en una petición: la prioridad llega en el contexto
+        prioridad_actual.set(prioridad)
+        with planificador.turno(clase):
+            concedidos.append(etiqueta)
+
+    with planificador.turno("jargon"):
+        for i, (clase, prioridad) in enumerate(peticiones):
+            hilo = threading.Thread(target=llamar, args=(clase, prioridad, f"{clase}{i}"))
+            hilo.start()
+            hilos.append(hilo)
+            # Cada una se encola antes que la siguiente
+            _esperar(lambda: sum(planificador.estadisticas()["en_cola"].values()) == i + 1)
+    for hilo in hilos:
+        hilo.join(timeout=5)
+    return concedidos
+
+
+def test_respeta_la_concurrencia():
+    planificador = PlanificadorWFQ(concurrencia=3)
+    activos = maximo = 0
+    lock = threading.Lock()
+
+    def llamar():
+        nonlocal activos, maximo
+        with planificador.turno("jargon"):
+            with lock:
+                activos += 1
+                maximo = max(maximo, activos)
+            time.sleep(0.01)
+            with lock:
+                activos -= 1
+
+    hilos = [threading.Thread(target=llamar) for _ in range(12)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(timeout=5)
+    assert maximo == 3
+    assert planificador.estadisticas()["en_curso"] == 0
+
+
+def test_los_textos_adelantan_a_una_rafaga_de_archivos():
+    planificador = PlanificadorWFQ(concurrencia=1)
+    orden = _orden_de_concesion(
+        planificador, [("file", "normal")] * 4 + [("jargon", "normal")] * 2
+    )
+    # Los archivos llegaron antes, pero las explicaciones no esperan a la ráfaga
+    assert orden == ["jargon4", "jargon5", "file0", "file1", "file2", "file3"]
+
+
+def test_dentro_de_una_clase_se_respeta_la_llegada():
+    planificador = PlanificadorWFQ(concurrencia=1)
+    orden = _orden_de_concesion(planificador, [("audio", "normal")] * 4)
+    assert orden == ["audio0", "audio1", "audio2", "audio3"]
+
+
+def test_la_prioridad_multiplica_el_peso():
+    # Mismo coste y peso: a igual prioridad gana la que llegó antes
+    iguales = [("image", "normal"), ("audio", "normal")]
+    assert _orden_de_concesion(PlanificadorWFQ(concurrencia=1), iguales) == ["image0", "audio1"]
+    distintas = [("image", "baja"), ("audio", "alta")]
+    assert _orden_de_concesion(PlanificadorWFQ(concurrencia=1), distintas) == ["audio1", "image0"]
+
+
+def test_abandona_la_cola_al_agotar_el_deadline():
+    planificador = PlanificadorWFQ(concurrencia=1)
+    with planificador.turno("jargon"):
+        token = establecer_deadline(0.05)
+        try:
+            with pytest.raises(DeadlineExcedidoError):
+                with planificador.turno("jargon"):
+                    pass
+        finally:
+            restablecer_deadline(token)
+        # El turno abandonado ya no cuenta como pendiente
+        assert planificador.estadisticas()["en_cola"] == {}
+    # Y no se lleva el hueco al liberarse
+    with planificador.turno("jargon") as espera:
+        assert espera < 1
+    assert planificador.estadisticas()["en_curso"] == 0
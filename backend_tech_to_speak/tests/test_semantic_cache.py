@@ -0,0 +1,83 @@
+import pytest
+
+from services.semantic_cache import CacheSemantica, rasgos
+
+PARTICION = ("medicina", "explicar_jerga@1")
+
+
+@pytest.fixture
+def cache():
+    return CacheSemantica(capacidad=100, umbral=0.85)
+
+
+@pytest.mark.parametrize("guardado, buscado", [
+    ("el paciente tiene cáncer", "el paciente no tiene cáncer"),
+    ("el servidor está caído", "el servidor no está caído"),
+    ("presión arterial alta, requiere cirugía urgente",
+     "presión arterial alta, no requiere cirugía urgente"),
+    ("cambiar el filtro con el motor encendido", "cambiar el filtro sin el motor encendido"),
+    ("el paciente no tiene fiebre", "el paciente nunca tiene fiebre"),
+])
+def test_no_reutiliza_textos_con_otra_negacion(cache, guardado, buscado):
+    cache.guardar(guardado, PARTICION, "explicación")
+    assert cache.buscar(buscado, PARTICION) is None
+    # En sentido contrario tampoco
+    otra = CacheSemantica(capacidad=100, umbral=0.85)
+    otra.guardar(buscado, PARTICION, "explicación")
+    assert otra.buscar(guardado, PARTICION) is None
+
+
+@pytest.mark.parametrize("guardado, buscado", [
+    ("el servidor se cayó por falta de memoria", "por falta de memoria se cayó el servidor"),
+    ("reinicia el router y el modem", "reiniciar el modem y el router"),
+    ("la tarjeta madre tiene un capacitor inflado", "la tarjeta madre tiene el capacitor inflado"),
+    ("el paciente no tiene cáncer", "El paciente NO tiene cancer"),
+])
+def test_reutiliza_parafrasis_cercanas(cache, guardado, buscado):
+    cache.guardar(guardado, PARTICION, "explicación")
+    encontrado = cache.buscar(buscado, PARTICION)
+    assert encontrado is not None
+    valor, similitud = encontrado
+    assert valor == "explicación"
+    assert similitud >= 0.85
+
+
+@pytest.mark.parametrize("guardado, buscado", [
+    # Otra forma de decir lo mismo, pero con palabras distintas: no llega al umbral
+    ("el disco está al 100%", "disco lleno 100 por ciento"),
+    ("el compresor hace ruido al arrancar", "el compresor hace mucho ruido al arrancar"),
+    ("tumor benigno en el hígado", "tumor maligno en el hígado"),
+    ("error 404 en la página", "error 500 en la página"),
+])
+def test_no_reutiliza_textos_distintos(cache, guardado, buscado):
+    cache.guardar(guardado, PARTICION, "explicación")
+    assert cache.buscar(buscado, PARTICION) is None
+
+
+def test_rasgos_separa_numeros_y_negaciones():
+    _, _, numeros, negaciones = rasgos("Sin señal: error 404 y 3,5 V, no responde ni reinicia")
+    assert numeros == {"404", "3,5"}
+    assert negaciones == {"sin", "no", "ni"}
+
+
+def test_particiones_no_se_cruzan(cache):
+    cache.guardar("el servidor está caído", ("medicina", "v1"), "medicina")
+    assert cache.buscar("el servidor está caído", ("mecanica", "v1")) is None
+    assert cache.buscar("el servidor está caído", ("medicina", "v2")) is None
+
+
+def test_capacidad_expulsa_la_entrada_menos_reciente():
+    cache = CacheSemantica(capacidad=2, umbral=0.85)
+    cache.guardar("el compresor no arranca", PARTICION, 1)
+    cache.guardar("la batería está descargada", PARTICION, 2)
+    assert cache.buscar("el compresor no arranca", PARTICION) is not None
+    cache.guardar("el alternador no carga", PARTICION, 3)
+    assert cache.buscar("la batería está descargada", PARTICION) is None
+    assert cache.buscar("el compresor no arranca", PARTICION)[0] == 1
+    assert cache.estadisticas()["entradas"] == 2
+
+
+def test_texto_sin_palabras_con_significado_no_se_guarda(cache):
+    cache.guardar("de la el", PARTICION, "nada")
+    assert cache.buscar("de la el", PARTICION) is None
+    assert cache.estadisticas()["entradas"] == 0
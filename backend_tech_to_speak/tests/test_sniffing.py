@@ -0,0 +1,163 @@
+import io
+import zipfile
+import zlib
+
+import pytest
+
+from services.sniffing import (
+    detectar_tipo,
+    detectar_tipo_completo,
+    familia,
+    familia_muestra,
+    pdf_tiene_texto,
+    tipo_archivo,
+)
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+ODT = "application/vnd.oasis.opendocument.text"
+
+
+def _zip(*entradas: tuple[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archivo:
+        for nombre, datos in entradas:
+            # Como en OpenDocument, "mimetype" va sin comprimir
+            compresion = zipfile.ZIP_STORED if nombre == "mimetype" else zipfile.ZIP_DEFLATED
+            archivo.writestr(nombre, datos, compress_type=compresion)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("muestra, tipo", [
+    (b"\x89PNG\r\n\x1a\n" + b"\0" * 8, "image/png"),
+    (b"\xff\xd8\xff\xe0\0\x10JFIF", "image/jpeg"),
+    (b"GIF89a\x01\0", "image/gif"),
+    (b"RIFF\0\0\0\0WEBPVP8 ", "image/webp"),
+    (b"RIFF\0\0\0\0WAVEfmt ", "audio/wav"),
+    (b"\0\0\0\x18ftypheic\0\0\0\0", "image/heic"),
+    (b"\0\0\0\x18ftypM4A \0\0\0\0", "audio/mp4"),
+    (b"\0\0\0\x18ftypisom\0\0\0\0", "video/mp4"),
+    (b"OggS\0\x02", "audio/ogg"),
+    (b"\x1a\x45\xdf\xa3\x9f\x42\x86", "audio/webm"),
+    (b"ID3\x04\0\0", "audio/mpeg"),
+    (b"\xff\xfb\x90\x64", "audio/mpeg"),
+    (b"\xff\xf1\x50\x80", "audio/aac"),
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"basura previa\n%PDF-1.4\n", "application/pdf"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (b"{\\rtf1\\ansi", "application/rtf"),
+    (b"\xef\xbb\xbf<?xml version='1.0'?>", "application/xml"),
+    (b"  <!DOCTYPE html><html>", "text/html"),
+    (b'{"clave": 1}', "application/json"),
+    ("Presión alta, año 2024\n".encode("latin-1"), "text/plain"),
+    (b"\x7fELF\x02\x01\x01\0\0\0", None),
+    (b"", None),
+])
+def test_detectar_tipo_por_magic_bytes(muestra, tipo):
+    assert detectar_tipo(muestra) == tipo
+
+
+def test_documentos_zip_por_sus_entradas():
+    docx = _zip(("[Content_Types].xml", b"<Types/>"), ("word/document.xml", b"<w:document/>"))
+    odt = _zip(("mimetype", ODT.encode()), ("content.xml", b"<office:document/>"))
+    assert detectar_tipo(docx) == DOCX
+    assert detectar_tipo(odt) == ODT
+    assert detectar_tipo_completo(_zip(("datos.csv", b"a,b"))) == "application/zip"
+
+
+def test_docx_con_entradas_al_final_del_zip():
+    # Las entradas de Word no aparecen en los primeros KB: solo el índice del ZIP las delata
+    relleno = bytes(range(256)) * 64
+    docx = _zip(("relleno.bin", relleno), ("word/document.xml", b"<w:document/>"))
+    assert detectar_tipo(docx[:64]) == "application/zip"
+    assert detectar_tipo_completo(docx) == DOCX
+
+
+OLE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\0" * 504
+
+
+@pytest.mark.parametrize("stream, tipo", [
+    ("WordDocument", "application/msword"),
+    ("Workbook", "application/vnd.ms-excel"),
+    ("PowerPoint Document", "application/vnd.ms-powerpoint"),
+    ("Contenido", "application/x-ole-storage"),
+])
+def test_ole_por_los_streams_del_directorio(stream, tipo):
+    contenido = OLE + b"\0" * 1024 + (stream + "\0").encode("utf-16-le")
+    assert detectar_tipo(contenido) == "application/x-ole-storage"
+    assert detectar_tipo_completo(contenido) == tipo
+
+
+@pytest.mark.parametrize("contenido, nombre", [
+    (_zip(("datos.csv", b"a,b")), "informe.docx"),
+    (_zip(("datos.csv", b"a,b")), "datos.zip"),
+    (OLE, "viejo.doc"),
+])
+def test_contenedores_sin_documento_no_son_documentos(contenido, nombre):
+    # La extensión no basta para aceptar un ZIP u OLE2 cualquiera
+    assert familia(tipo_archivo(contenido, nombre)) is None
+    # Con solo los primeros bytes todavía pueden serlo
+    assert familia_muestra(detectar_tipo(contenido[:4096])) == "documento"
+
+
+def test_tipo_archivo_ignora_la_extension_si_los_bytes_mienten():
+    png = b"\x89PNG\r\n\x1a\n" + b"\0" * 8
+    assert tipo_archivo(png, "informe.pdf") == "image/png"
+
+
+@pytest.mark.parametrize("contenido, nombre, tipo", [
+    (b"a;b;c\n1;2;3\n", "datos.csv", "text/csv"),
+    (b"# Titulo\n", "notas.md", "text/markdown"),
+    (b"a;b;c\n", "datos.exe", "text/plain"),
+    (b"\x7fELF\x02\x01", "sin_extension", "application/octet-stream"),
+])
+def test_tipo_archivo_usa_la_extension_para_lo_que_no_distinguen_los_bytes(contenido, nombre, tipo):
+    assert tipo_archivo(contenido, nombre) == tipo
+
+
+@pytest.mark.parametrize("tipo, esperada", [
+    ("image/heic", "imagen"),
+    ("audio/webm", "audio"),
+    ("video/mp4", "audio"),
+    ("text/csv", "texto"),
+    ("application/json", "texto"),
+    ("application/pdf", "documento"),
+    (DOCX, "documento"),
+    ("application/vnd.ms-excel", "documento"),
+    ("application/x-msdownload", None),
+    (None, None),
+])
+def test_familia(tipo, esperada):
+    assert familia(tipo) == esperada
+
+
+def _object_stream(datos: bytes) -> bytes:
+    return (
+        b"%PDF-1.5\n2 0 obj << /Type /ObjStm /N 1 /First 4 /Filter /FlateDecode >>\r\nstream\r\n"
+        + zlib.compress(datos) + b"\nendstream\nendobj\n"
+    )
+
+
+def test_pdf_con_fuentes_tiene_texto():
+    assert pdf_tiene_texto(b"%PDF-1.4\n1 0 obj << /Type /Font /BaseFont /Helvetica >>\n")
+    assert pdf_tiene_texto(_object_stream(b"<< /Type /Font /BaseFont /Helvetica >>"))
+
+
+def test_pdf_escaneado_no_tiene_texto():
+    assert not pdf_tiene_texto(b"%PDF-1.4\n1 0 obj << /Type /XObject /Subtype /Image >>\n")
+    assert not pdf_tiene_texto(_object_stream(b"<< /Type /XObject /Subtype /Image >>"))
+
+
+def test_pdf_bomba_no_se_descomprime_entera():
+    # 64 MB de ceros en un stream de ~64 KB: solo se infla el presupuesto
+    descompresor = zlib.compressobj(9)
+    bomba = b"".join(descompresor.compress(b"\0" * (1024 * 1024)) for _ in range(64))
+    bomba += descompresor.flush()
+    pdf = (
+        b"%PDF-1.5\n1 0 obj << /Type /ObjStm /Filter /FlateDecode >>\nstream\n"
+        + bomba + b"\nendstream\n"
+    )
+    assert not pdf_tiene_texto(pdf)
+
+
+def test_pdf_con_object_streams_sin_datos():
+    assert not pdf_tiene_texto(b"%PDF-1.5 " + b"/Type /ObjStm " * 100_000)
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from services.upload_limits import (
+    SUBIDA_BYTES_SNIFFING,
+    SUBIDA_MAX_BYTES_CABECERA,
+    MiddlewareLimiteSubida,
+    ReglaSubida,
+    _InspectorMultipart,
+)
+
+BOUNDARY = b"----limite123"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 32
+
+
+def _multipart(*partes: tuple[str, str | None, bytes]) -> bytes:
+    cuerpo = b""
+    for nombre, filename, datos in partes:
+        disposicion = f'form-data; name="{nombre}"'
+        if filename:
+            disposicion += f'; filename="{filename}"'
+        cuerpo += b"--" + BOUNDARY + b"\r\n"
+        cuerpo += f"Content-Disposition: {disposicion}\r\n\r\n".encode() + datos + b"\r\n"
+    return cuerpo + b"--" + BOUNDARY + b"--\r\n"
+
+
+def _alimentar(cuerpo: bytes, tamano: int) -> tuple[bool, bytes | None, int]:
+    """Alimenta el cuerpo en fragmentos de `tamano`; devuelve también cuántos hizo falta leer."""
+    inspector = _InspectorMultipart(BOUNDARY)
+    for i in range(0, len(cuerpo), tamano):
+        fragmento = cuerpo[i:i + tamano]
+        decidido, muestra = inspector.alimentar(fragmento, i + tamano >= len(cuerpo))
+        if decidido:
+            return decidido, muestra, i + len(fragmento)
+    raise AssertionError("el inspector no llegó a decidir")
+
+
+@pytest.mark.parametrize("tamano", [1, 7, 64, 1 << 20])
+def test_muestra_del_archivo_corto_en_cualquier_fragmentacion(tamano):
+    cuerpo = _multipart(("area_oficio", None, b"medicina"), ("file", "foto.png", PNG))
+    decidido, muestra, _ = _alimentar(cuerpo, tamano)
+    assert decidido
+    # Termina justo antes del delimitador de la parte siguiente
+    assert muestra == PNG
+
+
+def test_archivo_largo_se_decide_con_los_primeros_bytes():
+    datos = PNG + b"x" * (SUBIDA_BYTES_SNIFFING * 10)
+    cuerpo = _multipart(("file", "foto.png", datos))
+    decidido, muestra, leidos = _alimentar(cuerpo, 1024)
+    assert muestra == datos[:SUBIDA_BYTES_SNIFFING]
+    # No espera al resto del archivo
+    assert leidos < SUBIDA_BYTES_SNIFFING + 2048
+
+
+def test_sin_archivo_se_decide_al_terminar_el_cuerpo():
+    cuerpo = _multipart(("area_oficio", None, b"ti"), ("texto", None, b"hola"))
+    assert _alimentar(cuerpo, 16)[:2] == (True, None)
+
+
+def test_archivo_vacio():
+    cuerpo = _multipart(("file", "vacio.png", b""))
+    assert _alimentar(cuerpo, 16)[:2] == (True, b"")
+
+
+def test_deja_de_buscar_tras_muchos_campos_delante():
+    relleno = b"a" * (2 * SUBIDA_MAX_BYTES_CABECERA)
+    cuerpo = _multipart(("notas", None, relleno), ("file", "foto.png", PNG))
+    decidido, muestra, leidos = _alimentar(cuerpo, 4096)
+    assert (decidido, muestra) == (True, None)
+    assert leidos < len(cuerpo)
+
+
+# ==========================
+# MIDDLEWARE
+# ==========================
+RUTA = "/api/v1/image/traducir"
+
+
+def _llamar(cuerpo: bytes, cabeceras: list[tuple[bytes, bytes]], tamano: int = 1024) -> tuple[int, bool]:
+    """Estado de la respuesta y si la app llegó a leer el cuerpo entero."""
+    leido = {"completo": False}
+
+    async def app(scope, receive, send):
+        recibido = b""
+        while True:
+            mensaje = await receive()
+            recibido += mensaje.get("body", b"")
+            if not mensaje.get("more_body"):
+                break
+        leido["completo"] = recibido == cuerpo
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    fragmentos = [cuerpo[i:i + tamano] for i in range(0, len(cuerpo), tamano)] or [b""]
+    mensajes = [
+        {"type": "http.request", "body": f, "more_body": i < len(fragmentos) - 1}
+        for i, f in enumerate(fragmentos)
+    ]
+    enviados = []
+
+    async def receive():
+        return mensajes.pop(0)
+
+    async def send(mensaje):
+        enviados.append(mensaje)
+
+    middleware = MiddlewareLimiteSubida(
+        app, {RUTA: ReglaSubida(64 * 1024, ("imagen",), estricta=True)}
+    )
+    scope = {"type": "http", "path": RUTA, "headers": cabeceras}
+    asyncio.run(middleware(scope, receive, send))
+    return enviados[0]["status"], leido["completo"]
+
+
+def _cabeceras_multipart(longitud: int | None = None) -> list[tuple[bytes, bytes]]:
+    cabeceras = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    if longitud is not None:
+        cabeceras.append((b"content-length", str(longitud).encode()))
+    return cabeceras
+
+
+def test_deja_pasar_una_imagen_valida():
+    cuerpo = _multipart(("file", "foto.png", PNG))
+    assert _llamar(cuerpo, _cabeceras_multipart(len(cuerpo))) == (200, True)
+
+
+def test_rechaza_por_content_length_sin_leer_el_cuerpo():
+    cuerpo = _multipart(("file", "foto.png", PNG))
+    assert _llamar(cuerpo, _cabeceras_multipart(10 * 1024 * 1024)) == (413, False)
+
+
+def test_rechaza_cuerpos_chunked_que_superan_el_limite():
+    cuerpo = _multipart(("file", "foto.png", PNG + b"\0" * (128 * 1024)))
+    assert _llamar(cuerpo, _cabeceras_multipart()) == (413, False)
+
+
+def test_rechaza_otro_formato_con_los_primeros_bytes():
+    cuerpo = _multipart(("file", "foto.png", b"%PDF-1.7\n" + b"x" * (32 * 1024)))
+    assert _llamar(cuerpo, _cabeceras_multipart(len(cuerpo))) == (415, False)
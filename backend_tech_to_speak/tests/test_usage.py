@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+from services.usage import ContabilidadUso, _costo
+
+
+def _respuesta(entrada: int = 100, salida: int = 20):
+    return SimpleNamespace(
+        usage_metadata=SimpleNamespace(prompt_token_count=entrada, candidates_token_count=salida)
+    )
+
+
+def test_areas_desconocidas_no_crean_series_ni_acumulados(tmp_path):
+    contabilidad = ContabilidadUso(archivo=str(tmp_path / "uso.jsonl"), intervalo=0)
+    for i in range(50):
+        contabilidad.registrar(_respuesta(), "explicar", f"inventada-{i}")
+    contabilidad.registrar(_respuesta(), "explicar", "Mecánica")
+    contabilidad.registrar(_respuesta(), "explicar", None)
+
+    areas = {fila["area"]: fila["llamadas"] for fila in contabilidad.resumen(("area",))}
+    assert areas == {"otras": 50, "mecanica": 1, "general": 1}
+    assert not any("inventada" in linea for linea in _costo.exportar())